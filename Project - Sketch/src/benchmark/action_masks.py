@@ -0,0 +1,170 @@
+import argparse
+import time
+import numpy as np
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.VecPlaytimeEnv import VecPlaytimeEnv, gymnasium_space
+from gymenv.evaluation import notebook_gameplans
+
+"""Action masks of PlaytimeEnv : penalties of random actions with and
+    without the masks, and timesteps of MaskablePPO (sb3-contrib) to reach
+    a mean episode reward with and without the masks.
+    Run from src/ with : python -m benchmark.action_masks
+"""
+
+
+def random_penalties(gameplans: list, masked: bool, nb_steps: int,
+                     num_envs: int = 256) -> tuple:
+    """Random actions in VecPlaytimeEnv, drawn among the valid actions if
+    masked
+
+    Returns
+    -------
+    (float, float)
+        Part of the steps with a bad action penalty and mean reward
+    """
+    env = VecPlaytimeEnv(gameplans, num_envs, seed=0)
+    env.reset()
+    rng = np.random.default_rng(0)
+    nvec = env.action_space.nvec
+    splits = np.cumsum(nvec)[:-1]
+    penalties = 0
+    rewards = 0
+    for _ in range(nb_steps // num_envs):
+        if masked:
+            # Uniform choice among the valid values of each dimension
+            masks = np.split(env.action_masks(), splits, axis=1)
+            actions = np.stack([
+                (rng.random((num_envs, 1)) * mask.cumsum(axis=1)[:, -1:]
+                 < mask.cumsum(axis=1)).argmax(axis=1) for mask in masks],
+                axis=1)
+        else:
+            actions = rng.integers(0, nvec, size=(num_envs, len(nvec)))
+        maneuver = env.maneuver_values[actions[:, 0]]
+        speed = actions[:, 1] * 5 + env.value('plane_minspeed')
+        altitude = actions[:, 2] * 100 + env.value('plane_minaltitude')
+        # Reward of the same maneuver with allowed values
+        expected = env.reward(maneuver, env.value('speed_min'),
+                              env.value('altitude_min'), np.ones(num_envs),
+                              np.ones(num_envs))
+        bad = env.reward(maneuver, speed, altitude, actions[:, 4] + 1,
+                         (actions[:, 7] + 2) * 0.5) < expected
+        penalties += bad.sum()
+        rewards += env.step(actions)[1].sum()
+    nb_steps = nb_steps // num_envs * num_envs
+    return penalties / nb_steps, rewards / nb_steps
+
+
+def make_gymnasium_env(gameplans: list, **kwargs):
+    """PlaytimeEnv with the API of gymnasium, used by stable-baselines3 2
+    and sb3-contrib, kwargs are given to PlaytimeEnv
+
+    Returns
+    -------
+    gymnasium.Env
+        Environment with action_masks
+    """
+    import gymnasium
+
+    class GymnasiumPlaytimeEnv(gymnasium.Env):
+        def __init__(self):
+            self.env = PlaytimeEnv(gameplans, **kwargs)
+            self.observation_space = gymnasium_space(
+                self.env.observation_space)
+            self.action_space = gymnasium_space(self.env.action_space)
+
+        def reset(self, seed=None, options=None):
+            if seed is not None:
+                np.random.seed(seed)
+            return self.copy(self.env.reset(verbose=0)), {}
+
+        def step(self, action):
+            state, reward, done, info = self.env.step(action)
+            return self.copy(state), reward, done, False, info
+
+        @staticmethod
+        def copy(state):
+            return dict(state) if isinstance(state, dict) else state.copy()
+
+        def action_masks(self):
+            return self.env.action_masks()
+
+    return GymnasiumPlaytimeEnv()
+
+
+def steps_to_threshold(gameplans: list, masked: bool, timesteps: int,
+                       threshold: float, seed: int) -> tuple:
+    """Train MaskablePPO, with or without the masks
+
+    Returns
+    -------
+    (int or None, list, float)
+        First timestep with a mean reward of the last 100 episodes above
+        threshold (None if never), mean reward at each rollout, and
+        training time (s)
+    """
+    from sb3_contrib import MaskablePPO
+    from stable_baselines3.common.callbacks import BaseCallback
+    from stable_baselines3.common.monitor import Monitor
+
+    class RewardCallback(BaseCallback):
+        def _on_step(self):
+            return True
+
+        def _on_rollout_end(self):
+            rewards = [info['r'] for info in self.model.ep_info_buffer]
+            if rewards:
+                curve.append((self.num_timesteps, np.mean(rewards)))
+
+    curve = []
+    env = Monitor(make_gymnasium_env(gameplans))
+    model = MaskablePPO("MultiInputPolicy", env, n_steps=512, seed=seed,
+                        verbose=0)
+    start = time.perf_counter()
+    model.learn(total_timesteps=timesteps, callback=RewardCallback(),
+                use_masking=masked)
+    elapsed = time.perf_counter() - start
+    reached = next((step for step, reward in curve if reward >= threshold),
+                   None)
+    return reached, curve, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Action masks")
+    parser.add_argument('--timesteps', type=int, default=12288,
+                        help="Training timesteps of each run")
+    parser.add_argument('--threshold', type=float, default=-8000,
+                        help="Mean episode reward to reach")
+    parser.add_argument('--seeds', type=int, default=1,
+                        help="Number of training runs of each mode")
+    args = parser.parse_args()
+
+    gameplans = notebook_gameplans()
+    start = time.perf_counter()
+    env = PlaytimeEnv(gameplans)
+    print("PlaytimeEnv with the masks of %d gameplans : %.0f ms, valid "
+          "actions per dimension : %.0f%% on average"
+          % (len(gameplans), (time.perf_counter() - start) * 1e3,
+             env.gameplan_masks.mean() * 100))
+    for masked in [False, True]:
+        bad, reward = random_penalties(gameplans, masked, 100000)
+        print("Random actions %-10s : bad action penalties %.1f%% of the "
+              "steps, mean reward %.0f"
+              % ('masked' if masked else 'not masked', bad * 100, reward))
+
+    try:
+        import sb3_contrib  # noqa: F401
+    except ImportError:
+        print("sb3-contrib not installed, no training")
+        return
+    for masked in [False, True]:
+        for seed in range(args.seeds):
+            reached, curve, elapsed = steps_to_threshold(
+                gameplans, masked, args.timesteps, args.threshold, seed)
+            print("MaskablePPO %-10s seed %d : reward %.0f reached at %s "
+                  "timesteps, last mean reward %.0f (%.0f s)"
+                  % ('masked' if masked else 'not masked', seed,
+                     args.threshold, reached, curve[-1][1], elapsed))
+
+
+if __name__ == '__main__':
+    main()
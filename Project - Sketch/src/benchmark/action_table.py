@@ -0,0 +1,105 @@
+import argparse
+import time
+import numpy as np
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+
+"""Build the action tables of the planes of the notebook gameplans, check
+    them against the maneuvers of PlaytimeEnv, and compare the speed of
+    step with and without the tables.
+    Run from src/ with : python -m benchmark.action_table --directory tables
+"""
+
+
+def check(env: PlaytimeEnv, nb_actions: int, seed: int) -> int:
+    """Compare the tables with the maneuvers built by the env on random
+    actions of each type
+
+    Returns
+    -------
+    int
+        Number of actions with a different fuel or time
+    """
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    errors = 0
+    for plane, table in env.action_tables.items():
+        env.plane = plane
+        actions = rng.integers(0, nvec, size=(nb_actions, len(nvec)))
+        values = table.values[table.index(actions)]
+        for action, value in zip(actions, values):
+            try:
+                maneuver = env.build_maneuver(env.action_to_real_space(
+                    dict(zip(env.action_index, action))))
+                expected = env.maneuver_fuel_time(maneuver)
+            except Exception:
+                # Zone too small for the zigzag
+                expected = (np.nan, np.nan)
+            errors += not np.array_equal(value, expected, equal_nan=True)
+    return errors
+
+
+def episodes(env: PlaytimeEnv, actions: np.ndarray, nb_episodes: int):
+    """States of episodes played with the same gameplans and actions
+
+    Returns
+    -------
+    list
+        Fuel and time after each step
+    """
+    np.random.seed(0)
+    states = []
+    for i in range(nb_episodes):
+        env.reset(verbose=0)
+        for action in actions[i]:
+            try:
+                state, _, done, _ = env.step(action.copy())
+            except Exception:
+                # Zone too small for the zigzag
+                continue
+            states.append((state['fuel'], state['time']))
+            if done:
+                break
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build and check the action tables")
+    parser.add_argument('--directory', default='action_tables',
+                        help="Directory of the tables")
+    parser.add_argument('--actions', type=int, default=20000,
+                        help="Number of random actions checked by plane")
+    parser.add_argument('--episodes', type=int, default=2000,
+                        help="Number of episodes played in each mode")
+    args = parser.parse_args()
+
+    gameplans = notebook_gameplans()
+    start = time.perf_counter()
+    tables = PlaytimeEnv(gameplans, action_tables=args.directory)
+    print("Tables : %s (%.2f s)" % (', '.join(
+        '%s %d rows' % (t.path, len(t))
+        for t in tables.action_tables.values()),
+        time.perf_counter() - start))
+    print("Different from the maneuvers : %d / %d" % (
+        check(tables, args.actions, 0),
+        args.actions * len(tables.action_tables)))
+
+    computed = PlaytimeEnv(gameplans)
+    rng = np.random.default_rng(1)
+    nvec = computed.action_space.nvec
+    actions = rng.integers(0, nvec, size=(args.episodes, 20, len(nvec)))
+    elapsed = {}
+    states = {}
+    for name, env in [('computed', computed), ('table', tables)]:
+        start = time.perf_counter()
+        states[name] = episodes(env, actions, args.episodes)
+        elapsed[name] = (time.perf_counter() - start) / len(states[name])
+        print("%-8s : %.1f µs per step" % (name, elapsed[name] * 1e6))
+    print("Same states : %s, x%.1f"
+          % (states['computed'] == states['table'],
+             elapsed['computed'] / elapsed['table']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import timeit
+import numpy as np
+from objects.Plane import Plane
+from function.tools import get_curve_value_alt
+
+"""Microbenchmark for get_curve_value_alt.
+    Run from src/ with : python -m benchmark.altitude_curve
+"""
+
+
+def legacy_curve_value_alt(altitude: int, plane: Plane) -> float:
+    """Former implementation, a new table is built at every call.
+
+    Parameters
+    ----------
+    altitude : int
+        Altitude (feet)
+    plane : Plane
+        Object plane (for min and max altitude)
+
+    Returns
+    -------
+    float
+        Ratio according to the curve of the altitude
+    """
+    alt = np.asarray(altitude - plane.MINALTITUDE, dtype=np.int32)
+    f = np.linspace(0.90, 1.10, plane.MAXALTITUDE - plane.MINALTITUDE)
+    return f[alt]
+
+
+def time_per_call(func, number: int = 20000, repeat: int = 5) -> float:
+    """Best time for one call of func, in microseconds
+
+    Parameters
+    ----------
+    func : function
+        Function without parameters to time
+    number : int, optional
+        Number of calls for each measure, by default 20000
+    repeat : int, optional
+        Number of measures, by default 5
+
+    Returns
+    -------
+    float
+        Time per call (µs)
+    """
+    best = min(timeit.repeat(func, number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def main():
+    plane = Plane()
+    altitudes = np.arange(plane.MINALTITUDE, plane.MAXALTITUDE, 100)
+
+    # Both implementations have to give the same values on the table
+    legacy = np.array([legacy_curve_value_alt(a, plane) for a in altitudes])
+    assert np.array_equal(legacy, get_curve_value_alt(altitudes, plane))
+
+    before = time_per_call(lambda: legacy_curve_value_alt(8300, plane))
+    after = time_per_call(lambda: get_curve_value_alt(8300, plane))
+    batch = time_per_call(lambda: get_curve_value_alt(altitudes, plane),
+                          number=2000)
+    print("Scalar, before : %.3f µs / call" % before)
+    print("Scalar, after  : %.3f µs / call (x%.1f)" % (after, before / after))
+    print("Array of %d altitudes, after : %.3f µs / call"
+          % (len(altitudes), batch))
+
+
+if __name__ == '__main__':
+    main()
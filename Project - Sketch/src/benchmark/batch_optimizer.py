@@ -0,0 +1,92 @@
+import argparse
+import time
+import numpy as np
+from function.batch_optimizer import optimize_wheels, wheel_losses
+from gymenv.evaluation import notebook_gameplans
+from objects.AllManeuvers import *
+
+"""Wheels of many (fuel, time) targets found by optimize_wheels, against
+    one scipy minimize (Powell) for each target, and precomputation of the
+    wheels of a grid of targets.
+    Run from src/ with : python -m benchmark.batch_optimizer
+    --output wheels.npz to save the grid
+"""
+
+
+def scipy_wheels(fuel_target, time_target, wheels, plane: Plane) -> tuple:
+    """One Powell minimization for each target, same loss and bounds as
+    optimize_wheels
+
+    Returns
+    -------
+    (np.ndarray, float)
+        Loss for each target and time per target (s)
+    """
+    from scipy.optimize import minimize
+    bounds = ((plane.MINSPEED, plane.MAXSPEED),
+              (plane.MINALTITUDE, plane.MAXALTITUDE),
+              (RADIUS_MIN_WHEEL, RADIUS_MAX_WHEEL))
+    x0 = [(lo + hi) / 2 for lo, hi in bounds]
+    losses = []
+    start = time.perf_counter()
+    for fuel, duration, nb in zip(fuel_target, time_target, wheels):
+        def J(x):
+            return float(wheel_losses(np.asarray(x), fuel, duration, plane,
+                                      wheels=nb)[0])
+        losses.append(minimize(J, x0, method='Powell', bounds=bounds).fun)
+    return np.array(losses), (time.perf_counter() - start) / len(losses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch wheel optimizer")
+    parser.add_argument('--targets', type=int, default=10000,
+                        help="Number of random targets")
+    parser.add_argument('--scipy', type=int, default=50,
+                        help="Number of targets solved with scipy")
+    parser.add_argument('--output', type=str, default=None,
+                        help="Save the wheels of the grid of targets")
+    args = parser.parse_args()
+
+    plane = Plane()
+    rng = np.random.default_rng(0)
+    fuel_target = rng.uniform(5, 120, args.targets)
+    time_target = rng.uniform(300, 3600, args.targets)
+    start = time.perf_counter()
+    result = optimize_wheels(fuel_target, time_target, plane)
+    elapsed = time.perf_counter() - start
+    print("%d targets : %.2f s (%.1f µs per target), %.1f iterations, "
+          "loss median %.2e" % (args.targets, elapsed,
+                                elapsed / args.targets * 1e6,
+                                result['iterations'].mean(),
+                                np.median(result['loss'])))
+
+    try:
+        n = args.scipy
+        losses, per_target = scipy_wheels(fuel_target[:n], time_target[:n],
+                                          result['wheels'][:n], plane)
+        batch = result['loss'][:n]
+        print("scipy Powell, %d targets : %.1f ms per target, loss median "
+              "%.2e (batch %.2e), batch better or equal : %d/%d"
+              % (n, per_target * 1e3, np.median(losses), np.median(batch),
+                 np.sum(batch <= losses + 1e-9), n))
+    except ImportError:
+        print("scipy not installed, no comparison")
+
+    # Grid of the targets of the gameplans (FuelAvailable, TimeMin)
+    gameplans = notebook_gameplans()
+    fuel = np.arange(5, max(gp['FuelAvailable'] for gp in gameplans) + 1)
+    duration = np.arange(0, max(gp['TimeMin'] for gp in gameplans) + 1, 60)
+    fuel, duration = np.meshgrid(fuel, duration, indexing='ij')
+    start = time.perf_counter()
+    grid = optimize_wheels(fuel, duration, plane, starts=4)
+    print("Grid of %d targets, 4 starts : %.2f s, loss median %.2e"
+          % (fuel.size, time.perf_counter() - start,
+             np.median(grid['loss'])))
+    if args.output is not None:
+        np.savez(args.output, fuel_target=fuel, time_target=duration,
+                 **grid)
+        print("Saved in %s" % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import numpy as np
+from benchmark.altitude_curve import time_per_call
+from benchmark.suite import MANEUVER_ARGS
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+from objects.AllManeuvers import *
+from objects.ManeuverBatch import ManeuverBatch
+from objects.Plane import VOL_DES_AIGLES_CONSUMPTION, cubic_spline
+
+"""Check of the measured consumption table of Plane against the cubic
+    interpolation of src/test_conso.ipynb, and speed of the lookup
+    against the formula.
+    Run from src/ with : python -m benchmark.consumption
+"""
+
+
+def step_time(plane: Plane, nb_steps: int = 20000) -> float:
+    """Time per step of PlaytimeEnv with random actions, gameplans of the
+    notebook with the plane
+
+    Returns
+    -------
+    float
+        Time per step (µs)
+    """
+    gameplans = [dict(gp, Plane=plane) for gp in notebook_gameplans()]
+    env = PlaytimeEnv(gameplans)
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, env.action_space.nvec,
+                           size=(nb_steps, len(env.action_space.nvec)))
+    np.random.seed(0)
+    env.reset(verbose=0)
+
+    def play():
+        for action in actions:
+            if env.step(action)[2]:
+                env.reset(verbose=0)
+    return time_per_call(play, number=1, repeat=3) / nb_steps
+
+
+def main():
+    formula = Plane()
+    table = Plane(consumption_table=VOL_DES_AIGLES_CONSUMPTION)
+    points = np.array(VOL_DES_AIGLES_CONSUMPTION, dtype=np.float64)
+    speeds = np.arange(points[0, 0], points[-1, 0] + 0.005, 0.01)
+
+    # Curve of the notebook, scipy is only needed for this check
+    try:
+        from scipy.interpolate import interp1d
+        expected = interp1d(points[:, 0], points[:, 1], kind='cubic')(speeds)
+        print("Spline - scipy interp1d : max %.2e l/h" % np.max(np.abs(
+            cubic_spline(points[:, 0], points[:, 1], speeds) - expected)))
+    except ImportError:
+        expected = cubic_spline(points[:, 0], points[:, 1], speeds)
+        print("scipy not installed, grid compared to the spline")
+    grid = table.get_speed_consumption_rate(speeds) * 3600
+    print("Grid - cubic curve : max %.2e l/h" % np.max(np.abs(
+        grid - expected)))
+    scalar = np.array([table.get_speed_consumption_rate(s)
+                       for s in speeds.tolist()]) * 3600
+    print("Scalars same as arrays : %s" % np.array_equal(scalar, grid))
+
+    # Batch and objects use the same lookup
+    errors = 0
+    for maneuver in LIST_MAN:
+        obj = maneuver(*MANEUVER_ARGS[maneuver](table))
+        batch = ManeuverBatch(
+            obj.name.value, obj.meanspeed, obj.altitude,
+            getattr(obj, 'gap', 0), getattr(obj, 'length', 0),
+            getattr(obj, 'width', 0), getattr(obj, 'radius', 0), table)
+        errors += (batch.total_fuel_consumption() !=
+                   obj.total_fuel_consumption())
+    print("ManeuverBatch different from the maneuvers : %d" % errors)
+
+    array = np.random.default_rng(0).uniform(140, 220, 100000)
+    for name, plane in [('formula', formula), ('table', table)]:
+        print("%-8s : scalar %.3f µs, 100000 speeds %.0f µs, "
+              "fuel_consumption_rate %.3f µs, step %.1f µs" % (
+                  name,
+                  time_per_call(
+                      lambda: plane.get_speed_consumption_rate(183.0)),
+                  time_per_call(
+                      lambda: plane.get_speed_consumption_rate(array),
+                      number=20),
+                  time_per_call(
+                      lambda: fuel_consumption_rate(183, 3000, plane)),
+                  step_time(plane)))
+
+
+if __name__ == '__main__':
+    main()
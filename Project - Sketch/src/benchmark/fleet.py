@@ -0,0 +1,88 @@
+import argparse
+import time
+import numpy as np
+from benchmark.vec_env import compare
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.VecPlaytimeEnv import VecPlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+from objects.Fleet import Fleet
+from objects.ManeuverBatch import ManeuverBatch, fleet_fuel_time
+from objects.Plane import VOL_DES_AIGLES_CONSUMPTION, Plane
+
+"""Fuel and time of maneuvers for a fleet of plane variants in one
+    batch, against one batch for each plane, and PlaytimeEnv with the
+    gameplans of many planes.
+    Run from src/ with : python -m benchmark.fleet
+"""
+
+
+def variants(nb_planes: int, seed: int) -> Fleet:
+    """Random variants of the default plane, one of them with the
+    measured consumption table
+
+    Returns
+    -------
+    Fleet
+        nb_planes planes
+    """
+    rng = np.random.default_rng(seed)
+    fleet = Fleet.from_columns(
+        fuel_max=rng.integers(80, 200, nb_planes - 1),
+        fuel_consumption_rate=rng.uniform(0.002, 0.005, nb_planes - 1),
+        S_min=rng.integers(120, 150, nb_planes - 1),
+        S_max=rng.integers(200, 260, nb_planes - 1),
+        MAXALTITUDE=rng.integers(12000, 20000, nb_planes - 1))
+    return Fleet(fleet.planes + [
+        Plane('Measured', consumption_table=VOL_DES_AIGLES_CONSUMPTION)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet benchmarks")
+    parser.add_argument('--planes', type=int, default=300,
+                        help="Number of plane variants")
+    parser.add_argument('--maneuvers', type=int, default=1000,
+                        help="Number of maneuvers")
+    args = parser.parse_args()
+
+    fleet = variants(args.planes, 0)
+    rng = np.random.default_rng(1)
+    n = args.maneuvers
+    maneuvers = (rng.integers(1, 5, n), rng.integers(140, 220, n),
+                 rng.integers(300, 12000, n), rng.integers(1, 3, n),
+                 rng.integers(15, 30, n), rng.integers(15, 30, n),
+                 rng.integers(2, 6, n) * 0.5)
+
+    for nb_maneuvers in [10, args.maneuvers]:
+        sample = tuple(m[:nb_maneuvers] for m in maneuvers)
+        start = time.perf_counter()
+        fuel, duration = fleet_fuel_time(*sample, fleet)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        batches = [ManeuverBatch(*sample, plane) for plane in fleet.planes]
+        loop = [(b.total_fuel_consumption(), b.travelled_time())
+                for b in batches]
+        loop_elapsed = time.perf_counter() - start
+        errors = sum(
+            not np.array_equal(f, fuel[:, j], equal_nan=True) or
+            not np.array_equal(t, duration[:, j], equal_nan=True)
+            for j, (f, t) in enumerate(loop))
+        print("%d maneuvers x %d planes : fleet %.1f ms, one batch per "
+              "plane %.1f ms, different planes : %d"
+              % (nb_maneuvers, len(fleet), elapsed * 1e3,
+                 loop_elapsed * 1e3, errors))
+
+    # Gameplans of the notebook, the plane is drawn in the fleet
+    gameplans = [dict(gp, Plane=fleet[i % len(fleet)]) for i, gp in
+                 enumerate(notebook_gameplans())]
+    start = time.perf_counter()
+    env = PlaytimeEnv(gameplans)
+    print("PlaytimeEnv with %d planes : %.0f ms, action space %s"
+          % (len(env.plane_index), (time.perf_counter() - start) * 1e3,
+             env.action_space.nvec.tolist()))
+    vec_env = VecPlaytimeEnv(gameplans, 256, seed=0)
+    print("VecPlaytimeEnv different rewards or dones : %d"
+          % compare(vec_env, 0, 50))
+
+
+if __name__ == '__main__':
+    main()
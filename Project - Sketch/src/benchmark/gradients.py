@@ -0,0 +1,190 @@
+import contextlib
+import io
+import time
+import numpy as np
+from benchmark.suite import MANEUVER_ARGS
+from function.j_methods import LossFunction
+from objects.AllManeuvers import *
+from objects.Fleet import Fleet
+from objects.ManeuverBatch import ManeuverBatch
+from objects.Plane import CONSUMPTION_GRID_STEP, VOL_DES_AIGLES_CONSUMPTION
+
+"""Analytic derivatives of fuel and time against finite differences, and
+    scipy minimize of the LossFunction objectives with and without jac.
+    Run from src/ with : python -m benchmark.gradients
+"""
+
+# Steps of the finite differences of the maneuvers (GRADIENT_PARAMETERS)
+STEPS = np.array([1e-4, 1e-2, 1e-6, 1e-6, 1e-6, 1e-6])
+
+
+def central_difference(func, x, h) -> np.ndarray:
+    """Central finite difference of func at x
+
+    Returns
+    -------
+    np.ndarray
+        (func(x + h) - func(x - h)) / 2h
+    """
+    return (func(x + h) - func(x - h)) / (2 * h)
+
+
+def relative_error(value, expected) -> float:
+    """Max difference relative to the largest expected value
+
+    Returns
+    -------
+    float
+        Relative error
+    """
+    return np.max(np.abs(value - expected)) / max(np.max(np.abs(expected)),
+                                                  1e-12)
+
+
+def unrounded_fuel_time(batch: ManeuverBatch) -> np.ndarray:
+    """Fuel consumption and time of the travel plans without the rounding
+    to 0.01, derivatives of the rounded values are 0
+
+    Returns
+    -------
+    np.ndarray
+        Fuel consumption (liters) and travelled time (seconds)
+    """
+    distance = batch.leg_distance.copy()
+    distance[..., 0] = np.select(
+        [batch.wheel, batch.show_of_force, batch.spiral, batch.zigzag],
+        [2 * pi * batch.radius, STRAIGHT_LINE_SF, batch.spiral_distance(),
+         batch.zigzag_distance()])
+    time = distance / (batch.leg_speed / 3600)
+    fuel = fuel_consumption_rate(batch.leg_speed, batch.leg_altitude,
+                                 batch.leg_plane) * time
+    return np.stack([fuel.sum(axis=-1), time.sum(axis=-1)])
+
+
+def random_batch(n: int, plane, seed: int = 0) -> list:
+    """Parameters of n random maneuvers of every type
+
+    Returns
+    -------
+    list
+        Arguments of ManeuverBatch without the plane
+    """
+    rng = np.random.default_rng(seed)
+    return [rng.integers(1, 5, n), rng.uniform(145, 215, n),
+            rng.uniform(500, 15000, n), rng.uniform(0.5, 2, n),
+            rng.uniform(15, 30, n), rng.uniform(15, 30, n),
+            rng.uniform(1, 2.5, n)]
+
+
+def main():
+    plane = Plane()
+    table = Plane(consumption_table=VOL_DES_AIGLES_CONSUMPTION)
+    rng = np.random.default_rng(0)
+    # Speeds inside the steps of the measured consumption grid
+    speeds = 140 + CONSUMPTION_GRID_STEP * (
+        rng.integers(0, 160, 1000) + rng.uniform(0.1, 0.9, 1000))
+    altitudes = rng.uniform(400, 16000, 1000)
+
+    # Pieces without rounding
+    for name, p in [('formula', plane), ('table', table)]:
+        print("%-8s speed slope : %.1e, altitude slope : %.1e, rate "
+              "gradient : %.1e, %.1e" % (
+                  name,
+                  relative_error(p.get_speed_consumption_slope(speeds),
+                                 central_difference(
+                                     p.get_speed_consumption_rate,
+                                     speeds, 1e-4)),
+                  relative_error(p.get_altitude_ratio_slope(altitudes),
+                                 central_difference(p.get_altitude_ratio,
+                                                    altitudes, 1e-2)),
+                  relative_error(
+                      fuel_consumption_rate_gradient(speeds, altitudes,
+                                                     p)[0],
+                      central_difference(lambda s: fuel_consumption_rate(
+                          s, altitudes, p), speeds, 1e-4)),
+                  relative_error(
+                      fuel_consumption_rate_gradient(speeds, altitudes,
+                                                     p)[1],
+                      central_difference(lambda a: fuel_consumption_rate(
+                          speeds, a, p), altitudes, 1e-2))))
+    length = rng.uniform(15, 30, 1000)
+    gap = rng.uniform(0.5, 2, 1000)
+    d_gap, d_length = Spiral.calculate_distance_gradient(length, gap)
+    print("Spiral distance : gap %.1e, length %.1e" % (
+        relative_error(d_gap, central_difference(
+            lambda g: Spiral.calculate_distance(length, g), gap, 1e-6)),
+        relative_error(d_length, central_difference(
+            lambda s: Spiral.calculate_distance(s, gap), length, 1e-6))))
+
+    # Maneuvers, the number of pass through of a zigzag must not change
+    # between the two points
+    fleet = Fleet([plane, table])
+    for name, p in [('formula', plane), ('table', table),
+                    ('fleet', fleet.take(rng.integers(0, 2, 1000)))]:
+        args = random_batch(1000, p)
+        batch = ManeuverBatch(*args, p)
+        fuel_gradient = batch.total_fuel_consumption_gradient()
+        time_gradient = batch.travelled_time_gradient()
+        errors = []
+        for k, h in enumerate(STEPS):
+            def fuel_time(x):
+                moved = list(args)
+                moved[k + 1] = x
+                return unrounded_fuel_time(ManeuverBatch(*moved, p))
+            expected = central_difference(fuel_time, args[k + 1], h)
+            width, gap = args[5], args[3]
+            same = (ZigZag.nb_pass(width + h * (k == 4), gap + h * (k == 2))
+                    == ZigZag.nb_pass(width - h * (k == 4),
+                                      gap - h * (k == 2)))
+            errors.append("%s %.0e/%.0e" % (
+                GRADIENT_PARAMETERS[k],
+                relative_error(fuel_gradient[same, k], expected[0, same]),
+                relative_error(time_gradient[same, k], expected[1, same])))
+        print("%-8s fuel/time : %s" % (name, ', '.join(errors)))
+
+    # Objects and batch
+    differences = 0
+    for maneuver in LIST_MAN:
+        obj = maneuver(*MANEUVER_ARGS[maneuver](table))
+        batch = ManeuverBatch(
+            obj.name.value, obj.meanspeed, obj.altitude,
+            getattr(obj, 'gap', 0), getattr(obj, 'length', 0),
+            getattr(obj, 'width', 0), getattr(obj, 'radius', 0), table)
+        differences += not np.allclose(
+            batch.total_fuel_consumption_gradient(),
+            obj.total_fuel_consumption_gradient(), rtol=1e-12, atol=0)
+        differences += not np.allclose(batch.travelled_time_gradient(),
+                                       obj.travelled_time_gradient(),
+                                       rtol=1e-12, atol=0)
+    print("Maneuver gradients different from the batch : %d" % differences)
+
+    try:
+        from scipy.optimize import minimize
+    except ImportError:
+        print("scipy not installed, no minimization")
+        return
+    bounds = ((plane.MINSPEED, plane.MAXSPEED),
+              (plane.MINALTITUDE, plane.MAXALTITUDE),
+              (RADIUS_MIN_WHEEL, RADIUS_MAX_WHEEL))
+    x0 = [180, 2000, 3]
+    for c0, c1 in [(2, 400), (3, 600), (1.5, 300)]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            loss = LossFunction(c0, c1, 0)
+        for time_nb in [1, 2, 3]:
+            results = []
+            for jac in [None, loss.choose_jac(time_nb)]:
+                start = time.perf_counter()
+                result = minimize(loss.choose_J(time_nb), x0, jac=jac,
+                                  method='L-BFGS-B', bounds=bounds)
+                # Each call of J or jac builds a wheel. Rounding to 0.01
+                # makes the finite differences of J zero
+                results.append("J %.3g, %d wheels, %.1f ms" % (
+                    result.fun, result.nfev + (0 if jac is None else
+                                               result.njev),
+                    (time.perf_counter() - start) * 1e3))
+            print("c0 %g c1 %d J %d : finite differences %s | jac %s" % (
+                c0, c1, time_nb, *results))
+
+
+if __name__ == '__main__':
+    main()
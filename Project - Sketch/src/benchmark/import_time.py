@@ -0,0 +1,82 @@
+import argparse
+import os
+import subprocess
+import sys
+
+"""Import time budget of the environment and physics modules.
+    Each module is imported in a new interpreter, the check fails if the
+    import is above the budget or loads a plotting / ML library.
+    Run from src/ with : python -m benchmark.import_time
+"""
+
+# Modules used by every training or evaluation process
+MODULES = ['gymenv.PlaytimeEnv', 'objects.AllManeuvers',
+           'objects.ManeuverBatch']
+
+# Libraries which must not be imported by those modules
+FORBIDDEN = ['matplotlib', 'seaborn', 'scipy', 'pandas', 'sklearn',
+             'torch', 'stable_baselines3']
+
+# Default budget for the import of one module (seconds)
+BUDGET = 0.6
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {forbidden!r} if m in sys.modules]
+print(elapsed, ','.join(loaded), sep='|')
+"""
+
+
+def import_time(module: str, repeat: int = 5) -> tuple:
+    """Best import time of a module in a new interpreter
+
+    Parameters
+    ----------
+    module : str
+        Name of the module
+    repeat : int, optional
+        Number of interpreters, by default 5
+
+    Returns
+    -------
+    (float, list)
+        Best import time (seconds) and forbidden libraries loaded
+    """
+    here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = CHILD.format(module=module, forbidden=FORBIDDEN)
+    best = None
+    loaded = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], cwd=here,
+                             capture_output=True, text=True, check=True)
+        elapsed, libs = out.stdout.strip().splitlines()[-1].split('|')
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+        loaded = [lib for lib in libs.split(',') if lib]
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time budget")
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help="Max import time of a module (seconds)")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        elapsed, loaded = import_time(module, args.repeat)
+        status = "OK"
+        if elapsed > args.budget or loaded:
+            status = "FAIL"
+            failed = True
+        print("%-25s %7.3f s %s %s" % (module, elapsed, status,
+                                       ' '.join(loaded)))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
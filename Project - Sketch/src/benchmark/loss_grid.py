@@ -0,0 +1,76 @@
+import argparse
+import contextlib
+import io
+import time
+import tracemalloc
+import numpy as np
+from function.j_methods import LossFunction
+
+"""Loss landscapes of function.j_methods computed by evaluate_grid,
+    against the former nested loops over the scalar J functions, and
+    memory of a large grid.
+    Run from src/ with : python -m benchmark.loss_grid
+"""
+
+
+def nested_loops(method, X, Y, Z) -> list:
+    """Former J_to_compute_noZ : one scalar J for each point
+
+    Returns
+    -------
+    list
+        Rows of losses
+    """
+    res = []
+    for i, row in enumerate(list(zip(X, Y))):
+        x, y = row
+        res.append([])
+        for xi, yi, zi in zip(x, y, Z):
+            res[i].append(method([xi, yi, zi]))
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loss landscapes")
+    parser.add_argument('--size', type=int, nargs=3,
+                        default=[200, 200, 50],
+                        help="Points of speed, altitude and radius of "
+                             "the large grid")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        loss = LossFunction(20, 1800, 0)
+    speed = np.linspace(140, 220, 40)
+    altitude = np.linspace(300, 16000, 40)
+    radius = np.linspace(1, 2.5, 40)
+    X, Y = np.meshgrid(speed, altitude)
+    for time_nb in [1, 2, 3]:
+        start = time.perf_counter()
+        expected = nested_loops(loss.choose_J(time_nb), X, Y, radius)
+        loops = time.perf_counter() - start
+        start = time.perf_counter()
+        grid = loss.J_to_compute_except(X, Y, radius, 3, time_nb)
+        elapsed = time.perf_counter() - start
+        print("J %d, 40x40 : same as the loops : %s, loops %.0f ms, "
+              "grid %.1f ms" % (time_nb, np.array_equal(expected, grid),
+                                loops * 1e3, elapsed * 1e3))
+
+    # Open grid : only the 1D axes are stored, points are made by chunks
+    axes = [np.linspace(140, 220, args.size[0]),
+            np.linspace(300, 16000, args.size[1]),
+            np.linspace(1, 2.5, args.size[2])]
+    X, Y, Z = np.ix_(*axes)
+    tracemalloc.start()
+    start = time.perf_counter()
+    grid = loss.J_grid(X, Y, Z, 2)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("Grid %s : %.1f s (%.2f µs per point), result %.0f MB, "
+          "peak %.0f MB" % ('x'.join(map(str, args.size)), elapsed,
+                            elapsed / grid.size * 1e6, grid.nbytes / 1e6,
+                            peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import argparse
+import time
+import numpy as np
+from benchmark.action_masks import make_gymnasium_env
+from benchmark.altitude_curve import time_per_call
+from benchmark.vec_env import random_actions
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.VecPlaytimeEnv import VecPlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+
+"""Box observation mode of PlaytimeEnv against the Dict mode : same
+    values, time of the steps, size of the policy input and training
+    speed of PPO (MultiInputPolicy against MlpPolicy).
+    Run from src/ with : python -m benchmark.observation
+"""
+
+
+def play(env, actions: np.ndarray, seed: int) -> list:
+    """Observations returned by the steps of env, after a reset with
+    np.random.seed(seed), episodes are reset when they are done
+
+    Returns
+    -------
+    list
+        Observation of each step, copied
+    """
+    np.random.seed(seed)
+    env.reset(verbose=0)
+    observations = []
+    for action in actions:
+        obs, _, done, _ = env.step(action)
+        observations.append(obs.copy())
+        if done:
+            env.reset(verbose=0)
+    return observations
+
+
+def same_values(env: PlaytimeEnv, vector: np.ndarray, state: dict) -> bool:
+    """Check a vector of the box mode against the state of the Dict mode
+
+    Returns
+    -------
+    bool
+        One-hot encodings and normalized values are the same
+    """
+    for key, offset, size, scale in env.observation_layout:
+        if scale is None:
+            if (vector[offset:offset + size].argmax() != state[key] or
+                    vector[offset:offset + size].sum() != 1):
+                return False
+        elif abs(vector[offset] - min(state[key] * scale, 1)) > 1e-6:
+            return False
+    return True
+
+
+def different_observations(gameplans: list, nb_steps: int) -> int:
+    """Step PlaytimeEnv in each mode and VecPlaytimeEnv in box mode with
+    the same actions
+
+    Returns
+    -------
+    int
+        Number of steps with different observations
+    """
+    env = PlaytimeEnv(gameplans)
+    box_env = PlaytimeEnv(gameplans, observation='box')
+    vec_env = VecPlaytimeEnv(gameplans, 1, seed=0, observation='box')
+    actions = random_actions(vec_env, nb_steps, 1, 0)[:, 0]
+    states = play(env, actions, 0)
+    vectors = play(box_env, actions, 0)
+    vec_env.reset()
+    errors = 0
+    for action, state, vector in zip(actions, states, vectors):
+        obs, _, dones, infos = vec_env.step(action[None])
+        if dones[0]:
+            obs = infos[0]['terminal_observation'][None]
+        errors += (not same_values(box_env, vector, state) or
+                   not np.array_equal(vector, obs[0]))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Box observations")
+    parser.add_argument('--timesteps', type=int, default=4096,
+                        help="Training timesteps of PPO in each mode")
+    args = parser.parse_args()
+
+    gameplans = notebook_gameplans()
+    print("Different observations : %d / 20000"
+          % different_observations(gameplans, 20000))
+    for mode in ['dict', 'box']:
+        env = PlaytimeEnv(gameplans, observation=mode)
+        actions = random_actions(env, 20000, 1, 0)[:, 0]
+
+        def steps():
+            np.random.seed(0)
+            env.reset(verbose=0)
+            for action in actions:
+                if env.step(action)[2]:
+                    env.reset(verbose=0)
+        print("%-4s : step %.1f µs, observation %s"
+              % (mode, time_per_call(steps, number=1, repeat=3) /
+                 len(actions), env.observation_space))
+
+    try:
+        from stable_baselines3 import PPO
+    except ImportError:
+        print("stable-baselines3 not installed, no policy")
+        return
+    for mode, policy in [('dict', 'MultiInputPolicy'), ('box', 'MlpPolicy')]:
+        env = make_gymnasium_env(gameplans, observation=mode)
+        model = PPO(policy, env, n_steps=512, seed=0, verbose=0)
+        obs, _ = env.reset(seed=0)
+        features = model.policy.features_extractor.features_dim
+        parameters = sum(p.numel() for p in model.policy.parameters())
+        predict = time_per_call(lambda: model.predict(obs), number=200)
+        start = time.perf_counter()
+        model.learn(total_timesteps=args.timesteps)
+        elapsed = time.perf_counter() - start
+        print("%-16s : %d input features, %d parameters, predict %.0f µs, "
+              "learn %.0f steps/s" % (policy, features, parameters,
+                                      predict, args.timesteps / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import time
+import numpy as np
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+from gymenv.planner import Planner
+
+"""Check the plans of gymenv.planner by playing them in PlaytimeEnv, and
+    their optimality against a breadth-first search on a few actions.
+    Run from src/ with : python -m benchmark.planner
+"""
+
+
+def replay(env: PlaytimeEnv, gameplan: int, actions: np.ndarray) -> tuple:
+    """Play a plan in the env
+
+    Returns
+    -------
+    (int, bool)
+        Reward of the last step, and if the episode is done at the last
+        step and not before
+    """
+    env.reset(verbose=0, gameplan=gameplan)
+    for i, action in enumerate(actions):
+        _, reward, done, _ = env.step(action.copy())
+        if done != (i == len(actions) - 1):
+            return reward, False
+    return reward, True
+
+
+def few_actions(env: PlaytimeEnv, per_type: int, seed: int) -> np.ndarray:
+    """Random actions which are never penalized by the reward : speed in
+    [170, 210], altitude below 6500, radius 1 for the wheels
+
+    Returns
+    -------
+    np.ndarray
+        per_type actions for each type of maneuver
+    """
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    actions = []
+    for k in range(len(env.maneuvers_index)):
+        action = rng.integers(0, nvec, size=(per_type, len(nvec)))
+        action[:, 0] = k
+        action[:, 1] = rng.integers(6, 15, size=per_type)
+        action[:, 2] = rng.integers(0, 62, size=per_type)
+        action[:, 7] = 0
+        # Zones big enough for a zigzag
+        action[:, 6] = np.maximum(action[:, 6], action[:, 4] + 1)
+        actions.append(action)
+    return np.concatenate(actions)
+
+
+def breadth_first(env: PlaytimeEnv, gameplan: int,
+                  actions: np.ndarray) -> tuple:
+    """Best last reward and number of steps of the feasible plans, by
+    playing every sequence of actions in the env (same states merged)
+
+    Returns
+    -------
+    (int, int) or None
+        Reward of the last step and number of steps
+    """
+    env.reset(verbose=0, gameplan=gameplan)
+    fuel_available = env.fuel
+    best = None
+    layer = {((), 0, 0)}
+    steps = 0
+    while layer:
+        steps += 1
+        following = set()
+        for counts, fuel, duration in layer:
+            for action in actions:
+                env.state = dict(env.state, fuel=fuel, time=duration)
+                env.maneuver_count = dict(counts)
+                _, reward, done, _ = env.step(action.copy())
+                if not done:
+                    following.add((tuple(sorted(
+                        env.maneuver_count.items(),
+                        key=lambda m: m[0].value)),
+                        env.state['fuel'], env.state['time']))
+                elif env.state['fuel'] <= fuel_available and (
+                        best is None or reward > best[0]):
+                    best = (reward, steps)
+        layer = following
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the planner")
+    parser.add_argument('--gameplans', type=int, default=300,
+                        help="Number of gameplans planned")
+    parser.add_argument('--checks', type=int, default=30,
+                        help="Number of gameplans checked by "
+                             "breadth-first search")
+    args = parser.parse_args()
+
+    gameplans = notebook_gameplans()
+    env = PlaytimeEnv(gameplans)
+    rng = np.random.default_rng(0)
+
+    # Optimality on a few actions, small fuel to keep the search short
+    actions = few_actions(env, 2, 0)
+    planner = Planner(env, actions)
+    small = [i for i, gp in enumerate(gameplans)
+             if gp['FuelAvailable'] <= 20]
+    errors = 0
+    for i in rng.choice(small, args.checks, replace=False).tolist():
+        plan = planner.plan(i)
+        expected = breadth_first(env, i, actions)
+        found = None if plan is None else (plan['reward'],
+                                           len(plan['actions']))
+        errors += found != expected
+    print("Different from breadth-first search : %d / %d"
+          % (errors, args.checks))
+
+    # Every action : plans played in the env
+    planner = Planner(env)
+    index = rng.choice(len(gameplans), args.gameplans,
+                       replace=False).tolist()
+    elapsed = []
+    rewards = []
+    errors = 0
+    for i in index:
+        start = time.perf_counter()
+        plan = planner.plan(i)
+        elapsed.append(time.perf_counter() - start)
+        reward, ok = replay(env, i, plan['actions'])
+        errors += (not ok) or reward != plan['reward']
+        rewards.append(reward)
+    elapsed = np.array(elapsed) * 1e3
+    print("Plans different from the env : %d / %d" % (errors, len(index)))
+    print("Last reward : mean %.0f, min %d"
+          % (np.mean(rewards), np.min(rewards)))
+    print("Time per plan : median %.1f ms, 90%% %.1f ms, max %.0f ms "
+          "(tables included)" % (np.median(elapsed),
+                                 np.percentile(elapsed, 90),
+                                 elapsed.max()))
+
+
+if __name__ == '__main__':
+    main()
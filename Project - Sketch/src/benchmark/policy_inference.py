@@ -0,0 +1,78 @@
+import argparse
+import time
+import numpy as np
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.VecPlaytimeEnv import VecPlaytimeEnv
+from gymenv.evaluation import load_policy, notebook_gameplans, run_batched
+
+"""Decisions per second of a policy when K episodes are in flight and
+    their actions are predicted at once, against the loop of
+    ReinforcementLearning.ipynb (one PlaytimeEnv, one predict per step).
+    K=1 is played one by one by run_batched (see run_episodes).
+    Run from src/ with : python -m benchmark.policy_inference ppo:model
+"""
+
+
+def notebook_loop(env: PlaytimeEnv, policy, nb_decisions: int) -> float:
+    """Decisions per second of the notebook loop
+
+    Returns
+    -------
+    float
+        Number of steps per second
+    """
+    obs = env.reset(verbose=0)
+    start = time.perf_counter()
+    for _ in range(nb_decisions):
+        if policy is None:
+            action = env.action_space.sample()
+        else:
+            action, _ = policy.predict(obs)
+        obs, _, done, _ = env.step(action)
+        if done:
+            obs = env.reset(verbose=0)
+    return nb_decisions / (time.perf_counter() - start)
+
+
+def batched(gameplans: list, policy, num_envs: int,
+            nb_decisions: int) -> float:
+    """Decisions per second of run_batched with num_envs episodes
+    in flight
+
+    Returns
+    -------
+    float
+        Number of steps per second, all episodes included
+    """
+    vec_env = VecPlaytimeEnv(gameplans, num_envs, seed=0)
+    # About 3.3 steps per episode with an untrained policy
+    nb_episodes = max(nb_decisions // 4, num_envs)
+    start = time.perf_counter()
+    columns = run_batched(vec_env, policy, nb_episodes, seed=0)
+    return columns['decisions'] / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Decisions per second of batched policy inference")
+    parser.add_argument('model', nargs='?', default='random:',
+                        help="algo:path of the model, random: for "
+                             "random actions")
+    parser.add_argument('--decisions', type=int, default=20000,
+                        help="Number of decisions for each K")
+    args = parser.parse_args()
+
+    policy = load_policy(tuple(args.model.split(':', 1)))
+    gameplans = notebook_gameplans()
+    loop = notebook_loop(PlaytimeEnv(gameplans), policy,
+                         min(args.decisions, 2000))
+    print("Notebook loop : %.0f decisions/s" % loop)
+    for num_envs in [1, 4, 16, 64, 1024]:
+        rate = batched(gameplans, policy, num_envs,
+                       args.decisions if num_envs > 1 else 2000)
+        print("K=%d : %.0f decisions/s (x%.1f)"
+              % (num_envs, rate, rate / loop))
+
+
+if __name__ == '__main__':
+    main()
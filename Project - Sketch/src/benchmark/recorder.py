@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from function.instrumentation import Instrumentation
+from function.recorder import TrajectoryReader
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+
+"""Overhead of the trajectory recorder of PlaytimeEnv, and check of the
+    recorded columns against the states of the same episodes.
+    Run from src/ with : python -m benchmark.recorder
+"""
+
+
+def play(env: PlaytimeEnv, nb_steps: int, seed: int) -> tuple:
+    """Play random actions, zigzags with a zone too small are skipped
+
+    Returns
+    -------
+    (list, float)
+        Gameplan, fuel, time, reward and done of each step, and time per
+        step (seconds)
+    """
+    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    actions = rng.integers(0, nvec, size=(nb_steps, len(nvec)))
+    steps = []
+    env.reset(verbose=0)
+    start = time.perf_counter()
+    for action in actions:
+        try:
+            state, reward, done, _ = env.step(action)
+        except Exception:
+            continue
+        steps.append((env.gameplan_id, state['fuel'], state['time'],
+                      reward, done))
+        if done:
+            env.reset(verbose=0)
+    return steps, (time.perf_counter() - start) / len(actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Overhead of the trajectory recorder")
+    parser.add_argument('--steps', type=int, default=200000,
+                        help="Number of steps played")
+    parser.add_argument('--chunk', type=int, default=65536,
+                        help="Number of steps kept in memory")
+    args = parser.parse_args()
+
+    env = PlaytimeEnv(notebook_gameplans())
+    expected, plain = play(env, args.steps, 0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'steps')
+        recorder = env.enable_recording(path, args.chunk)
+        timers = Instrumentation()
+        timers.attach(recorder, {'record': 'record', 'flush': 'flush'})
+        steps, recorded = play(env, args.steps, 0)
+        env.disable_recording()
+
+        reader = TrajectoryReader(path)
+        columns = [reader[name] for name in
+                   ['gameplan', 'fuel', 'time', 'reward', 'done']]
+        same = steps == expected and len(reader) == len(expected) and all(
+            np.array_equal(column, values) for column, values in
+            zip(columns, zip(*expected)))
+        print("Steps recorded : %d, same as the episodes : %s"
+              % (len(reader), same))
+        print("Episodes : %d, buffer : %.1f MB, files : %.1f MB" % (
+            reader['episode'][-1] + 1, recorder.buffer.nbytes / 1e6,
+            sum(os.path.getsize(os.path.join(path, name + '.bin'))
+                for name in reader.columns) / 1e6))
+        print("Step : %.1f µs, recorded : %.1f µs" % (plain * 1e6,
+                                                      recorded * 1e6))
+        for phase, stats in timers.snapshot().items():
+            print("%s : %.2f µs per call (%d calls)"
+                  % (phase, stats['mean_us'], stats['calls']))
+        del reader, columns
+
+
+if __name__ == '__main__':
+    main()
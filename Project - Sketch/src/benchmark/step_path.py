@@ -0,0 +1,213 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from function.recorder import TrajectoryReader
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+
+"""Step of PlaytimeEnv with the actions decoded by arrays, against a
+    frozen copy of the former step where the action goes through dicts :
+    same observations, rewards, dones and maneuvers for random actions,
+    with and without writes in the state between the steps, recorded
+    actions, and time of the steps.
+    Run from src/ with : python -m benchmark.step_path
+"""
+
+# Attributes of the maneuvers compared between the two steps
+MANEUVER_ATTRIBUTES = ['name', 'meanspeed', 'altitude', 'gap', 'length',
+                       'width', 'radius']
+
+
+class FormerPlaytimeEnv(PlaytimeEnv):
+    """PlaytimeEnv with a frozen copy of its former step, where the
+    action goes through dicts. The recorder is not used."""
+
+    def step(self, action):
+        index = action
+        action = dict(zip(self.action_index, action))
+        action = self.action_to_real_space(action)
+        # Action becomes a dict
+        maneuver = self.build_maneuver(action)
+        if self.action_tables is None:
+            fuel, time = self.maneuver_fuel_time(maneuver)
+        else:
+            fuel, time = self.table_fuel_time(index)
+        self.state_to_add = {'fuel': fuel,
+                             'time': time}
+
+        # Check if state is correctly initialized
+        assert (k in self.state.keys() for k in self.state_to_add.keys())
+
+        for key in self.state_to_add.keys():
+            self.state[key] += self.state_to_add[key]
+            self.state[key] = round(self.state[key], 2)
+
+        self.maneuver_list.append(maneuver)
+        self.maneuver_count[maneuver.name] = self.maneuver_count.get(
+            maneuver.name, 0) + 1
+        done = self.is_done()
+        reward = self.reward(maneuver)
+        info = {}
+        return (self.get_observation(), reward, done, info)
+
+
+def state_writes(nb_steps: int, seed: int) -> np.ndarray:
+    """Random writes in the state between the steps, as done by the
+    planner of benchmark.planner
+
+    Returns
+    -------
+    np.ndarray
+        For each step : 0 for no write, 1 for a new state dict, 2 for a
+        write in place, then the fuel and the time written
+    """
+    rng = np.random.default_rng(seed)
+    return np.stack([rng.choice(3, nb_steps, p=[0.8, 0.1, 0.1]),
+                     np.round(rng.uniform(0, 120, nb_steps), 2),
+                     np.round(rng.uniform(0, 7200, nb_steps), 2)], axis=1)
+
+
+def play(env: PlaytimeEnv, actions: np.ndarray, seed: int,
+         writes: np.ndarray = None) -> list:
+    """Play the actions, after a reset with np.random.seed(seed),
+    episodes are reset when they are done
+
+    Parameters
+    ----------
+    writes : np.ndarray, optional
+        Writes in the state before each step, see state_writes, by
+        default None
+
+    Returns
+    -------
+    list
+        Observation, reward, done and maneuver of each step, None for the
+        zigzags with a zone too small
+    """
+    np.random.seed(seed)
+    env.reset(verbose=0)
+    steps = []
+    for t, action in enumerate(actions):
+        if writes is not None and writes[t, 0] == 1:
+            env.state = dict(env.state, fuel=writes[t, 1], time=writes[t, 2])
+        elif writes is not None and writes[t, 0] == 2:
+            env.state['fuel'], env.state['time'] = writes[t, 1:].tolist()
+        try:
+            obs, reward, done, _ = env.step(action)
+        except Exception:
+            steps.append(None)
+            continue
+        maneuver = env.maneuver_list[-1]
+        steps.append((obs.copy(), reward, done,
+                      [getattr(maneuver, name, None)
+                       for name in MANEUVER_ATTRIBUTES]))
+        if done:
+            env.reset(verbose=0)
+    return steps
+
+
+def same_step(step, expected) -> bool:
+    """Compare two steps returned by play
+
+    Returns
+    -------
+    bool
+        Same values
+    """
+    if step is None or expected is None:
+        return step is expected
+    obs, reward, done, maneuver = step
+    if isinstance(obs, dict):
+        if obs != expected[0]:
+            return False
+    elif not np.array_equal(obs, expected[0]):
+        return False
+    return (reward == expected[1] and done == expected[2] and
+            maneuver == expected[3])
+
+
+def steps_per_mode(gameplans: list, actions: np.ndarray,
+                   writes: np.ndarray = None, **kwargs) -> tuple:
+    """Play the actions with the step of PlaytimeEnv and with the former
+    step, kwargs are given to the environments
+
+    Returns
+    -------
+    (int, float, float)
+        Number of different steps, time per step of PlaytimeEnv and of
+        the former step (µs)
+    """
+    times = []
+    results = []
+    for cls in [PlaytimeEnv, FormerPlaytimeEnv]:
+        env = cls(gameplans, **kwargs)
+        start = time.perf_counter()
+        results.append(play(env, actions, 0, writes))
+        times.append((time.perf_counter() - start) / len(actions) * 1e6)
+    errors = sum(not same_step(s, e) for s, e in zip(*results))
+    return errors, times[0], times[1]
+
+
+def different_records(gameplans: list, actions: np.ndarray) -> int:
+    """Record the steps and compare the actions with action_to_real_space
+
+    Returns
+    -------
+    int
+        Number of steps with a different recorded action
+    """
+    env = PlaytimeEnv(gameplans)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'steps')
+        env.enable_recording(path)
+        np.random.seed(0)
+        env.reset(verbose=0)
+        expected = []
+        for action in actions:
+            real = env.action_to_real_space(
+                dict(zip(env.action_index, action)))
+            try:
+                done = env.step(action)[2]
+            except Exception:
+                continue
+            expected.append([real[key] for key in env.action_index[1:]])
+            if done:
+                env.reset(verbose=0)
+        env.disable_recording()
+        reader = TrajectoryReader(path)
+        recorded = np.stack([reader[key] for key in env.action_index[1:]],
+                            axis=1)
+    return int(np.sum(np.any(recorded != np.array(expected), axis=1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step with arrays")
+    parser.add_argument('--steps', type=int, default=50000,
+                        help="Number of random actions")
+    args = parser.parse_args()
+
+    gameplans = notebook_gameplans()
+    rng = np.random.default_rng(0)
+    nvec = PlaytimeEnv(gameplans).action_space.nvec
+    actions = rng.integers(0, nvec, size=(args.steps, len(nvec)))
+    writes = state_writes(len(actions), 1)
+    with tempfile.TemporaryDirectory() as directory:
+        for name, kwargs in [('dict', {}),
+                             ('box', {'observation': 'box'}),
+                             ('table', {'action_tables': directory})]:
+            errors, array_time, dict_time = steps_per_mode(
+                gameplans, actions, **kwargs)
+            print("%-5s : different steps %d / %d, step %.1f µs (former "
+                  "%.1f µs)" % (name, errors, len(actions), array_time,
+                                dict_time))
+            errors = steps_per_mode(gameplans, actions, writes, **kwargs)[0]
+            print("%-5s : with writes in the state, different steps %d / %d"
+                  % (name, errors, len(actions)))
+    print("Different recorded actions : %d"
+          % different_records(gameplans, actions[:20000]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import timeit
+import numpy as np
+from gymenv.evaluation import notebook_gameplans
+from function.tools import get_all_combinations, get_curve_value_alt
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from objects.AllManeuvers import *
+
+"""Benchmarks of the maneuver physics, the environment and the gameplan
+    generation.
+    Run from src/ with : python -m benchmark.suite --output results.json
+    Compare with a baseline : python -m benchmark.suite --compare base.json
+"""
+
+# Parameters of each maneuver of LIST_MAN, used for the construction
+MANEUVER_ARGS = {
+    Wheel: lambda plane: (180, 3000, 1.5, plane),
+    ShowOfForce: lambda plane: (180, plane),
+    Spiral: lambda plane: (180, 3000, 1, 20, plane),
+    ZigZag: lambda plane: (180, 3000, 1, 20, 20, plane),
+}
+
+# Ratio above which a benchmark is slower than the baseline
+REGRESSION_THRESHOLD = 0.2
+
+
+def measure(func, repeat: int = 5) -> dict:
+    """Time func, the number of calls for each measure is chosen so a
+    measure takes at least 0.2 seconds.
+
+    Parameters
+    ----------
+    func : function
+        Function without parameters to time
+    repeat : int, optional
+        Number of measures, by default 5
+
+    Returns
+    -------
+    dict
+        Best and median time per call (µs), number of calls per measure
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {'best_us': float(times.min() * 1e6),
+            'median_us': float(np.median(times) * 1e6),
+            'number': number,
+            'repeat': repeat}
+
+
+def silent(func):
+    """Call func without its prints"""
+    def wrapped():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return wrapped
+
+
+def maneuver_benchmarks(plane: Plane) -> dict:
+    """Maneuver construction for each type, fuel consumption rate and
+    altitude curve
+
+    Returns
+    -------
+    dict
+        Functions to time, by name
+    """
+    cases = {}
+    for man in LIST_MAN:
+        args = MANEUVER_ARGS[man](plane)
+        cases['maneuver.%s' % man.__name__] = (
+            lambda man=man, args=args: man(*args))
+        cases['maneuver.%s.fuel_time' % man.__name__] = (
+            lambda man=man, args=args: (man(*args).total_fuel_consumption(),
+                                        man(*args).travelled_time()))
+    cases['fuel_consumption_rate'] = (
+        lambda: fuel_consumption_rate(180, 3000, plane))
+    cases['get_curve_value_alt'] = lambda: get_curve_value_alt(3000, plane)
+    return cases
+
+
+def env_benchmarks(gameplans: list) -> dict:
+    """PlaytimeEnv init, reset, step for each type of maneuver and full
+    episodes with random actions
+
+    Returns
+    -------
+    dict
+        Functions to time, by name
+    """
+    cases = {}
+    cases['env.init'] = silent(lambda: PlaytimeEnv(gameplans))
+    env = silent(lambda: PlaytimeEnv(gameplans))()
+    np.random.seed(0)
+    cases['env.reset'] = lambda: env.reset(verbose=0)
+
+    for i, man in env.maneuvers_index.items():
+        action = np.array([i, 8, 50, 0, 0, 5, 5, 0])
+
+        def step(action=action):
+            if env.step(action.copy())[2]:
+                env.reset(verbose=0)
+        cases['env.step.%s' % man.__name__] = step
+
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, env.action_space.nvec, size=(1000, 8))
+
+    def episode():
+        env.reset(verbose=0)
+        for action in actions:
+            if env.step(action.copy())[2]:
+                break
+    cases['env.episode'] = episode
+    return cases
+
+
+def combination_benchmarks() -> dict:
+    """get_all_combinations for several sizes of grid
+
+    Returns
+    -------
+    dict
+        Functions to time, by name
+    """
+    cases = {}
+    for size in [5, 10, 20]:
+        grid = {'axis%d' % i: list(range(size)) for i in range(4)}
+        cases['get_all_combinations.%d' % size ** 4] = (
+            lambda grid=grid: get_all_combinations(grid))
+    return cases
+
+
+def run(repeat: int = 5) -> dict:
+    """Run every benchmark
+
+    Parameters
+    ----------
+    repeat : int, optional
+        Number of measures for each benchmark, by default 5
+
+    Returns
+    -------
+    dict
+        Information on the machine and results by benchmark name
+    """
+    cases = {}
+    cases.update(maneuver_benchmarks(Plane()))
+    cases.update(env_benchmarks(notebook_gameplans()))
+    cases.update(combination_benchmarks())
+    results = {}
+    for name, func in cases.items():
+        results[name] = measure(func, repeat)
+        print("%-40s %12.2f µs" % (name, results[name]['best_us']),
+              file=sys.stderr)
+    return {'machine': {'python': platform.python_version(),
+                        'numpy': np.__version__,
+                        'platform': platform.platform()},
+            'results': results}
+
+
+def compare(results: dict, baseline: dict,
+            threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Compare results with a baseline
+
+    Parameters
+    ----------
+    results : dict
+        Output of run
+    baseline : dict
+        Output of run, stored before
+    threshold : float, optional
+        Relative slowdown flagged as a regression, by default 0.2
+
+    Returns
+    -------
+    list
+        (name, baseline µs, current µs, ratio) for every regression
+    """
+    regressions = []
+    for name, current in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['best_us']
+        ratio = current['best_us'] / before
+        if ratio > 1 + threshold:
+            regressions.append((name, before, current['best_us'], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite")
+    parser.add_argument('--output', help="JSON file for the results")
+    parser.add_argument('--compare', help="JSON file of a baseline")
+    parser.add_argument('--threshold', type=float,
+                        default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown flagged as a regression")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print("REGRESSION %s : %.2f µs -> %.2f µs (x%.2f)"
+                  % (name, before, after, ratio), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
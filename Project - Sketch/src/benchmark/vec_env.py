@@ -0,0 +1,116 @@
+import time
+import numpy as np
+from gymenv.VecPlaytimeEnv import VecPlaytimeEnv
+from gymenv.evaluation import notebook_gameplans
+
+"""Throughput of VecPlaytimeEnv against PlaytimeEnv, check that both
+    give the same rewards and dones for the same seeds and actions, and
+    short PPO training (stable-baselines3) on VecPlaytimeEnv.
+    Run from src/ with : python -m benchmark.vec_env
+"""
+
+
+def random_actions(env, nb_steps: int, num_envs: int,
+                   seed: int = 0) -> np.ndarray:
+    """Random actions in the action space of env
+
+    Returns
+    -------
+    np.ndarray
+        Actions, shape (nb_steps, num_envs, 8)
+    """
+    rng = np.random.default_rng(seed)
+    nvec = env.action_space.nvec
+    return rng.integers(0, nvec, size=(nb_steps, num_envs, len(nvec)))
+
+
+def compare(vec_env: VecPlaytimeEnv, seed: int, nb_steps: int) -> int:
+    """Step vec_env and its scalar environment with the same seeds and
+    actions.
+
+    Returns
+    -------
+    int
+        Number of steps with a different reward or done
+    """
+    actions = random_actions(vec_env, nb_steps, vec_env.num_envs, seed)
+    vec_env.seed(seed)
+    vec_env.reset()
+    vec_rewards = []
+    vec_dones = []
+    for t in range(nb_steps):
+        _, rewards, dones, _ = vec_env.step(actions[t])
+        vec_rewards.append(rewards)
+        vec_dones.append(dones)
+
+    env = vec_env.env
+    errors = 0
+    for i in range(vec_env.num_envs):
+        np.random.seed(seed + i)
+        env.reset(verbose=0)
+        for t in range(nb_steps):
+            _, reward, done, _ = env.step(actions[t, i])
+            errors += ((reward != vec_rewards[t][i]) or
+                       (done != vec_dones[t][i]))
+            if done:
+                env.reset(verbose=0)
+    return errors
+
+
+def throughput(env, actions: np.ndarray) -> float:
+    """Steps per second of env (scalar or vectorized)
+
+    Returns
+    -------
+    float
+        Number of environment steps per second
+    """
+    vectorized = isinstance(env, VecPlaytimeEnv)
+    env.reset() if vectorized else env.reset(verbose=0)
+    start = time.perf_counter()
+    for action in actions:
+        if vectorized:
+            env.step(action)
+        elif env.step(action[0])[2]:
+            env.reset(verbose=0)
+    return actions.shape[0] * actions.shape[1] / (
+        time.perf_counter() - start)
+
+
+def ppo_learn(gameplans: list, num_envs: int = 8,
+              timesteps: int = 256) -> float:
+    """Short PPO training with MultiInputPolicy, VecPlaytimeEnv is given
+    to stable-baselines3 as a VecEnv
+
+    Returns
+    -------
+    float
+        Number of timesteps per second
+    """
+    from stable_baselines3 import PPO
+    env = VecPlaytimeEnv(gameplans, num_envs, seed=0)
+    model = PPO('MultiInputPolicy', env, n_steps=16, batch_size=64,
+                seed=0, verbose=0)
+    start = time.perf_counter()
+    model.learn(total_timesteps=timesteps)
+    return model.num_timesteps / (time.perf_counter() - start)
+
+
+def main():
+    gameplans = notebook_gameplans()
+    vec_env = VecPlaytimeEnv(gameplans, 64, seed=0)
+    print("Different rewards or dones :", compare(vec_env, 0, 200))
+
+    scalar = throughput(vec_env.env, random_actions(vec_env, 5000, 1))
+    print("PlaytimeEnv : %.0f steps/s" % scalar)
+    for num_envs in [1, 64, 1024]:
+        vec_env = VecPlaytimeEnv(gameplans, num_envs, seed=0)
+        steps = throughput(vec_env, random_actions(vec_env, 200, num_envs))
+        print("VecPlaytimeEnv, N=%d : %.0f steps/s (x%.1f)"
+              % (num_envs, steps, steps / scalar))
+    print("PPO learn on VecPlaytimeEnv, N=8 : %.0f timesteps/s"
+          % ppo_learn(gameplans))
+
+
+if __name__ == '__main__':
+    main()
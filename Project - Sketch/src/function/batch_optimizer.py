@@ -0,0 +1,185 @@
+import numpy as np
+from function.j_methods import loss_fuel_min, loss_time_min
+from objects.AllManeuvers import *
+from objects.Fleet import Fleet
+from objects.ManeuverBatch import ManeuverBatch
+
+"""Batch optimization of the parameters of a Wheel (speed, altitude,
+    radius) for many (fuel, time) targets at once. Each target is solved
+    by a coordinate search projected on the envelope of its plane, and
+    the moves of every target are evaluated in one ManeuverBatch.
+"""
+
+# Moves of the coordinate search : + and - the step on each parameter
+MOVES = np.concatenate([np.eye(3), -np.eye(3)])
+
+
+def wheel_losses(x: np.ndarray, fuel_target: np.ndarray,
+                 time_target: np.ndarray, plane, time: int = 0,
+                 wheels=1) -> tuple:
+    """Loss of wheels for their targets
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Speed, altitude and radius in the last dimension
+    fuel_target : np.ndarray
+        Fuel wanted (liters), broadcasted with x[..., 0]
+    time_target : np.ndarray
+        Time wanted (seconds), broadcasted with x[..., 0]
+    plane : Plane or Fleet
+        Plane of the wheels, a fleet is broadcasted with x[..., 0]
+    time : int, optional
+        0 for the sum of the squared relative errors on fuel and time,
+        1, 2 or 3 for the losses of LossFunction.choose_J (minimization),
+        by default 0
+    wheels : array, optional
+        Number of wheels with the same parameters, see compute_maneuver,
+        by default 1
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+        Loss, fuel consumption (liters) and travelled time (seconds) of
+        all the wheels
+
+    Raises
+    ------
+    Exception
+        time parameter is not supported
+    """
+    batch = ManeuverBatch(Maneuver_Mission.Wheel, x[..., 0], x[..., 1], 0,
+                          0, 0, x[..., 2], plane)
+    fuel = batch.total_fuel_consumption() * wheels
+    duration = batch.travelled_time() * wheels
+    if time == 0:
+        loss = (((fuel - fuel_target) / np.maximum(fuel_target, 1)) ** 2 +
+                ((duration - time_target) /
+                 np.maximum(time_target, 1)) ** 2)
+    elif time == 1:
+        loss = loss_fuel_min(fuel, fuel_target) / duration
+    elif time == 2:
+        loss = loss_fuel_min(fuel, fuel_target)
+    elif time == 3:
+        loss = loss_time_min(duration, time_target)
+    else:
+        raise Exception("Time is not valid")
+    return loss, fuel, duration
+
+
+def optimize_wheels(fuel_target, time_target, plane, time: int = 0,
+                    radius_bounds: tuple = (RADIUS_MIN_WHEEL,
+                                            RADIUS_MAX_WHEEL),
+                    wheels=None, starts: int = 1, tol: float = 1e-5,
+                    max_iter: int = 500, seed: int = 0) -> dict:
+    """Speed, altitude and radius of the wheel closest to each target,
+    with a coordinate search in the envelope of the plane : every
+    parameter is moved by + and - its step, the best move is kept, and
+    the steps are halved when no move improves the loss.
+
+    Parameters
+    ----------
+    fuel_target : array
+        Fuel wanted for each target (liters)
+    time_target : array
+        Time wanted for each target (seconds)
+    plane : Plane or Fleet
+        Plane of every target, or a fleet with the plane of each target
+    time : int, optional
+        Loss, see wheel_losses, by default 0
+    radius_bounds : tuple, optional
+        Min and max radius (km), by default (RADIUS_MIN_WHEEL,
+        RADIUS_MAX_WHEEL)
+    wheels : array, optional
+        Number of wheels for each target, by default None : the time
+        target divided by the time of a wheel in the center of the
+        envelope, at least 1
+    starts : int, optional
+        Number of starts for each target : the center of the envelope,
+        then random points, by default 1
+    tol : float, optional
+        Smallest step, relative to the envelope, by default 1e-5
+    max_iter : int, optional
+        Max number of iterations, by default 500
+    seed : int, optional
+        Seed of the random starts, by default 0
+
+    Returns
+    -------
+    dict
+        (String, np.ndarray) For each target : speed, altitude, radius,
+        wheels, loss, fuel, time of the best start, and iterations done
+    """
+    fuel_target, time_target = np.broadcast_arrays(
+        np.asarray(fuel_target, dtype=np.float64),
+        np.asarray(time_target, dtype=np.float64))
+    shape = fuel_target.shape
+    n = fuel_target.size
+    if isinstance(plane, Fleet):
+        plane = plane.reshape(np.broadcast_to(plane.row, shape).ravel())
+    lo = np.stack(np.broadcast_arrays(
+        plane.MINSPEED, plane.MINALTITUDE, radius_bounds[0]), axis=-1)
+    hi = np.stack(np.broadcast_arrays(
+        plane.MAXSPEED, plane.MAXALTITUDE, radius_bounds[1]), axis=-1)
+    lo = np.broadcast_to(lo, (n, 3)).astype(np.float64)
+    hi = np.broadcast_to(hi, (n, 3)).astype(np.float64)
+
+    if wheels is None:
+        center = (lo + hi) / 2
+        one = ManeuverBatch(Maneuver_Mission.Wheel, center[:, 0],
+                            center[:, 1], 0, 0, 0, center[:, 2], plane)
+        wheels = np.maximum(np.rint(
+            time_target.ravel() / one.travelled_time()), 1).reshape(shape)
+    wheels = np.broadcast_to(wheels, shape).ravel()
+
+    # Every start is a problem, target i is at rows i, n + i, 2n + i...
+    rng = np.random.default_rng(seed)
+    x = np.concatenate([(lo + hi) / 2] + [
+        rng.uniform(lo, hi) for _ in range(starts - 1)])
+    lo, hi = np.tile(lo, (starts, 1)), np.tile(hi, (starts, 1))
+    fuel_target = np.tile(fuel_target.ravel(), starts)
+    time_target = np.tile(time_target.ravel(), starts)
+    wheels = np.tile(wheels, starts)
+    if isinstance(plane, Fleet):
+        plane = plane.take(np.tile(np.arange(n), starts))
+
+    def evaluate(x, rows):
+        # Targets and planes of the rows, broadcasted with the moves
+        rows = rows.reshape(rows.shape + (1,) * (x.ndim - 2))
+        p = plane.take(rows) if isinstance(plane, Fleet) else plane
+        return wheel_losses(x, fuel_target[rows], time_target[rows], p,
+                            time, wheels[rows])
+
+    rows = np.arange(len(x))
+    loss, fuel, duration = evaluate(x, rows)
+    step = (hi - lo) / 4
+    iterations = np.zeros(len(x), dtype=np.int64)
+    for _ in range(max_iter):
+        active = np.flatnonzero(np.any(step > tol * (hi - lo), axis=1))
+        if len(active) == 0:
+            break
+        iterations[active] += 1
+        moves = np.clip(x[active, None, :] + MOVES * step[active, None, :],
+                        lo[active, None, :], hi[active, None, :])
+        move_loss, move_fuel, move_time = evaluate(moves, active)
+        best = np.argmin(move_loss, axis=1)
+        pick = np.arange(len(active))
+        better = move_loss[pick, best] < loss[active]
+        accepted = active[better]
+        x[accepted] = moves[pick, best][better]
+        loss[accepted] = move_loss[pick, best][better]
+        fuel[accepted] = move_fuel[pick, best][better]
+        duration[accepted] = move_time[pick, best][better]
+        step[active[~better]] /= 2
+
+    # Best start of each target
+    best = np.argmin(loss.reshape(starts, n), axis=0) * n + np.arange(n)
+    return {'speed': x[best, 0].reshape(shape),
+            'altitude': x[best, 1].reshape(shape),
+            'radius': x[best, 2].reshape(shape),
+            'wheels': wheels[best].reshape(shape),
+            'loss': loss[best].reshape(shape),
+            'fuel': fuel[best].reshape(shape),
+            'time': duration[best].reshape(shape),
+            'iterations': iterations.reshape(starts, n).sum(
+                axis=0).reshape(shape)}
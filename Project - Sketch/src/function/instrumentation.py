@@ -0,0 +1,130 @@
+import csv
+import json
+from time import perf_counter
+
+
+class Instrumentation:
+    """Timers and call counters for the phases of an environment.
+    Methods are wrapped on the instance only while the instrumentation is
+    enabled, so a disabled environment runs its usual methods."""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Set every timer and counter to 0"""
+        self.calls = dict()
+        self.total = dict()
+        self.max = dict()
+
+    def add(self, phase: str, elapsed: float):
+        """Add a call to a phase
+
+        Parameters
+        ----------
+        phase : str
+            Name of the phase
+        elapsed : float
+            Duration of the call (seconds)
+        """
+        if phase in self.calls:
+            self.calls[phase] += 1
+            self.total[phase] += elapsed
+            if elapsed > self.max[phase]:
+                self.max[phase] = elapsed
+        else:
+            self.calls[phase] = 1
+            self.total[phase] = elapsed
+            self.max[phase] = elapsed
+
+    def wrap(self, phase: str, func):
+        """Time every call of func as the phase
+
+        Parameters
+        ----------
+        phase : str
+            Name of the phase
+        func : function
+            Function (or bound method) to time
+
+        Returns
+        -------
+        function
+            Same function, timed
+        """
+        add = self.add
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add(phase, perf_counter() - start)
+        return timed
+
+    def attach(self, obj, phases: dict):
+        """Wrap methods of obj on the instance
+
+        Parameters
+        ----------
+        obj : object
+            Object to instrument
+        phases : dict
+            (String, String) Name of the method, name of the phase
+        """
+        for method, phase in phases.items():
+            setattr(obj, method, self.wrap(phase, getattr(obj, method)))
+
+    @staticmethod
+    def detach(obj, phases: dict):
+        """Remove the wrappers set by attach
+
+        Parameters
+        ----------
+        obj : object
+            Instrumented object
+        phases : dict
+            (String, String) Name of the method, name of the phase
+        """
+        for method in phases:
+            obj.__dict__.pop(method, None)
+
+    def snapshot(self) -> dict:
+        """Statistics for every phase
+
+        Returns
+        -------
+        dict
+            (String, dict) For each phase : number of calls, total time (s),
+            mean and max time per call (µs)
+        """
+        return {phase: {'calls': self.calls[phase],
+                        'total_s': self.total[phase],
+                        'mean_us': self.total[phase] / self.calls[phase] * 1e6,
+                        'max_us': self.max[phase] * 1e6}
+                for phase in self.calls}
+
+    def to_json(self, path: str):
+        """Write the snapshot in a JSON file
+
+        Parameters
+        ----------
+        path : str
+            Path of the file
+        """
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def to_csv(self, path: str):
+        """Write the snapshot in a CSV file, one line for each phase
+
+        Parameters
+        ----------
+        path : str
+            Path of the file
+        """
+        fields = ['phase', 'calls', 'total_s', 'mean_us', 'max_us']
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for phase, stats in self.snapshot().items():
+                writer.writerow(dict(phase=phase, **stats))
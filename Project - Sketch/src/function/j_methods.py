@@ -1,5 +1,6 @@
 import numpy as np
 from objects.AllManeuvers import *
+from objects.ManeuverBatch import ManeuverBatch
 from objects.Plane import *
 
 
@@ -8,9 +9,12 @@ from objects.Plane import *
     have been changed.
 """
 
+# Number of points of a grid evaluated at once by evaluate_grid
+GRID_CHUNK = 2 ** 18
+
 
 def compute_maneuver(speed: float, altitude: float,
-                     distance: float, iter: int = 1):
+                     radius: float, iter: int = 1, plane: Plane = None):
     """ Calculate fuel consumption and time for a number of wheel
     with same parameters
 
@@ -20,22 +24,103 @@ def compute_maneuver(speed: float, altitude: float,
         Speed for the Wheel (km/h)
     altitude : float
         Altitude for the Wheel (feet)
-    distance : float
-        Deprecated : distance for the wheel (now the radius) (km)
+    radius : float
+        Radius of the circle of the Wheel (km)
     iter : int, optional
         Number of wheel to add, by default 1
+    plane : Plane, optional
+        Plane of the wheels, by default None (default Plane)
 
     Returns
     -------
     (float, float)
         Sum of both fuel consumption and travelled time
     """
+    if plane is None:
+        plane = Plane()
     wheels = []
     for _ in range(iter):
-        wheels.append(Wheel(speed, altitude, distance))
+        wheels.append(Wheel(speed, altitude, radius, plane))
     return (sum(w.total_fuel_consumption() for w in wheels),
             sum(w.travelled_time() for w in wheels))
 
+
+def compute_maneuver_gradient(speed: float, altitude: float,
+                              radius: float, iter: int = 1,
+                              plane: Plane = None) -> tuple:
+    """Derivatives of compute_maneuver with respect to speed, altitude
+    and radius, see Maneuver.total_fuel_consumption_gradient
+
+    Parameters
+    ----------
+    speed : float
+        Speed for the Wheel (km/h)
+    altitude : float
+        Altitude for the Wheel (feet)
+    radius : float
+        Radius of the circle of the Wheel (km)
+    iter : int, optional
+        Number of wheel to add, by default 1
+    plane : Plane, optional
+        Plane of the wheels, by default None (default Plane)
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        Derivatives of the fuel consumption and of the travelled time
+    """
+    if plane is None:
+        plane = Plane()
+    wheel = Wheel(speed, altitude, radius, plane)
+    parameters = [GRADIENT_PARAMETERS.index(p)
+                  for p in ('speed', 'altitude', 'radius')]
+    return (iter * wheel.total_fuel_consumption_gradient()[parameters],
+            iter * wheel.travelled_time_gradient()[parameters])
+
+
+def evaluate_grid(func, X, Y, Z, chunk: int = GRID_CHUNK) -> np.ndarray:
+    """Evaluate func on the broadcast of X, Y and Z, by chunks of points :
+    memory used by func does not depend on the size of the grid.
+
+    Parameters
+    ----------
+    func : function
+        Get three 1D arrays (points of X, Y, Z), return an array of values
+    X : array
+        First dimension, speed
+    Y : array
+        Second dimension, altitude
+    Z : array
+        Third dimension, radius
+    chunk : int, optional
+        Number of points given to func at once, by default GRID_CHUNK
+
+    Returns
+    -------
+    np.ndarray
+        Values of func, shape of the broadcast of X, Y and Z
+
+    Raises
+    ------
+    Exception
+        X, Y and Z can not be broadcasted together (arrays of different
+        lengths are not truncated)
+    """
+    try:
+        # Broadcasted views, the grid itself is never created
+        X, Y, Z = np.broadcast_arrays(X, Y, Z)
+    except ValueError:
+        raise Exception("X, Y and Z can not be broadcasted together, "
+                        "shapes %s, %s and %s"
+                        % (np.shape(X), np.shape(Y), np.shape(Z)))
+    result = np.empty(X.shape)
+    flat = result.reshape(-1)
+    for start in range(0, flat.size, chunk):
+        index = np.unravel_index(
+            np.arange(start, min(start + chunk, flat.size)), X.shape)
+        flat[start:start + chunk] = func(X[index], Y[index], Z[index])
+    return result
+
 # To minimize
 
 
@@ -122,10 +207,50 @@ def loss_time_max(time_found: int, time_wanted: int = 0) -> float:
     return value
 
 
+"""Derivatives of the losses with respect to the value found"""
+
+
+def loss_min_slope(found: float, wanted: float = 0) -> float:
+    """Derivative of loss_fuel_min and loss_time_min
+
+    Parameters
+    ----------
+    found : float
+        Fuel (liters) or time (seconds) found
+    wanted : float, optional
+        Fuel or time wanted, by default 0
+
+    Returns
+    -------
+    float
+        Sign of the difference
+    """
+    return np.sign(found - wanted)
+
+
+def loss_max_slope(found: float, wanted: float = 0) -> float:
+    """Derivative of loss_fuel_max and loss_time_max
+
+    Parameters
+    ----------
+    found : float
+        Fuel (liters) or time (seconds) found
+    wanted : float, optional
+        Fuel or time wanted, by default 0
+
+    Returns
+    -------
+    float
+        Derivative of the invert of the difference
+    """
+    return -np.sign(found - wanted) / (found - wanted) ** 2
+
+
 # Class for Factory method
 
 class LossFunction:
-    def __init__(self, c0: int, c1: int, min_max: int):
+    def __init__(self, c0: int, c1: int, min_max: int,
+                 plane: Plane = None):
         """Used for optimization, we define the function we are going to use
         according to the parameters.
 
@@ -139,16 +264,21 @@ class LossFunction:
 
         min_max : int
             Minimization = 0, Maximization = 1
+        plane : Plane, optional
+            Plane of the wheels, by default None (default Plane)
         """
 
         self.c0 = c0
         self.c1 = c1
+        self.plane = Plane() if plane is None else plane
         if min_max == 0:
             self.loss_fuel = loss_fuel_min
             self.loss_time = loss_time_min
+            self.loss_slope = loss_min_slope
         elif min_max == 1:
             self.loss_fuel = loss_fuel_max
             self.loss_time = loss_time_max
+            self.loss_slope = loss_max_slope
         print("Parameters : c0 : ", c0)
         print("c1 : ", c1)
         print("Min" if min_max == 0 else "Max")
@@ -163,7 +293,7 @@ class LossFunction:
         Parameters
         ----------
         x0 : list
-            List of parameters used for the wheel (speed, altitude, distance)
+            List of parameters used for the wheel (speed, altitude, radius)
 
         Returns
         -------
@@ -173,9 +303,10 @@ class LossFunction:
         """
         speed = x0[0]
         altitude = x0[1]
-        distance = x0[2]
+        radius = x0[2]
         # iter = math.ceil(x0[3])
-        fuel_c, time = compute_maneuver(speed, altitude, distance)
+        fuel_c, time = compute_maneuver(speed, altitude, radius,
+                                        plane=self.plane)
         return self.loss_fuel(fuel_c, self.c0) / time
 
     # Loss only dependent on fuel
@@ -187,7 +318,7 @@ class LossFunction:
         Parameters
         ----------
         x0 : list
-            List of parameters used for the wheel (speed, altitude, distance)
+            List of parameters used for the wheel (speed, altitude, radius)
 
         Returns
         -------
@@ -197,9 +328,10 @@ class LossFunction:
         """
         speed = x0[0]
         altitude = x0[1]
-        distance = x0[2]
+        radius = x0[2]
         # iter = math.ceil(x0[3])
-        fuel_c, time = compute_maneuver(speed, altitude, distance)
+        fuel_c, time = compute_maneuver(speed, altitude, radius,
+                                        plane=self.plane)
         return self.loss_fuel(fuel_c, self.c0)
 
     # Loss only dependent on time
@@ -211,7 +343,7 @@ class LossFunction:
         Parameters
         ----------
         x0 : list
-            List of parameters used for the wheel (speed, altitude, distance)
+            List of parameters used for the wheel (speed, altitude, radius)
 
         Returns
         -------
@@ -221,9 +353,10 @@ class LossFunction:
         """
         speed = x0[0]
         altitude = x0[1]
-        distance = x0[2]
+        radius = x0[2]
         # iter = math.ceil(x0[3])
-        fuel_c, time = compute_maneuver(speed, altitude, distance)
+        fuel_c, time = compute_maneuver(speed, altitude, radius,
+                                        plane=self.plane)
         return self.loss_time(time, self.c1)
 
     def choose_J(self, time: int):
@@ -254,6 +387,92 @@ class LossFunction:
         else:
             raise Exception("Time is not valid")
 
+    # Gradients of the J methods, jac argument of scipy.optimize.minimize
+
+    def jac_time(self, x0: list) -> np.ndarray:
+        """Gradient of J_time
+
+        Parameters
+        ----------
+        x0 : list
+            List of parameters used for the wheel (speed, altitude, radius)
+
+        Returns
+        -------
+        np.ndarray
+            Derivatives with respect to speed, altitude and radius
+        """
+        fuel_c, time = compute_maneuver(x0[0], x0[1], x0[2],
+                                        plane=self.plane)
+        fuel_gradient, time_gradient = compute_maneuver_gradient(
+            x0[0], x0[1], x0[2], plane=self.plane)
+        return (self.loss_slope(fuel_c, self.c0) * fuel_gradient / time -
+                self.loss_fuel(fuel_c, self.c0) * time_gradient / time ** 2)
+
+    def jac_no_time(self, x0: list) -> np.ndarray:
+        """Gradient of J_no_time
+
+        Parameters
+        ----------
+        x0 : list
+            List of parameters used for the wheel (speed, altitude, radius)
+
+        Returns
+        -------
+        np.ndarray
+            Derivatives with respect to speed, altitude and radius
+        """
+        fuel_c, _ = compute_maneuver(x0[0], x0[1], x0[2], plane=self.plane)
+        fuel_gradient, _ = compute_maneuver_gradient(x0[0], x0[1], x0[2],
+                                                     plane=self.plane)
+        return self.loss_slope(fuel_c, self.c0) * fuel_gradient
+
+    def jac_only_time(self, x0: list) -> np.ndarray:
+        """Gradient of J_only_time
+
+        Parameters
+        ----------
+        x0 : list
+            List of parameters used for the wheel (speed, altitude, radius)
+
+        Returns
+        -------
+        np.ndarray
+            Derivatives with respect to speed, altitude and radius
+        """
+        _, time = compute_maneuver(x0[0], x0[1], x0[2], plane=self.plane)
+        _, time_gradient = compute_maneuver_gradient(x0[0], x0[1], x0[2],
+                                                     plane=self.plane)
+        return self.loss_slope(time, self.c1) * time_gradient
+
+    def choose_jac(self, time: int):
+        """Gradient of choose_J, for example
+        minimize(loss.choose_J(1), x0, jac=loss.choose_jac(1))
+
+        Parameters
+        ----------
+        time : int
+            1, 2 or 3 for the type of function
+
+        Returns
+        -------
+        function
+            Gradient of the corresponding function
+
+        Raises
+        ------
+        Exception
+            time parameter is not supported
+        """
+        if time == 1:
+            return self.jac_time
+        elif time == 2:
+            return self.jac_no_time
+        elif time == 3:
+            return self.jac_only_time
+        else:
+            raise Exception("Time is not valid")
+
     # Dependent on time and fuel
 
     def J_to_compute(self, x0: list) -> float:
@@ -269,8 +488,8 @@ class LossFunction:
         float
             Loss to minimize, according to time
         """
-        values = get_values_from_list(x0)
-        return self.loss_fuel(values[:, 0], self.c0) / values[:, 1]
+        values = get_values_from_list(x0, self.plane)
+        return self.loss_fuel(values[..., 0], self.c0) / values[..., 1]
 
     # Dependent only on fuel
 
@@ -288,8 +507,8 @@ class LossFunction:
         float
             Loss to minimize, only with fuel
         """
-        values = get_values_from_list(x0)
-        return self.loss_fuel(values[:, 0], self.c0)
+        values = get_values_from_list(x0, self.plane)
+        return self.loss_fuel(values[..., 0], self.c0)
 
     # Dependant only on time
 
@@ -307,8 +526,8 @@ class LossFunction:
         float
             Loss to minimize, only with time
         """
-        values = get_values_from_list(x0)
-        return self.loss_time(values[:, 1], self.c1)
+        values = get_values_from_list(x0, self.plane)
+        return self.loss_time(values[..., 1], self.c1)
 
     def choose_J_to_compute(self, time: int):
         """Choose associated function to compute with time as 1, 2 or 3
@@ -341,7 +560,8 @@ class LossFunction:
     # depending of time and label
 
     def J_to_compute_except(self, X, Y, Z, label: int, time: int = 2):
-        """Compute J, but excluding one of the three dimension (X, Y, Z).
+        """Compute J, but excluding one of the three dimension (X, Y, Z) :
+        the excluded dimension is 1D and the others are 2D, see J_grid.
 
         Parameters
         ----------
@@ -350,7 +570,7 @@ class LossFunction:
         Y : array
             Second dimension, altitude
         Z : array
-            Third dimension, distance
+            Third dimension, radius
         label : int
             1, 2 or 3, for the choice of dimension to exclude
         time : int, optional
@@ -364,22 +584,18 @@ class LossFunction:
         Raises
         ------
         Exception
-            Dimension not found, label is not supported
+            Dimension not found, label is not supported, or X, Y and Z
+            can not be broadcasted together
         """
-        if label == 1:
-            method = self.J_to_compute_noX
-        elif label == 2:
-            method = self.J_to_compute_noY
-        elif label == 3:
-            method = self.J_to_compute_noZ
-        else:
+        if label not in (1, 2, 3):
             raise Exception("Label not found, enter 1 for X, 2 for Y, 3 for Z")
-        return method(X, Y, Z, time)
+        return self.J_grid(X, Y, Z, time)
 
     def J_to_compute_except2(self, X, Y, Z, label1: int,
                              label2: int, time: int = 2):
         """Return the result of J if we exclude 2 dimensions of X, Y or Z
-        depending of time and label
+        depending of time and label : the excluded dimensions are 1D and
+        the other is 2D, see J_grid.
 
         Parameters
         ----------
@@ -388,7 +604,7 @@ class LossFunction:
         Y : array
             Second dimension, altitude
         Z : array
-            Third dimension, distance
+            Third dimension, radius
         label1 : int
             1, 2 or 3, for the choice of dimension to exclude
         label2 : int
@@ -404,20 +620,20 @@ class LossFunction:
         Raises
         ------
         Exception
-            Labels not supported (1 and 1, 4...)
+            Labels not supported (1 and 1, 4...), or X, Y and Z can not
+            be broadcasted together
         """
-        if (label1 == 1 and label2 == 2) or (label1 == 2 and label2 == 1):
-            method = self.J_to_compute_noXY
-        elif (label1 == 1 and label2 == 3) or (label1 == 3 and label2 == 1):
-            method = self.J_to_compute_noXZ
-        elif (label1 == 2 and label2 == 3) or (label1 == 3 and label2 == 2):
-            method = self.J_to_compute_noYZ
-        else:
+        if {label1, label2} not in ({1, 2}, {1, 3}, {2, 3}):
             raise Exception("Label not found, enter 1 for X, 2 for Y, 3 for Z")
-        return method(X, Y, Z, time)
+        return self.J_grid(X, Y, Z, time)
 
-    def J_to_compute_noZ(self, X, Y, Z, time: int):
-        """Return J with a 1D Z and 2D X and Y
+    def J_grid(self, X, Y, Z, time: int = 2,
+               chunk: int = GRID_CHUNK) -> np.ndarray:
+        """Loss on a grid : X, Y and Z are broadcasted (1D arrays are on
+        the last axis, like the columns of a np.meshgrid), see
+        evaluate_grid. Same values as choose_J on each point. Used by
+        J_to_compute_except and J_to_compute_except2 for every excluded
+        dimension.
 
         Parameters
         ----------
@@ -426,184 +642,48 @@ class LossFunction:
         Y : array
             Second dimension, altitude
         Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
-
-        Returns
-        -------
-        _type_
-            _description_
-        """
-        method = self.choose_J(time)
-        res = []
-        for i, row in enumerate(list(zip(X, Y))):
-            x, y = row
-            res.append([])
-            for xi, yi, zi in zip(x, y, Z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
-    # Return J with a 1D Y and 2D X and Z
-    def J_to_compute_noY(self, X, Y, Z, time: int):
-        """J without Y
-
-        Parameters
-        ----------
-        X : array
-            First dimension, speed
-        Y : array
-            Second dimension, altitude
-        Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
-
-        Returns
-        -------
-        _type_
-            _description_
-        """
-        method = self.choose_J(time)
-        res = []
-        for i, row in enumerate(list(zip(X, Z))):
-            x, z = row
-            res.append([])
-            for xi, yi, zi in zip(x, Y, z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
-    # Return J with a 1D X and 2D Y and Z
-    def J_to_compute_noX(self, X, Y, Z, time: int):
-        """J without X
-
-        Parameters
-        ----------
-        X : array
-            First dimension, speed
-        Y : array
-            Second dimension, altitude
-        Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
-
-        Returns
-        -------
-        _type_
-            _description_
-        """
-        method = self.choose_J(time)
-        res = []
-        for i, row in enumerate(list(zip(Y, Z))):
-            y, z = row
-            res.append([])
-            for xi, yi, zi in zip(X, y, z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
-    # Return J with a 2D Z and 1D X and Y
-    def J_to_compute_noXY(self, X, Y, Z, time: int):
-        """J without X and Y
-
-        Parameters
-        ----------
-        X : array
-            First dimension, speed
-        Y : array
-            Second dimension, altitude
-        Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
-
-        Returns
-        -------
-        _type_
-            _description_
-        """
-        method = self.choose_J(time)
-        res = []
-        for i, z in enumerate(Z):
-            res.append([])
-            for xi, yi, zi in zip(X, Y, z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
-    # Return J with a 2D X and 1D Y and Z
-    def J_to_compute_noYZ(self, X, Y, Z, time: int):
-        """ J without Y and Z
-
-        Parameters
-        ----------
-        X : array
-            First dimension, speed
-        Y : array
-            Second dimension, altitude
-        Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
+            Third dimension, radius
+        time : int, optional
+            Choose of loss 1, 2 or 3, by default 2
+        chunk : int, optional
+            Number of points evaluated at once, by default GRID_CHUNK
 
         Returns
         -------
-        _type_
-            _description_
-        """
-        method = self.choose_J(time)
-        res = []
-        for i, x in enumerate(X):
-            res.append([])
-            for xi, yi, zi in zip(x, Y, Z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
-    # Return J with a 2D Y and 1D X and Z
-    def J_to_compute_noXZ(self, X, Y, Z, time: int):
-        """J without X and Z
+        np.ndarray
+            Loss for each point of the grid
 
-        Parameters
-        ----------
-        X : array
-            First dimension, speed
-        Y : array
-            Second dimension, altitude
-        Z : array
-            Third dimension, distance
-        time : int
-            Choose of loss 1, 2 or 3
-
-        Returns
-        -------
-        _type_
-            _description_
+        Raises
+        ------
+        Exception
+            X, Y and Z can not be broadcasted together : unlike the
+            former nested loops, arrays of different lengths are not
+            truncated
         """
-        method = self.choose_J(time)
-        res = []
-        for i, y in enumerate(Y):
-            res.append([])
-            for xi, yi, zi in zip(X, y, Z):
-                res[i].append(method([xi, yi, zi]))
-        return res
-
+        method = self.choose_J_to_compute(time)
+        return evaluate_grid(lambda x, y, z: method([x, y, z]),
+                             X, Y, Z, chunk)
 
-def get_values_from_list(x0: list):
-    """Methods to compute J into a graph
 
+def get_values_from_list(x0: list, plane: Plane = None):
+    """Fuel consumption and time of wheels, computed with a ManeuverBatch
 
     Parameters
     ----------
     x0 : list
-        _description_
+        Speeds, altitudes and radius of the wheels (arrays)
+    plane : Plane, optional
+        Plane of the wheels, by default None (default Plane)
 
     Returns
     -------
-    _type_
-        _description_
+    np.ndarray
+        Fuel consumption and travelled time in the last dimension
     """
-    x = np.asarray(x0)
-    values = []
-    for spd, alt, dis in zip(x[0], x[1], x[2]):
-        fuel_c, time = compute_maneuver(spd, alt, dis)
-        values.append((fuel_c, time))
-    return np.array(values)
+    if plane is None:
+        plane = Plane()
+    x = np.asarray(x0, dtype=np.float64)
+    batch = ManeuverBatch(Maneuver_Mission.Wheel, x[0], x[1], 0, 0, 0,
+                          x[2], plane)
+    return np.stack([batch.total_fuel_consumption(),
+                     batch.travelled_time()], axis=-1)
@@ -0,0 +1,181 @@
+import json
+import os
+import numpy as np
+
+# Columns recorded for each step, with their type. The action is decoded
+# (see PlaytimeEnv.decode_action), maneuver is the value of its
+# Maneuver_Mission, fuel and time are the state after the step.
+STEP_COLUMNS = {
+    'episode': np.int64,
+    'gameplan': np.int64,
+    'maneuver': np.int8,
+    'speed': np.float64,
+    'altitude': np.float64,
+    'distance': np.float64,
+    'gap': np.float64,
+    'length': np.float64,
+    'width': np.float64,
+    'radius': np.float64,
+    'fuel': np.float64,
+    'time': np.float64,
+    'reward': np.float64,
+    'done': np.bool_,
+}
+
+# Description of the recording in its directory
+METADATA_FILE = 'trajectories.json'
+
+
+class TrajectoryRecorder:
+    """Columnar recorder of the steps of an environment. Steps are written
+    in a preallocated buffer of chunk_steps rows, which is appended to one
+    binary file per column when it is full : memory does not grow with
+    the number of steps. Files are read with TrajectoryReader."""
+    def __init__(self, directory: str, chunk_steps: int = 65536):
+        """Create the recording in an empty directory
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the files, created if needed
+        chunk_steps : int, optional
+            Number of steps kept in memory before they are written,
+            by default 65536
+
+        Raises
+        ------
+        Exception
+            If the directory already contains a recording
+        """
+        self.directory = directory
+        if os.path.exists(os.path.join(directory, METADATA_FILE)):
+            raise Exception("%s already contains a recording" % directory)
+        os.makedirs(directory, exist_ok=True)
+        # One row for each step, a field for each column
+        self.buffer = np.zeros(chunk_steps, dtype=list(
+            (name, dtype) for name, dtype in STEP_COLUMNS.items()))
+        self.size = 0
+        self.steps = 0
+        self.episode = -1
+        self.files = {name: open(os.path.join(directory, name + '.bin'),
+                                 'wb')
+                      for name in STEP_COLUMNS}
+        self.write_metadata()
+
+    def start_episode(self):
+        """Following steps are in a new episode"""
+        self.episode += 1
+
+    def record(self, gameplan: int, action: np.ndarray, maneuver: int,
+               state: dict, reward: float, done: bool):
+        """Add a step
+
+        Parameters
+        ----------
+        gameplan : int
+            Index of the gameplan of the episode
+        action : np.ndarray
+            Real values of the action, in the order of
+            PlaytimeEnv.action_index
+        maneuver : int
+            Value of the Maneuver_Mission of the maneuver
+        state : dict
+            State after the step, with fuel and time
+        reward : float
+            Reward of the step
+        done : bool
+            If the episode is done
+        """
+        self.buffer[self.size] = (
+            self.episode, gameplan, maneuver, *action[1:],
+            state['fuel'], state['time'], reward, done)
+        self.size += 1
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """Append the steps of the buffer to the files"""
+        if self.size == 0:
+            return
+        for name, f in self.files.items():
+            f.write(np.ascontiguousarray(
+                self.buffer[name][:self.size]).tobytes())
+            f.flush()
+        self.steps += self.size
+        self.size = 0
+        self.write_metadata()
+
+    def write_metadata(self):
+        """Write the columns and the number of steps written"""
+        metadata = {'steps': self.steps,
+                    'columns': {name: np.dtype(dtype).str
+                                for name, dtype in STEP_COLUMNS.items()}}
+        path = os.path.join(self.directory, METADATA_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        """Write the remaining steps and close the files"""
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+class TrajectoryReader:
+    """Steps written by a TrajectoryRecorder. Each column is a read-only
+    memory map of its file, opened when it is first used."""
+    def __init__(self, directory: str):
+        """Open a recording
+
+        Parameters
+        ----------
+        directory : str
+            Directory of the files
+
+        Raises
+        ------
+        Exception
+            If the directory does not contain a recording
+        """
+        path = os.path.join(directory, METADATA_FILE)
+        if not os.path.exists(path):
+            raise Exception("No recording in %s" % directory)
+        with open(path) as f:
+            metadata = json.load(f)
+        self.directory = directory
+        self.steps = metadata['steps']
+        self.dtypes = {name: np.dtype(dtype)
+                       for name, dtype in metadata['columns'].items()}
+        self.maps = dict()
+
+    @property
+    def columns(self) -> list:
+        """Names of the columns"""
+        return list(self.dtypes)
+
+    def __len__(self):
+        return self.steps
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Values of a column for every step, without copy
+
+        Parameters
+        ----------
+        name : str
+            Name of the column, see STEP_COLUMNS
+
+        Returns
+        -------
+        np.ndarray
+            Memory map of the column
+        """
+        if name not in self.maps:
+            if self.steps == 0:
+                self.maps[name] = np.zeros(0, dtype=self.dtypes[name])
+            else:
+                # Steps of a buffer not flushed yet are not read
+                self.maps[name] = np.memmap(
+                    os.path.join(self.directory, name + '.bin'),
+                    dtype=self.dtypes[name], mode='r', shape=(self.steps,))
+        return self.maps[name]
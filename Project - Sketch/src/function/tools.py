@@ -1,6 +1,4 @@
 import itertools
-import seaborn as sns
-import matplotlib.pyplot as plt
 import numpy as np
 
 
@@ -29,27 +27,24 @@ def get_all_combinations(d: dict) -> dict:
     return ret
 
 
-def get_curve_value_alt(altitude: int, plane) -> float:
+def get_curve_value_alt(altitude, plane):
     """Get an augmentation or diminution of consumption
     depending on the altitude
     TODO : change for the curve in src/test_conso.ipynb
 
     Parameters
     ----------
-    altitude : int
+    altitude : float or np.ndarray
         Altitude (feet)
     plane : Plane
-        Object plane (for min and max altitude)
+        Object plane (for min and max altitude), the curve is cached on it
 
     Returns
     -------
-    float
+    float or np.ndarray
         Ratio according to the curve of the altitude
     """
-    alt = np.asarray(altitude - plane.MINALTITUDE, dtype=np.int32)
-    f = np.linspace(0.90, 1.10, plane.MAXALTITUDE - plane.MINALTITUDE)
-
-    return f[alt]
+    return plane.get_altitude_ratio(altitude)
 
 
 def get_key_from_value(d: dict, val):
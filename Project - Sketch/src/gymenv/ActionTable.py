@@ -0,0 +1,224 @@
+import hashlib
+import os
+import numpy as np
+from objects.AllManeuvers import *
+from objects.ManeuverBatch import ManeuverBatch
+
+# Type of maneuver for each class of LIST_MAN
+MANEUVER_MISSION = {
+    Wheel: Maneuver_Mission.Wheel,
+    ShowOfForce: Maneuver_Mission.ShowOfForce,
+    Spiral: Maneuver_Mission.Spiral,
+    ZigZag: Maneuver_Mission.Zigzag,
+}
+
+# Parameters of the action used by each maneuver, see
+# PlaytimeEnv.build_maneuver
+MANEUVER_AXES = {
+    Wheel: ['speed', 'altitude', 'radius'],
+    ShowOfForce: ['speed'],
+    Spiral: ['speed', 'altitude', 'gap', 'length'],
+    ZigZag: ['speed', 'altitude', 'gap', 'length', 'width'],
+}
+
+# Version of the file format, changed when the content of the tables
+# changes for the same planes
+TABLE_VERSION = 1
+
+
+def type_actions(env, k: int) -> np.ndarray:
+    """Every action of the action space for a type of maneuver, with only
+    the parameters used by the type (see MANEUVER_AXES), the others are 0.
+
+    Parameters
+    ----------
+    env : PlaytimeEnv
+        Environment of the action space
+    k : int
+        Type of maneuver, index in maneuvers_index
+
+    Returns
+    -------
+    np.ndarray
+        Actions, in the order of np.ravel_multi_index on the used axes
+    """
+    nvec = env.action_space.nvec
+    axes = [env.action_index.index(a)
+            for a in MANEUVER_AXES[env.maneuvers_index[k]]]
+    grid = np.stack(np.meshgrid(
+        *[np.arange(nvec[a]) for a in axes], indexing='ij'),
+        axis=-1).reshape(-1, len(axes))
+    action = np.zeros((len(grid), len(nvec)), dtype=np.int64)
+    action[:, 0] = k
+    action[:, axes] = grid
+    return action
+
+
+def real_actions(action: np.ndarray, plane: Plane) -> dict:
+    """Real values of actions, same as PlaytimeEnv.action_to_real_space
+
+    Parameters
+    ----------
+    action : np.ndarray
+        Actions of the action space, one for each row
+    plane : Plane
+        Plane of the gameplan
+
+    Returns
+    -------
+    dict
+        (String, np.ndarray) speed, altitude, gap, length, width, radius
+    """
+    return {'speed': action[:, 1] * 5 + plane.MINSPEED,
+            'altitude': action[:, 2] * 100 + plane.MINALTITUDE,
+            'gap': action[:, 4] + 1,
+            'length': action[:, 5] + 15,
+            'width': action[:, 6] + 15,
+            'radius': (action[:, 7] + 2) * 0.5}
+
+
+class ActionTable:
+    """Fuel consumption and time of every action of the action space of
+    an environment for a plane, saved in a .npy file and memory-mapped.
+    Each type of maneuver only stores the parameters it uses, so the
+    table is the sum and not the product of the grids of the types."""
+
+    def __init__(self, env, plane: Plane, directory: str):
+        """Load the table of the plane from the directory, it is computed
+        and saved if the file does not exist.
+
+        Parameters
+        ----------
+        env : PlaytimeEnv
+            Environment of the action space
+        plane : Plane
+            Plane of the gameplans
+        directory : str
+            Directory of the .npy files
+
+        Raises
+        ------
+        Exception
+            If the file does not have the size of the action space
+        """
+        self.plane = plane
+        nvec = env.action_space.nvec
+        # Types are stored in the order of LIST_MAN, which does not
+        # change between runs as the order of maneuvers_index
+        types = [maneuver for maneuver in LIST_MAN
+                 if maneuver in env.maneuvers_index.values()]
+        # Index of an action : offset of its type, and strides of the
+        # used axes (0 for the others), rows are maneuvers_index
+        self.strides = np.zeros((len(types), len(nvec)), dtype=np.int64)
+        self.offsets = np.zeros(len(types), dtype=np.int64)
+        size = 0
+        for maneuver in types:
+            k = self.type_index(env, maneuver)
+            axes = [env.action_index.index(a)
+                    for a in MANEUVER_AXES[maneuver]]
+            shape = nvec[axes]
+            self.strides[k, axes] = np.append(
+                np.cumprod(shape[:0:-1])[::-1], 1)
+            self.offsets[k] = size
+            size += np.prod(shape)
+
+        key = hashlib.sha1(repr((
+            TABLE_VERSION, plane.signature(), nvec.tolist(),
+            [maneuver.__name__ for maneuver in types])).encode())
+        self.path = os.path.join(directory, 'actions_%s_%s.npy'
+                                 % (plane.name, key.hexdigest()[:16]))
+        if not os.path.exists(self.path):
+            os.makedirs(directory, exist_ok=True)
+            # Written then renamed : processes building the same table
+            # never read a partial file
+            temp = '%s.%d.tmp' % (self.path, os.getpid())
+            with open(temp, 'wb') as f:
+                np.save(f, self.build(env))
+            os.replace(temp, self.path)
+        self.values = np.load(self.path, mmap_mode='r')
+        if self.values.shape != (size, 2):
+            raise Exception("Action table %s does not match the action "
+                            "space" % self.path)
+
+    def build(self, env) -> np.ndarray:
+        """Compute the table with ManeuverBatch
+
+        Parameters
+        ----------
+        env : PlaytimeEnv
+            Environment of the action space
+
+        Returns
+        -------
+        np.ndarray
+            Fuel consumption (liters) and time (seconds) of every action,
+            NaN for zigzags with a zone too small
+        """
+        values = []
+        for maneuver in LIST_MAN:
+            if maneuver not in env.maneuvers_index.values():
+                continue
+            k = self.type_index(env, maneuver)
+            real = real_actions(type_actions(env, k), self.plane)
+            batch = ManeuverBatch(
+                MANEUVER_MISSION[maneuver].value,
+                real['speed'], real['altitude'], real['gap'],
+                real['length'], real['width'], real['radius'], self.plane)
+            values.append(np.stack([batch.total_fuel_consumption(),
+                                    batch.travelled_time()], axis=-1))
+        return np.concatenate(values)
+
+    @staticmethod
+    def type_index(env, maneuver) -> int:
+        """Index of a type of maneuver in the action space
+
+        Parameters
+        ----------
+        env : PlaytimeEnv
+            Environment of the action space
+        maneuver : class
+            Type of maneuver, in LIST_MAN
+
+        Returns
+        -------
+        int
+            Key of the type in maneuvers_index
+        """
+        return next(k for k, m in env.maneuvers_index.items()
+                    if m == maneuver)
+
+    def __len__(self):
+        return len(self.values)
+
+    def index(self, action):
+        """Row of actions in the table
+
+        Parameters
+        ----------
+        action : array
+            Action of the action space, or one action for each row
+
+        Returns
+        -------
+        int or np.ndarray
+            Row of each action
+        """
+        action = np.asarray(action)
+        k = action[..., 0]
+        return self.offsets[k] + (action * self.strides[k]).sum(axis=-1)
+
+    def lookup(self, action) -> tuple:
+        """Fuel consumption and time of an action
+
+        Parameters
+        ----------
+        action : array
+            Action of the action space
+
+        Returns
+        -------
+        (float, float)
+            Fuel consumption (liters) and travelled time (seconds)
+        """
+        fuel, time = self.values[self.index(action)].tolist()
+        return fuel, time
@@ -1,8 +1,70 @@
+import math
 import gym
 import numpy as np
 from gym import spaces
-from function.tools import get_key_from_value
+from gymenv.ActionTable import MANEUVER_MISSION, ActionTable
 from objects.AllManeuvers import *
+from objects.Fleet import Fleet
+from objects.GameplanSpace import GameplanSpace
+from function.instrumentation import Instrumentation
+from function.recorder import TrajectoryRecorder
+
+# Methods timed by the instrumentation, with the name of their phase
+INSTRUMENTED_PHASES = {
+    'step': 'step',
+    'decode_action': 'action_to_real_space',
+    'create_maneuver': 'maneuver_construction',
+    'maneuver_fuel_time': 'fuel_time',
+    'table_fuel_time': 'fuel_time',
+    'action_reward': 'reward',
+    'is_done': 'is_done',
+    'reset': 'reset',
+    'get_new_gameplan': 'get_new_gameplan',
+}
+
+# Real values of an action, in the order of action_index :
+# action * ACTION_SCALE + ACTION_OFFSET. The offsets of speed and altitude
+# are the min of the plane (see plane_action_offsets)
+ACTION_SCALE = np.array([1, 5, 100, 1, 1, 1, 1, 0.5])
+ACTION_OFFSET = np.array([0, 0, 0, 15, 1, 15, 15, 1], dtype=np.float64)
+
+# Maneuver of each class of LIST_MAN, from the real values of an action
+# and the plane
+MANEUVER_BUILDERS = {
+    Wheel: lambda a, plane: Wheel(a[1], a[2], a[7], plane),
+    ShowOfForce: lambda a, plane: ShowOfForce(a[1], plane),
+    Spiral: lambda a, plane: Spiral(a[1], a[2], a[4], a[5], plane),
+    ZigZag: lambda a, plane: ZigZag(a[1], a[2], a[4], a[5], a[6], plane),
+}
+
+# Rewards of action_reward, also used by VecPlaytimeEnv.reward and the
+# planner. Fuel consumed below / above the fuel available
+REWARD_FUEL = 100
+PENALTY_FUEL = 9999
+# Speed, altitude, wheel radius or scan gap not allowed by the gameplan
+PENALTY_LIMITS = 4999
+# Time in / out of the synchro window (seconds around the synchro time)
+SYNCHRO_WINDOW = 30
+REWARD_SYNCHRO = 6000
+PENALTY_SYNCHRO = 100
+# For each maneuver needed by the mission : done at least once, fewer
+# times than needed, as many times as needed, each time above the number
+# needed, or never done
+REWARD_MISSION = 500
+PENALTY_MISSION_FEWER = 100
+REWARD_MISSION_EXACT = 100
+PENALTY_MISSION_EXTRA = 50
+PENALTY_MISSION_MISSING = 1000
+# Only show of force or zigzags, more than MAX_REPEATED times
+MAX_REPEATED = 2
+PENALTY_REPEATED = 9999
+
+# Observation modes : Dict of Discrete spaces, or one float32 vector
+OBSERVATION_MODES = ['dict', 'box']
+
+# Keys of the observation one-hot encoded in the box mode, other keys are
+# divided by their max value
+CATEGORICAL_KEYS = ['Plane', 'Meteo', 'MissionType', 'Strength']
 
 
 class PlaytimeEnv(gym.Env):
@@ -10,50 +72,78 @@ class PlaytimeEnv(gym.Env):
     used for Playtime function, Pronostic"""
     metadata = {'render.modes': ['human']}
 
-    def __init__(self, gameplan_list: list, verbose: int = 0):
+    def __init__(self, gameplan_list: list, verbose: int = 0,
+                 action_tables: str = None, observation: str = 'dict'):
         """Create environment
 
         Parameters
         ----------
-        gameplan_list : list
+        gameplan_list : list or GameplanSpace
             List of all gameplans, will set the observation state
-            at each reset.
+            at each reset. With a GameplanSpace, gameplans are only
+            created when they are drawn.
         verbose : int, optional
             Print more information if != 0, by default 0
+        action_tables : str, optional
+            Directory of the action tables (see ActionTable), fuel and
+            time of the maneuvers are read in the table of the plane
+            instead of being computed. By default None (computed)
+        observation : str, optional
+            'dict' for a Dict of Discrete spaces (MultiInputPolicy), 'box'
+            for one float32 vector (MlpPolicy), see observation_layout.
+            By default 'dict'
+
+        Raises
+        ------
+        Exception
+            If the observation mode is not in OBSERVATION_MODES
         """
         super(PlaytimeEnv, self).__init__()
+        if observation not in OBSERVATION_MODES:
+            raise Exception("Observation mode not supported : %s"
+                            % observation)
+        self.observation_mode = observation
 
         # Verbose if we want to print some parameters in functions.
         self.verbose = verbose
         # Gameplan list are all the possible mission we want the environment
         # to learn.
         self.gameplan_list = gameplan_list
+        # Timers of the phases, None if not enabled
+        self.instrumentation = None
+        # Recorder of the steps, None if not enabled
+        self.recorder = None
         # Set maneuver list or maneuvers done to an empty list.
-        self.maneuver_list = []
+        # Real values of the actions done (see decode_action) and
+        # maneuvers built, see maneuver_list
+        self.maneuver_actions = []
+        self.maneuvers = []
+        # Number of maneuvers done for each Maneuver_Mission
+        self.maneuver_count = dict()
 
         # We create dictionnaries for an enconding similar to onehot
         # in order to create our observation space for string values in
         # the gameplans of gameplan_list
         # Begin onehot index
-        planes = list(set(gp['Plane'] for gp in self.gameplan_list))
+        planes = list(set(self.gameplan_values('Plane')))
         # Ie : Dictionnary for every plane
         self.plane_index = dict()
         for i, p in enumerate(planes):
             self.plane_index[i] = p
 
-        strength = list(set(gp['Strength'] for gp in self.gameplan_list))
+        strength = list(set(self.gameplan_values('Strength')))
         # Dictionnary for every power relations
         self.strength_index = dict()
         for i, s in enumerate(strength):
             self.strength_index[i] = s
 
-        meteo = list(set(gp['Meteo'] for gp in self.gameplan_list))
+        meteo = list(set(self.gameplan_values('Meteo')))
         # Dictionnary for every meteo
         self.meteo_index = dict()
         for i, m in enumerate(meteo):
             self.meteo_index[i] = m
 
-        missionType = list(set(gp['MissionType'] for gp in self.gameplan_list))
+        missionType = list(set(self.gameplan_values('MissionType')))
         # Dictionnary for every mission type
         self.missionType_index = dict()
         for i, mt in enumerate(missionType):
@@ -67,29 +157,53 @@ class PlaytimeEnv(gym.Env):
         for i, ma in enumerate(maneuvers):
             self.maneuvers_index[i] = ma
 
+        # Inverse tables, value to index
+        self.plane_key = {v: k for k, v in self.plane_index.items()}
+        self.strength_key = {v: k for k, v in self.strength_index.items()}
+        self.meteo_key = {v: k for k, v in self.meteo_index.items()}
+        self.missionType_key = {v: k for k, v in
+                                self.missionType_index.items()}
         # End onehot index
 
+        # Every gameplan is encoded once : reset only copies its row.
+        # For a GameplanSpace, only the values of each parameter are
+        # encoded (see encode_gameplans).
+        encoders = {'Plane': self.plane_key,
+                    'Strength': self.strength_key,
+                    'Meteo': self.meteo_key,
+                    'MissionType': self.missionType_key}
+        self.gameplan_matrix = None
+        if isinstance(self.gameplan_list, GameplanSpace):
+            self.gameplan_keys = self.gameplan_list.keys
+            self.gameplan_codes = [
+                np.array([encoders[key][v] if key in encoders else v
+                          for v in self.gameplan_list.values[key]],
+                         dtype=np.int64)
+                for key in self.gameplan_keys]
+        else:
+            self.gameplan_keys = list(self.gameplan_list[0].keys())
+            self.gameplan_matrix = np.array(
+                [[encoders[key][gp[key]] if key in encoders else gp[key]
+                  for key in self.gameplan_keys]
+                 for gp in self.gameplan_list], dtype=np.int64)
+
         # Numerical values for non-string values of gameplan.
 
+        # Parameters of the planes as columns, in the order of plane_index
+        self.fleet = Fleet([self.plane_index[i]
+                            for i in range(len(self.plane_index))])
+
         # We fetch the max fuel quantity in order to create the
         # first observation space. (To change if dynamic space is possible)
         # We add +1 in every numerical values : Discrete(n) goes from 0 to n-1
-        maxfuel = 0
-        for plane in self.plane_index.values():
-            if plane.fuel_max > maxfuel:
-                maxfuel = plane.fuel_max + 1
-
-        max_goal_dist = max(gp['GoalDistance'] for
-                            gp in self.gameplan_list) + 1
-        max_rtb_dist = max(gp['RtBDistance'] for
-                           gp in self.gameplan_list) + 1
-        max_min_time = max(gp['TimeMin'] for
-                           gp in self.gameplan_list) + 1
-        max_sync_time = max(gp['SynchroTime'] for
-                            gp in self.gameplan_list) + 1
-
-        max_time_available = max(p.max_flight_time for
-                                 p in self.plane_index.values()) + 1
+        maxfuel = int(self.fleet.fuel_max.max()) + 1
+
+        max_goal_dist = max(self.gameplan_values('GoalDistance')) + 1
+        max_rtb_dist = max(self.gameplan_values('RtBDistance')) + 1
+        max_min_time = max(self.gameplan_values('TimeMin')) + 1
+        max_sync_time = max(self.gameplan_values('SynchroTime')) + 1
+
+        max_time_available = int(self.fleet.max_flight_time.max()) + 1
 
         # TODO : We have to consider maneuvers parameters to optimize
         # TODO : Try to see if dynamic observation space are possible
@@ -110,6 +224,26 @@ class PlaytimeEnv(gym.Env):
             "SynchroTime": spaces.Discrete(max_sync_time),
         })
 
+        # Box mode : layout of the vector, the Dict space is kept for the
+        # sizes of the values
+        self.observation_layout = None
+        if self.observation_mode == 'box':
+            self.observation_layout = self.build_observation_layout()
+            size = sum(size for _, _, size, _ in self.observation_layout)
+            self.observation = np.zeros(size, dtype=np.float32)
+            self.dict_observation_space = self.observation_space
+            self.observation_space = spaces.Box(0, 1, shape=(size,),
+                                                dtype=np.float32)
+            layout = {key: (offset, scale) for key, offset, _, scale in
+                      self.observation_layout}
+            # Only fuel and time change during an episode
+            self.fuel_position, self.fuel_scale = layout['fuel']
+            self.time_position, self.time_scale = layout['time']
+            # Vectors at the start of the episodes, see gameplan_box
+            if self.gameplan_matrix is not None:
+                self.gameplan_vectors = self.box_observations(
+                    self.gameplan_matrix, 0, 0)
+
         # Name of all parameters in the action space.
         # In the same order as action_space
         self.action_index = [
@@ -135,11 +269,9 @@ class PlaytimeEnv(gym.Env):
                 # Max number of maneuvers
                 len(self.maneuvers_index),
                 # Max speed interval, /5 for scale
-                max(p.MAXSPEED - p.MINSPEED for p in
-                    self.plane_index.values()) / 5,
+                np.max(self.fleet.MAXSPEED - self.fleet.MINSPEED) / 5,
                 # Max altitude interval, /100 for scale
-                max(p.MAXALTITUDE - p.MINALTITUDE for p in
-                    self.plane_index.values()) / 100,
+                np.max(self.fleet.MAXALTITUDE - self.fleet.MINALTITUDE) / 100,
                 # Max goal_dist or rtb_dist for simple move.
                 max(max_goal_dist, max_rtb_dist),
                 # Max gap distance
@@ -153,12 +285,45 @@ class PlaytimeEnv(gym.Env):
             ]
         )
 
-        print(self.observation_space)
-        print(self.action_space)
+        if self.verbose:
+            print(self.observation_space)
+            print(self.action_space)
 
         # This dictionnary is used to add intervals
         self.action_space_interval = dict().fromkeys(self.action_index, 0)
 
+        # Offsets of the real values of the actions for each plane, in the
+        # order of plane_index (see decode_action)
+        self.plane_action_offsets = np.tile(ACTION_OFFSET,
+                                            (len(self.plane_index), 1))
+        self.plane_action_offsets[:, 1] = self.fleet.MINSPEED
+        self.plane_action_offsets[:, 2] = self.fleet.MINALTITUDE
+        # Builder and type of each maneuver of the action space (see
+        # create_maneuver)
+        self.maneuver_builders = [MANEUVER_BUILDERS[self.maneuvers_index[i]]
+                                  for i in range(len(self.maneuvers_index))]
+        self.maneuver_names = [MANEUVER_MISSION[self.maneuvers_index[i]]
+                               for i in range(len(self.maneuvers_index))]
+
+        # Valid actions of every gameplan, see gameplan_action_masks
+        self.action_values = [np.arange(n) for n in self.action_space.nvec]
+        self.action_offsets = np.append(0, np.cumsum(self.action_space.nvec))
+        self.action_mask_keys = [self.gameplan_keys.index(key) for key in
+                                 ('Plane', 'Strength', 'Meteo',
+                                  'MissionType')]
+        self.action_mask_cache = dict()
+        self.gameplan_masks = None
+        if self.gameplan_matrix is not None:
+            self.gameplan_masks = self.gameplan_action_masks(
+                np.arange(len(self.gameplan_list)))
+
+        # Fuel and time of every action for each plane, None if computed
+        self.action_tables = None
+        if action_tables is not None:
+            self.action_tables = {
+                plane: ActionTable(self, plane, action_tables)
+                for plane in self.plane_index.values()}
+
     # Step for the current episode
     # Can change some parameters, for example changing power balance,
     # wind strength / direction, among others
@@ -183,9 +348,99 @@ class PlaytimeEnv(gym.Env):
         # Execute one time step within the environment
         # Action is the new maneuver to add.
 
-        action = dict(zip(self.action_index, action))
-        action = self.action_to_real_space(action)
-        # Action becomes a dict
+        real = self.decode_action(action)
+        name = self.maneuver_names[int(real[0])]
+        if self.action_tables is None:
+            maneuver = self.create_maneuver(real)
+            fuel, time = self.maneuver_fuel_time(maneuver)
+            self.maneuvers.append(maneuver)
+        else:
+            # Only a lookup, the maneuver is not built
+            fuel, time = self.table_fuel_time(action)
+            if math.isnan(fuel):
+                # Same error as the ZigZag constructor
+                raise Exception("Length or width is too small")
+
+        # The state is updated in place, it may have been changed
+        # between two steps
+        state = self.state
+        state['fuel'] = round(state['fuel'] + fuel, 2)
+        state['time'] = round(state['time'] + time, 2)
+
+        self.maneuver_actions.append(real)
+        self.maneuver_count[name] = self.maneuver_count.get(name, 0) + 1
+        done = self.is_done()
+        # The altitude of a show of force is fixed
+        reward = self.action_reward(
+            name, real[1],
+            ALTITUDE_SF if name == Maneuver_Mission.ShowOfForce else real[2],
+            real[4], real[7])
+        if self.recorder is not None:
+            self.recorder.record(self.gameplan_id, real, name.value,
+                                 self.state, reward, done)
+        info = {}
+        # print("Current state : ", self.state)
+        return (self.get_observation(), reward, done, info)
+
+    def decode_action(self, action) -> np.ndarray:
+        """Real values of an action, for the plane of the gameplan
+
+        Parameters
+        ----------
+        action : List [int]
+            Action of the action space
+
+        Returns
+        -------
+        np.ndarray
+            Real values, in the order of action_index
+        """
+        return action * ACTION_SCALE + self.action_offset
+
+    @property
+    def maneuver_list(self) -> list:
+        """Maneuvers done during the episode. With action tables, the
+        maneuvers are only built when the list is read.
+
+        Returns
+        -------
+        list
+            Maneuver of each step
+        """
+        maneuvers = self.maneuvers
+        for action in self.maneuver_actions[len(maneuvers):]:
+            maneuvers.append(self.create_maneuver(action))
+        return maneuvers
+
+    def create_maneuver(self, action: np.ndarray) -> Maneuver:
+        """Create the maneuver of an action, with the builder of its type
+
+        Parameters
+        ----------
+        action : np.ndarray
+            Real values of the action, see decode_action
+
+        Returns
+        -------
+        Maneuver
+            Maneuver chosen by the agent, with its parameters
+        """
+        return self.maneuver_builders[int(action[0])](action, self.plane)
+
+    def build_maneuver(self, action) -> Maneuver:
+        """Create the maneuver of an action given as a dict, step uses
+        create_maneuver
+
+        Parameters
+        ----------
+        action : Dict [String, int]
+            Action with the real values, see action_to_real_space
+
+        Returns
+        -------
+        Maneuver
+            Maneuver chosen by the agent, with its parameters
+        """
         # Get type of maneuver predicted by the agent
         maneuver = self.maneuvers_index[action['maneuver']]
         if maneuver == Wheel:
@@ -201,29 +456,93 @@ class PlaytimeEnv(gym.Env):
             maneuver = maneuver(action['speed'], action['altitude'],
                                 action['gap'], action['length'],
                                 action['width'], self.plane)
+        return maneuver
 
-        fuel = maneuver.total_fuel_consumption()
-        time = maneuver.travelled_time()
-        self.state_to_add = {'fuel': fuel,
-                             'time': time}
+    def maneuver_fuel_time(self, maneuver: Maneuver) -> tuple:
+        """Fuel consumption and time of a maneuver
 
-        # Check if state is correctly initialized
-        assert (k in self.state.keys() for k in self.state_to_add.keys())
+        Parameters
+        ----------
+        maneuver : Maneuver
+            Maneuver done
 
-        for key in self.state_to_add.keys():
-            self.state[key] += self.state_to_add[key]
-            self.state[key] = round(self.state[key], 2)
+        Returns
+        -------
+        (float, float)
+            Fuel consumption (liters) and travelled time (seconds)
+        """
+        return maneuver.total_fuel_consumption(), maneuver.travelled_time()
 
-        self.maneuver_list.append(maneuver)
-        done = self.is_done()
-        reward = self.reward(maneuver)
-        info = {}
-        # print("Current state : ", self.state)
-        return (self.state, reward, done, info)
+    def table_fuel_time(self, action) -> tuple:
+        """Fuel consumption and time of an action, read in the action
+        table of the plane
+
+        Parameters
+        ----------
+        action : List [int]
+            Action of the action space
+
+        Returns
+        -------
+        (float, float)
+            Fuel consumption (liters) and travelled time (seconds)
+        """
+        return self.action_tables[self.plane].lookup(action)
+
+    def enable_instrumentation(self) -> Instrumentation:
+        """Time the phases of step and reset (see INSTRUMENTED_PHASES).
+        Nothing is timed until this is called.
+
+        Returns
+        -------
+        Instrumentation
+            Timers and counters, use snapshot, to_json or to_csv
+        """
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+            self.instrumentation.attach(self, INSTRUMENTED_PHASES)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """Stop timing the phases, the environment uses its usual methods
+        """
+        if self.instrumentation is not None:
+            Instrumentation.detach(self, INSTRUMENTED_PHASES)
+            self.instrumentation = None
+
+    def enable_recording(self, directory: str,
+                         chunk_steps: int = 65536) -> TrajectoryRecorder:
+        """Record every step in columns of files, see TrajectoryRecorder.
+        Read them with TrajectoryReader after disable_recording.
+
+        Parameters
+        ----------
+        directory : str
+            Empty directory of the recording
+        chunk_steps : int, optional
+            Number of steps kept in memory before they are written,
+            by default 65536
+
+        Returns
+        -------
+        TrajectoryRecorder
+            Recorder of the steps
+        """
+        if self.recorder is None:
+            self.recorder = TrajectoryRecorder(directory, chunk_steps)
+        return self.recorder
+
+    def disable_recording(self):
+        """Write the remaining steps and stop recording
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
     # Raise the action_space to the real interval
     def action_to_real_space(self, action):
-        """Raise the actions to the real value we need.
+        """Raise the actions to the real value we need, for an action given
+        as a dict. step uses decode_action.
 
         Parameters
         ----------
@@ -255,13 +574,16 @@ class PlaytimeEnv(gym.Env):
 
         return action
 
-    def reset(self, verbose=1):
+    def reset(self, verbose=1, gameplan: int = None):
         """Set new episode : select new gameplan so new observation
 
         Parameters
         ----------
         verbose : int, optional
             Print additionnal information if 1, by default 1
+        gameplan : int, optional
+            Index of the gameplan in gameplan_list, by default None
+            (random gameplan)
 
         Returns
         -------
@@ -270,35 +592,130 @@ class PlaytimeEnv(gym.Env):
             set fuel and time to 0.
         """
         # print("RESET ENV")
-        self.get_new_gameplan()
+        if gameplan is None:
+            self.get_new_gameplan()
+        else:
+            self.set_gameplan(gameplan)
+        self.set_reward_limits()
         # self.reset_action_space()
-        self.maneuver_list = []
+        self.maneuver_actions = []
+        self.maneuvers = []
+        self.maneuver_count = dict()
+        if self.recorder is not None:
+            self.recorder.start_episode()
 
         self.state = {'fuel': 0,
                       'time': 0}
-        self.state.update(self.gameplan)
-
-        self.state['Plane'] = get_key_from_value(self.plane_index,
-                                                 self.state['Plane'])
-        self.state['Meteo'] = get_key_from_value(self.meteo_index,
-                                                 self.state['Meteo'])
-        self.state['MissionType'] = get_key_from_value(
-                                    self.missionType_index,
-                                    self.state['MissionType'])
-        self.state['Strength'] = get_key_from_value(self.strength_index,
-                                                    self.state['Strength'])
+        encoded = self.encode_gameplans(self.gameplan_id)
+        self.action_mask = self.gameplan_action_masks(self.gameplan_id)
+        self.state.update(zip(self.gameplan_keys, encoded.tolist()))
 
         # TODO : Consider bingo distance and objective distance in the fuel
         # Add a maneuver ?
         # Need to consider the choice of speed in policy.
 
+        if self.observation_layout is not None:
+            self.observation[:] = self.gameplan_box(self.gameplan_id)
+
         # print("Reset, new obs : ", self.state)
         if verbose:
             print("Fuel=", self.fuel,
                   "Tmin=", self.timeMin,
                   "Tsync=", self.synchroTime)
 
-        return self.state
+        return self.get_observation()
+
+    def get_observation(self):
+        """Observation of the current state, according to the observation
+        mode
+
+        Returns
+        -------
+        dict or np.ndarray
+            The state, or a copy of the float32 vector of the box mode
+        """
+        if self.observation_layout is None:
+            return self.state
+        self.observation[self.fuel_position] = min(
+            self.state['fuel'] * self.fuel_scale, 1)
+        self.observation[self.time_position] = min(
+            self.state['time'] * self.time_scale, 1)
+        # The vector is updated in place by the next step or reset
+        return self.observation.copy()
+
+    def build_observation_layout(self) -> list:
+        """Layout of the vector of the box mode, in the order of the keys
+        of the Dict observation space. Keys of CATEGORICAL_KEYS are one-hot
+        encoded, the other keys are divided by the max value of their
+        Discrete space and clipped to 1.
+
+        Returns
+        -------
+        list
+            (key, offset, size, scale) for each key of the observation,
+            scale is None for a one-hot encoding of size values
+        """
+        layout = []
+        offset = 0
+        for key, space in self.observation_space.spaces.items():
+            if key in CATEGORICAL_KEYS:
+                layout.append((key, offset, int(space.n), None))
+                offset += int(space.n)
+            else:
+                layout.append((key, offset, 1, 1 / max(int(space.n) - 1, 1)))
+                offset += 1
+        return layout
+
+    def gameplan_box(self, index) -> np.ndarray:
+        """Vectors of the box mode at the start of the episodes of
+        gameplans, computed once for a list of gameplans
+
+        Parameters
+        ----------
+        index : int or np.ndarray
+            Index of the gameplans in gameplan_list
+
+        Returns
+        -------
+        np.ndarray
+            One vector for each gameplan, see observation_layout
+        """
+        if self.gameplan_matrix is not None:
+            return self.gameplan_vectors[index]
+        return self.box_observations(self.encode_gameplans(index), 0, 0)
+
+    def box_observations(self, encoded: np.ndarray, fuel,
+                         time) -> np.ndarray:
+        """Vectors of the box mode for encoded gameplans
+
+        Parameters
+        ----------
+        encoded : np.ndarray
+            Encoded gameplans, see encode_gameplans
+        fuel : array
+            Fuel consumed (liters), broadcasted with the gameplans
+        time : array
+            Time spent (seconds), broadcasted with the gameplans
+
+        Returns
+        -------
+        np.ndarray
+            One vector for each gameplan, see observation_layout
+        """
+        encoded = np.asarray(encoded)
+        shape = encoded.shape[:-1]
+        values = dict(zip(self.gameplan_keys, np.moveaxis(encoded, -1, 0)))
+        values['fuel'] = np.broadcast_to(fuel, shape)
+        values['time'] = np.broadcast_to(time, shape)
+        size = sum(size for _, _, size, _ in self.observation_layout)
+        vectors = np.zeros(shape + (size,), dtype=np.float32)
+        for key, offset, size, scale in self.observation_layout:
+            if scale is None:
+                np.put_along_axis(vectors, (offset + values[key])[..., None],
+                                  1, axis=-1)
+            else:
+                vectors[..., offset] = np.minimum(values[key] * scale, 1)
+        return vectors
 
     def render(self, mode='human', close=False):
         """ TODO
@@ -315,6 +732,24 @@ class PlaytimeEnv(gym.Env):
         pass
 
     def reward(self, action) -> float:
+        """Reward of a maneuver, see action_reward
+
+        Parameters
+        ----------
+        action : Maneuver
+            Maneuver done
+
+        Returns
+        -------
+        Number
+            Reward given to the agent after the action
+        """
+        return self.action_reward(action.name, action.meanspeed,
+                                  action.altitude, getattr(action, 'gap', 0),
+                                  getattr(action, 'radius', 0))
+
+    def action_reward(self, maneuver: Maneuver_Mission, speed, altitude,
+                      gap, radius) -> float:
         """WIP TODO :
         Reward function for the environment, we want to consider all parameters
         for the episode's gameplan.
@@ -331,10 +766,16 @@ class PlaytimeEnv(gym.Env):
 
         Parameters
         ----------
-        action : Dict [String, int]
-            Contains all values corresponding to the action space
-            with the corresponding key.
-            [ maneuver, speed, altitude, distance, gap, length, width, radius]
+        maneuver : Maneuver_Mission
+            Type of the maneuver
+        speed : float
+            Speed of the maneuver (km/h)
+        altitude : float
+            Altitude of the maneuver (feet)
+        gap : float
+            Gap of the maneuver (km), only used by spirals and zigzags
+        radius : float
+            Radius of the maneuver (km), only used by wheels
 
         Returns
         -------
@@ -351,9 +792,9 @@ class PlaytimeEnv(gym.Env):
         if self.state['fuel'] > self.fuel:
             if self.verbose:
                 print("Too much fuel consumed")
-            reward -= 9999
+            reward -= PENALTY_FUEL
         else:
-            reward += 100
+            reward += REWARD_FUEL
 
         # If we are not in the min time, negative reward, else good reward
         # if self.timeMin > self.state['time']:
@@ -363,79 +804,68 @@ class PlaytimeEnv(gym.Env):
 
         # TODO Change to make this impossible to get
         # If we have value that are not allowed within the range, neg reward
-        minspeed = action.minspeed
-        maxspeed = action.maxspeed
-        minaltitude = action.minaltitude
-        maxaltitude = action.maxaltitude
-        if self.strength == "Weak":
-            minspeed += 30
-        elif self.strength == "Equal":
-            minspeed += 15
-        else:
-            maxspeed -= 10
-
-        if self.meteo != "Sunny":
-            maxaltitude -= 10000
-
-        if (action.meanspeed < minspeed) | (
-            action.meanspeed > maxspeed) | (
-             action.altitude < minaltitude) | (
-             action.altitude > maxaltitude):
+        # Limits depend on the gameplan, see set_reward_limits
+        minspeed, maxspeed = self.speed_limits
+        minaltitude, maxaltitude = self.altitude_limits
+        if (speed < minspeed) | (
+            speed > maxspeed) | (
+             altitude < minaltitude) | (
+             altitude > maxaltitude):
             if self.verbose:
                 print("Bad altitude or bad speed")
             # print(self.gameplan)
-            reward -= 4999
+            reward -= PENALTY_LIMITS
 
         # If we have a wheel, check radius according to gameplan parameters
-        if action.name == Maneuver_Mission.Wheel:  # and (
-            # (self.strength == "Weak" and action.radius < 3.5)
+        if maneuver == Maneuver_Mission.Wheel:  # and (
+            # (self.strength == "Weak" and radius < 3.5)
             #     or
-            if self.meteo != "Sunny" and action.radius != 1:
+            if self.meteo != "Sunny" and radius != 1:
                 if self.verbose:
                     print("Bad radius for this wheel")
-                reward -= 4999
+                reward -= PENALTY_LIMITS
 
-        elif (action.name == Maneuver_Mission.Spiral or
-              action.name == Maneuver_Mission.Zigzag) and (
-                self.meteo != "Sunny" and action.gap > 2):
+        elif (maneuver == Maneuver_Mission.Spiral or
+              maneuver == Maneuver_Mission.Zigzag) and (
+                self.meteo != "Sunny" and gap > 2):
             if self.verbose:
                 print("Bad gap")
-            reward -= 4999
+            reward -= PENALTY_LIMITS
 
         # If we have a synchro time needed and we are close to this time
         # (More or less 30 seconds), reward
         if self.synchroTime != 0:
             diff_time_synchro = abs(self.state['time'] - self.synchroTime)
-            if diff_time_synchro < 30:
-                reward += 6000
+            if diff_time_synchro < SYNCHRO_WINDOW:
+                reward += REWARD_SYNCHRO
             else:
-                reward -= 100
+                reward -= PENALTY_SYNCHRO
 
-        mission_needed = self.missionType.getMinManeuver()
-        man_done = self.count_maneuvers()
+        mission_needed = self.mission_needed
+        man_done = self.maneuver_count
         for mission in mission_needed.keys():
             if mission in man_done:
                 # If the mission is done at least once, we give a reward
-                reward += 500
+                reward += REWARD_MISSION
                 if man_done[mission] < mission_needed[mission]:
-                    reward -= 100
+                    reward -= PENALTY_MISSION_FEWER
                 elif man_done[mission] > mission_needed[mission]:
-                    reward += 50 - (man_done[mission] -
-                                    mission_needed[mission] + 1) * 50
+                    extra = man_done[mission] - mission_needed[mission]
+                    reward -= extra * PENALTY_MISSION_EXTRA
                 else:
-                    reward += 100
+                    reward += REWARD_MISSION_EXACT
             else:
                 # If the mission is not yet done, negative reward
-                reward -= 1000
+                reward -= PENALTY_MISSION_MISSING
 
         # Man_done is with Maneuver_Mission keys
 
         if len(man_done.keys()) == 1:
             key, value = list(man_done.items())[0]
-            if value > 2 and (
+            if value > MAX_REPEATED and (
                 key == Maneuver_Mission.ShowOfForce
                     or key == Maneuver_Mission.Zigzag):
-                reward -= 9999
+                reward -= PENALTY_REPEATED
 
         # if self.timeMin != 0:
         # reward += self.state['time'] - self.timeMin
@@ -449,10 +879,21 @@ class PlaytimeEnv(gym.Env):
         """ Draw a random gameplan in the gameplan list and set current state
         with new parameters
         """
-        r = np.random.randint(0, len(self.gameplan_list))
+        self.set_gameplan(np.random.randint(0, len(self.gameplan_list)))
 
-        self.gameplan = self.gameplan_list[r]
+    def set_gameplan(self, index: int):
+        """Set the gameplan of the current episode
+
+        Parameters
+        ----------
+        index : int
+            Index of the gameplan in gameplan_list
+        """
+        self.gameplan_id = index
+        self.gameplan = self.gameplan_list[index]
         self.plane = self.gameplan['Plane']
+        self.action_offset = self.plane_action_offsets[
+            self.plane_key[self.plane]]
         self.goalDistance = self.gameplan['GoalDistance']
         self.rtbDistance = self.gameplan['RtBDistance']
         self.fuel = self.gameplan['FuelAvailable']
@@ -462,22 +903,184 @@ class PlaytimeEnv(gym.Env):
         self.timeMin = self.gameplan['TimeMin']  # seconds
         self.synchroTime = self.gameplan['SynchroTime']  # seconds
 
+    def gameplan_values(self, key: str) -> list:
+        """Values of a parameter in the gameplans. For a GameplanSpace,
+        these are all the values of the parameter, even if some are only
+        in gameplans removed by a constraint.
+
+        Parameters
+        ----------
+        key : str
+            Name of the parameter
+
+        Returns
+        -------
+        list
+            Values of the parameter
+        """
+        if isinstance(self.gameplan_list, GameplanSpace):
+            return self.gameplan_list.values[key]
+        return [gp[key] for gp in self.gameplan_list]
+
+    def encode_gameplans(self, index):
+        """Encoded values of gameplans, in the order of gameplan_keys
+
+        Parameters
+        ----------
+        index : int or np.ndarray
+            Index of the gameplans in gameplan_list
+
+        Returns
+        -------
+        np.ndarray
+            One row of encoded values for each gameplan
+        """
+        if self.gameplan_matrix is not None:
+            return self.gameplan_matrix[index]
+        digits = self.gameplan_list.digits(index)
+        return np.stack([codes[d] for codes, d in
+                         zip(self.gameplan_codes, digits)], axis=-1)
+
+    def set_reward_limits(self):
+        """Set the values used by the reward which only depend on the
+        gameplan : allowed speeds and altitudes according to strength
+        and meteo, and maneuvers needed for the type of mission.
+        """
+        self.speed_limits, self.altitude_limits = self.reward_limits(
+            self.plane, self.strength, self.meteo)
+        self.mission_needed = self.missionType.getMinManeuver()
+
+    @staticmethod
+    def reward_limits(plane: Plane, strength: str, meteo: str) -> tuple:
+        """Speeds and altitudes allowed by the reward
+
+        Parameters
+        ----------
+        plane : Plane
+            Plane of the gameplan
+        strength : str
+            Strength of the gameplan
+        meteo : str
+            Meteo of the gameplan
+
+        Returns
+        -------
+        ((float, float), (float, float))
+            Min and max speed (km/h), min and max altitude (feet)
+        """
+        minspeed = plane.MINSPEED
+        maxspeed = plane.MAXSPEED
+        minaltitude = plane.MINALTITUDE
+        maxaltitude = plane.MAXALTITUDE
+        if strength == "Weak":
+            minspeed += 30
+        elif strength == "Equal":
+            minspeed += 15
+        else:
+            maxspeed -= 10
+
+        if meteo != "Sunny":
+            maxaltitude -= 10000
+        return (minspeed, maxspeed), (minaltitude, maxaltitude)
+
+    def action_masks(self) -> np.ndarray:
+        """Valid actions of the current gameplan, for the maskable
+        policies of sb3-contrib (MaskablePPO)
+
+        Returns
+        -------
+        np.ndarray
+            Mask of each value of each dimension of the action space,
+            concatenated
+        """
+        return self.action_mask
+
+    def gameplan_action_masks(self, index) -> np.ndarray:
+        """Valid actions of gameplans. Masks are computed once for each
+        plane, strength, meteo and mission type, and stored with the
+        encoded gameplans.
+
+        Parameters
+        ----------
+        index : int or np.ndarray
+            Index of the gameplans in gameplan_list
+
+        Returns
+        -------
+        np.ndarray
+            Masks of the actions (see action_masks) of each gameplan
+        """
+        if self.gameplan_masks is not None:
+            return self.gameplan_masks[index]
+        codes = np.atleast_2d(self.encode_gameplans(index))[
+            :, self.action_mask_keys]
+        keys, inverse = np.unique(codes, axis=0, return_inverse=True)
+        for key in map(tuple, keys.tolist()):
+            if key not in self.action_mask_cache:
+                self.action_mask_cache[key] = self.compute_action_masks(
+                    *key)
+        masks = np.array([self.action_mask_cache[key]
+                          for key in map(tuple, keys.tolist())])
+        return masks[inverse.reshape(-1)].reshape(
+            np.shape(index) + masks.shape[1:])
+
+    def compute_action_masks(self, plane: int, strength: int, meteo: int,
+                             missionType: int) -> np.ndarray:
+        """Valid actions for encoded values of a gameplan : maneuvers of
+        the mission type, speeds and altitudes in the limits of the
+        reward, radius of 1 km for the wheels when the meteo is not
+        sunny, gaps of 2 km at most. A dimension without valid value is
+        not masked.
+
+        Parameters
+        ----------
+        plane : int
+            Index in plane_index
+        strength : int
+            Index in strength_index
+        meteo : int
+            Index in meteo_index
+        missionType : int
+            Index in missionType_index
+
+        Returns
+        -------
+        np.ndarray
+            Masks of the actions, see action_masks
+        """
+        plane = self.plane_index[plane]
+        meteo = self.meteo_index[meteo]
+        (minspeed, maxspeed), (minaltitude, maxaltitude) = \
+            self.reward_limits(plane, self.strength_index[strength], meteo)
+        values = self.action_values
+        allowed = self.missionType_index[missionType].getManeuvers()
+        masks = {0: np.array([MANEUVER_MISSION[self.maneuvers_index[i]] in
+                              allowed for i in values[0]])}
+        # Same values as action_to_real_space
+        speed = values[1] * 5 + plane.MINSPEED
+        masks[1] = (speed >= minspeed) & (speed <= maxspeed)
+        altitude = values[2] * 100 + plane.MINALTITUDE
+        masks[2] = (altitude >= minaltitude) & (altitude <= maxaltitude)
+        if meteo != "Sunny":
+            masks[4] = values[4] + 1 <= 2
+            masks[7] = (values[7] + 2) * 0.5 == 1
+        result = np.ones(self.action_offsets[-1], dtype=bool)
+        for i, mask in masks.items():
+            if mask.any():
+                result[self.action_offsets[i]:self.action_offsets[i + 1]] = \
+                    mask
+        return result
+
     def count_maneuvers(self):
-        """ Use the maneuver list to check and count the maneuvers done
-        during this episode.
+        """ Count the maneuvers done during this episode. Counters are
+        updated at each step.
 
         Returns
         -------
         Dict [Maneuver_Mission, int]
             Number of occurences for each maneuver done
         """
-        count = dict()
-        for man in self.maneuver_list:
-            if man.name in count:
-                count[man.name] += 1
-            else:
-                count[man.name] = 1
-        return count
+        return dict(self.maneuver_count)
 
     def done_sync_time(self) -> bool:
         """Check for current episode time if synchro time is near or done
@@ -490,7 +1093,8 @@ class PlaytimeEnv(gym.Env):
         if self.synchroTime == 0:
             return False
         else:
-            return (abs(self.state['time'] - self.synchroTime) <= 30) or (
+            return (abs(self.state['time'] - self.synchroTime) <=
+                    SYNCHRO_WINDOW) or (
                     self.state['time'] > self.synchroTime)
 
     def done_min_time(self) -> bool:
@@ -0,0 +1,566 @@
+import gym
+import gymnasium
+import numpy as np
+from gymenv.ActionTable import MANEUVER_MISSION
+from gymenv.PlaytimeEnv import (MAX_REPEATED, PENALTY_FUEL, PENALTY_LIMITS,
+                                PENALTY_MISSION_EXTRA, PENALTY_MISSION_FEWER,
+                                PENALTY_MISSION_MISSING, PENALTY_REPEATED,
+                                PENALTY_SYNCHRO, REWARD_FUEL, REWARD_MISSION,
+                                REWARD_MISSION_EXACT, REWARD_SYNCHRO,
+                                SYNCHRO_WINDOW, PlaytimeEnv)
+from objects.AllManeuvers import *
+from objects.ManeuverBatch import ManeuverBatch
+from stable_baselines3.common.vec_env import VecEnv
+
+# Number of gameplans drawn at once for each episode (see _draw_gameplans)
+DRAW_BLOCK = 256
+
+# Values of the gameplan used by step, reward and is_done
+GAMEPLAN_VALUES = ['plane', 'fuel_available', 'time_min', 'synchro_time',
+                   'sunny', 'speed_min', 'speed_max', 'altitude_min',
+                   'altitude_max', 'plane_minspeed', 'plane_minaltitude']
+
+
+def gymnasium_space(space: gym.Space) -> gymnasium.Space:
+    """Same space with the classes of gymnasium, used by stable-baselines3
+
+    Parameters
+    ----------
+    space : gym.Space
+        Dict of Discrete, Box or MultiDiscrete space of PlaytimeEnv
+
+    Returns
+    -------
+    gymnasium.Space
+        Space with the same values
+    """
+    if isinstance(space, gym.spaces.Dict):
+        return gymnasium.spaces.Dict({
+            key: gymnasium_space(s) for key, s in space.spaces.items()})
+    if isinstance(space, gym.spaces.Discrete):
+        return gymnasium.spaces.Discrete(int(space.n))
+    if isinstance(space, gym.spaces.Box):
+        return gymnasium.spaces.Box(space.low, space.high,
+                                    dtype=space.dtype)
+    return gymnasium.spaces.MultiDiscrete(space.nvec)
+
+
+class VecPlaytimeEnv(VecEnv):
+    """Vectorized version of PlaytimeEnv : N episodes are stored as arrays
+    and stepped at once. VecEnv of stable-baselines3, used for training
+    and evaluation (step returns observations, rewards, dones and infos
+    for all episodes, finished episodes are reset automatically)."""
+
+    def __init__(self, gameplan_list: list, num_envs: int,
+                 seed: int = None, verbose: int = 0,
+                 observation: str = 'dict'):
+        """Create the vectorized environment
+
+        Parameters
+        ----------
+        gameplan_list : list
+            List of all gameplans, same as PlaytimeEnv
+        num_envs : int
+            Number of episodes stepped at once
+        seed : int, optional
+            Episode i draws its gameplans like a PlaytimeEnv after
+            np.random.seed(seed + i), by default None (random)
+        verbose : int, optional
+            Print more information if != 0, by default 0
+        observation : str, optional
+            Observation mode, same as PlaytimeEnv, by default 'dict'
+        """
+        self.verbose = verbose
+        # Scalar environment, used for the spaces and the encodings so the
+        # observations and actions are the same as PlaytimeEnv.
+        self.env = PlaytimeEnv(gameplan_list, verbose,
+                               observation=observation)
+        self.gameplan_list = gameplan_list
+        super().__init__(num_envs,
+                         gymnasium_space(self.env.observation_space),
+                         gymnasium_space(self.env.action_space))
+        self.planes = list(self.env.plane_index.values())
+
+        # Type of maneuver (Maneuver_Mission value) for each action index
+        self.maneuver_values = np.array(
+            [MANEUVER_MISSION[self.env.maneuvers_index[i]].value
+             for i in range(len(self.env.maneuvers_index))])
+
+        self.encode_gameplans()
+
+        self.rngs = [np.random.RandomState(None if seed is None
+                                           else seed + i)
+                     for i in range(num_envs)]
+        self.draws = np.zeros((num_envs, DRAW_BLOCK), dtype=np.int64)
+        self.draws_used = np.full(num_envs, DRAW_BLOCK)
+
+        # Number of maneuvers done for each Maneuver_Mission value
+        self.counts = np.zeros((num_envs, len(Maneuver_Mission) + 1),
+                               dtype=np.int64)
+        self.gameplan = np.zeros(num_envs, dtype=np.int64)
+        # Values of the gameplan (GAMEPLAN_VALUES) and observation of the
+        # gameplan for every episode, set at reset
+        self.values = np.zeros((len(GAMEPLAN_VALUES), num_envs))
+        self.episode_obs = np.zeros((len(self.obs_keys), num_envs),
+                                    dtype=self.gameplan_obs.dtype)
+        self.episode_needed = np.zeros_like(self.counts)
+        self.episode_masks = np.zeros((num_envs, self.masks.shape[1]),
+                                      dtype=bool)
+        # Vectors of the box mode, one row for each episode
+        self.box = None
+        if self.gameplan_box is not None:
+            self.box = np.zeros((num_envs, self.gameplan_box.shape[1]),
+                                dtype=np.float32)
+        self.fuel = np.zeros(num_envs)
+        self.time = np.zeros(num_envs)
+        self.actions = None
+
+    def encode_gameplans(self):
+        """Build the arrays used for every gameplan : observation values
+        and reward thresholds (same rules as PlaytimeEnv.reward).
+        """
+        env = self.env
+        gameplans = self.gameplan_list
+        # Observations, encoded by PlaytimeEnv, one row for each key
+        self.obs_keys = env.gameplan_keys
+        self.gameplan_obs = env.encode_gameplans(
+            np.arange(len(gameplans))).T.copy()
+
+        sunny = [gp['Meteo'] == "Sunny" for gp in gameplans]
+        planes = [gp['Plane'] for gp in gameplans]
+        # Allowed speeds and altitudes
+        limits = [env.reward_limits(gp['Plane'], gp['Strength'], gp['Meteo'])
+                  for gp in gameplans]
+        values = {
+            'plane': [env.plane_key[p] for p in planes],
+            'fuel_available': [gp['FuelAvailable'] for gp in gameplans],
+            'time_min': [gp['TimeMin'] for gp in gameplans],
+            'synchro_time': [gp['SynchroTime'] for gp in gameplans],
+            'sunny': sunny,
+            'speed_min': [speed[0] for speed, _ in limits],
+            'speed_max': [speed[1] for speed, _ in limits],
+            'altitude_min': [altitude[0] for _, altitude in limits],
+            'altitude_max': [altitude[1] for _, altitude in limits],
+            # Used by action_to_real_space
+            'plane_minspeed': [p.MINSPEED for p in planes],
+            'plane_minaltitude': [p.MINALTITUDE for p in planes],
+        }
+        self.gameplan_values = np.array([values[name]
+                                         for name in GAMEPLAN_VALUES],
+                                        dtype=np.float64)
+
+        # Vectors of the box mode at the start of the episodes
+        self.gameplan_box = None
+        if env.observation_layout is not None:
+            self.gameplan_box = env.gameplan_box(np.arange(len(gameplans)))
+
+        # Valid actions, see PlaytimeEnv.action_masks
+        self.masks = env.gameplan_action_masks(np.arange(len(gameplans)))
+
+        # Maneuvers needed for the type of mission
+        self.needed = np.zeros((len(gameplans), len(Maneuver_Mission) + 1),
+                               dtype=np.int64)
+        for i, gp in enumerate(gameplans):
+            for mission, nb in gp['MissionType'].getMinManeuver().items():
+                self.needed[i, mission.value] = nb
+
+    def _draw_gameplans(self, envs: np.ndarray) -> np.ndarray:
+        """Draw a random gameplan for each episode in envs, with the
+        same random sequence as PlaytimeEnv.get_new_gameplan.
+
+        Parameters
+        ----------
+        envs : np.ndarray
+            Index of the episodes
+
+        Returns
+        -------
+        np.ndarray
+            Index of the gameplans in gameplan_list
+        """
+        # randint(0, n, size) gives the same numbers as successive
+        # randint(0, n), so we draw them by blocks.
+        for i in envs[self.draws_used[envs] >= DRAW_BLOCK]:
+            self.draws[i] = self.rngs[i].randint(0, len(self.gameplan_list),
+                                                 size=DRAW_BLOCK)
+            self.draws_used[i] = 0
+        drawn = self.draws[envs, self.draws_used[envs]]
+        self.draws_used[envs] += 1
+        return drawn
+
+    def _reset_envs(self, envs: np.ndarray):
+        """Set a new episode for each index in envs
+
+        Parameters
+        ----------
+        envs : np.ndarray
+            Index of the episodes
+        """
+        gameplan = self._draw_gameplans(envs)
+        self.gameplan[envs] = gameplan
+        self.values[:, envs] = self.gameplan_values[:, gameplan]
+        self.episode_obs[:, envs] = self.gameplan_obs[:, gameplan]
+        self.episode_needed[envs] = self.needed[gameplan]
+        self.episode_masks[envs] = self.masks[gameplan]
+        if self.box is not None:
+            self.box[envs] = self.gameplan_box[gameplan]
+        self.fuel[envs] = 0
+        self.time[envs] = 0
+        self.counts[envs] = 0
+
+    def _observation(self) -> dict:
+        """Current observation of every episode
+
+        Returns
+        -------
+        dict or np.ndarray
+            Same keys as the state of PlaytimeEnv, arrays of num_envs
+            values, or one vector for each episode in the box mode
+        """
+        if self.box is not None:
+            env = self.env
+            self.box[:, env.fuel_position] = np.minimum(
+                self.fuel * env.fuel_scale, 1)
+            self.box[:, env.time_position] = np.minimum(
+                self.time * env.time_scale, 1)
+            return self.box.copy()
+        obs = {'fuel': self.fuel.copy(), 'time': self.time.copy()}
+        for key, value in zip(self.obs_keys, self.episode_obs):
+            obs[key] = value.copy()
+        return obs
+
+    def value(self, name: str) -> np.ndarray:
+        """Value of the gameplan for every episode
+
+        Parameters
+        ----------
+        name : str
+            Name of the value, in GAMEPLAN_VALUES
+
+        Returns
+        -------
+        np.ndarray
+            Value for every episode
+        """
+        return self.values[GAMEPLAN_VALUES.index(name)]
+
+    def reset(self) -> dict:
+        """Set new episodes for every environment
+
+        Returns
+        -------
+        dict
+            Observations
+        """
+        self._reset_envs(np.arange(self.num_envs))
+        return self._observation()
+
+    def reset_envs(self, envs) -> dict:
+        """Set new episodes for some environments, for episodes stopped
+        before they are done
+
+        Parameters
+        ----------
+        envs : array
+            Index of the episodes
+
+        Returns
+        -------
+        dict
+            Observations
+        """
+        self._reset_envs(np.asarray(envs))
+        return self._observation()
+
+    def action_masks(self) -> np.ndarray:
+        """Valid actions of the gameplan of every episode, same as
+        PlaytimeEnv.action_masks
+
+        Returns
+        -------
+        np.ndarray
+            One row of masks for each episode
+        """
+        return self.episode_masks.copy()
+
+    def step_async(self, actions):
+        self.actions = actions
+
+    def step_wait(self) -> tuple:
+        return self.step(self.actions)
+
+    def step(self, actions) -> tuple:
+        """Step every episode with its action
+
+        Parameters
+        ----------
+        actions : np.ndarray
+            Actions for every episode, shape (num_envs, 8), same as
+            PlaytimeEnv.step
+
+        Returns
+        -------
+        (dict, np.ndarray, np.ndarray, list)
+            Observations, rewards, dones and infos. Finished episodes are
+            reset, their last observation is in
+            infos[i]['terminal_observation'] and infos[i]['done_fuel']
+            tells if they ended because of the fuel.
+        """
+        actions = np.asarray(actions).reshape(self.num_envs, -1)
+        plane = self.value('plane')
+
+        # Same as PlaytimeEnv.action_to_real_space
+        maneuver = self.maneuver_values[actions[:, 0]]
+        speed = actions[:, 1] * 5 + self.value('plane_minspeed')
+        altitude = actions[:, 2] * 100 + self.value('plane_minaltitude')
+        gap = actions[:, 4] + 1
+        length = actions[:, 5] + 15
+        width = actions[:, 6] + 15
+        radius = (actions[:, 7] + 2) * 0.5
+
+        # One batch for every episode, each with the plane of its gameplan
+        batch = ManeuverBatch(
+            maneuver, speed, altitude, gap, length, width, radius,
+            self.planes[0] if len(self.planes) == 1 else
+            self.env.fleet.take(plane.astype(np.int64)))
+        fuel = batch.total_fuel_consumption()
+        time = batch.travelled_time()
+
+        self.fuel = np.round(self.fuel + fuel, 2)
+        self.time = np.round(self.time + time, 2)
+        self.counts[np.arange(self.num_envs), maneuver] += 1
+
+        done_fuel = self.done_fuel()
+        dones = done_fuel | self.done_time()
+        rewards = self.reward(maneuver, speed, altitude, gap, radius)
+
+        infos = [{} for _ in range(self.num_envs)]
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            last = self._observation()
+            if self.box is not None:
+                keys = None
+                values = last[finished]
+            else:
+                keys = list(last.keys())
+                values = zip(*[last[key][finished].tolist()
+                               for key in keys])
+            for i, value, fuel_end in zip(finished.tolist(), values,
+                                          done_fuel[finished].tolist()):
+                infos[i]['terminal_observation'] = (
+                    value if keys is None else dict(zip(keys, value)))
+                infos[i]['done_fuel'] = fuel_end
+            self._reset_envs(finished)
+        return self._observation(), rewards, dones, infos
+
+    def reward(self, maneuver, speed, altitude, gap, radius) -> np.ndarray:
+        """Reward of the last action of every episode, same as
+        PlaytimeEnv.reward
+
+        Parameters
+        ----------
+        maneuver : np.ndarray
+            Maneuver_Mission value of the maneuvers
+        speed : np.ndarray
+            Speed of the maneuvers (km/h)
+        altitude : np.ndarray
+            Altitude of the maneuvers (feet)
+        gap : np.ndarray
+            Gap of the maneuvers (km)
+        radius : np.ndarray
+            Radius of the maneuvers (km)
+
+        Returns
+        -------
+        np.ndarray
+            Rewards
+        """
+        sunny = self.value('sunny') == 1
+        wheel = maneuver == Maneuver_Mission.Wheel.value
+        show_of_force = maneuver == Maneuver_Mission.ShowOfForce.value
+        scan = ((maneuver == Maneuver_Mission.Spiral.value) |
+                (maneuver == Maneuver_Mission.Zigzag.value))
+        # The altitude of a show of force is fixed
+        altitude = np.where(show_of_force, ALTITUDE_SF, altitude)
+
+        reward = np.where(self.fuel > self.value('fuel_available'),
+                          -PENALTY_FUEL, REWARD_FUEL)
+
+        bad_limits = ((speed < self.value('speed_min')) |
+                      (speed > self.value('speed_max')) |
+                      (altitude < self.value('altitude_min')) |
+                      (altitude > self.value('altitude_max')))
+        reward -= PENALTY_LIMITS * bad_limits
+        reward -= PENALTY_LIMITS * (wheel & ~sunny & (radius != 1))
+        reward -= PENALTY_LIMITS * (scan & ~sunny & (gap > 2))
+
+        synchro_time = self.value('synchro_time')
+        in_window = np.abs(self.time - synchro_time) < SYNCHRO_WINDOW
+        reward += np.where(synchro_time != 0,
+                           np.where(in_window, REWARD_SYNCHRO,
+                                    -PENALTY_SYNCHRO), 0)
+
+        needed = self.episode_needed
+        counts = self.counts
+        mission = REWARD_MISSION + np.where(
+            counts < needed, -PENALTY_MISSION_FEWER,
+            np.where(counts > needed,
+                     -(counts - needed) * PENALTY_MISSION_EXTRA,
+                     REWARD_MISSION_EXACT))
+        mission = np.where(counts > 0, mission, -PENALTY_MISSION_MISSING)
+        reward += np.where(needed > 0, mission, 0).sum(axis=1)
+
+        only_one = np.count_nonzero(counts, axis=1) == 1
+        repeated = (
+            (counts[:, Maneuver_Mission.ShowOfForce.value] > MAX_REPEATED) |
+            (counts[:, Maneuver_Mission.Zigzag.value] > MAX_REPEATED))
+        reward -= PENALTY_REPEATED * (only_one & repeated)
+        return reward
+
+    def done_fuel(self) -> np.ndarray:
+        """Check if the episodes consumed near all their fuel, same as
+        PlaytimeEnv.done_fuel
+
+        Returns
+        -------
+        np.ndarray
+            Near all the fuel is consumed or too much fuel consumed
+        """
+        fuel_available = self.value('fuel_available')
+        remaining = fuel_available - self.fuel
+        return (((remaining < 2) & (remaining >= 0)) |
+                (self.fuel >= fuel_available))
+
+    def done_time(self) -> np.ndarray:
+        """Check if the episodes did their minimum time and reached their
+        synchro time, same as PlaytimeEnv.done_min_time and done_sync_time
+
+        Returns
+        -------
+        np.ndarray
+            Minimum time and synchronization time are done
+        """
+        time_min = self.value('time_min')
+        done_min_time = (time_min == 0) | (self.time >= time_min)
+        synchro_time = self.value('synchro_time')
+        done_sync_time = (synchro_time != 0) & (
+            (np.abs(self.time - synchro_time) <= SYNCHRO_WINDOW) |
+            (self.time > synchro_time))
+        return done_min_time & done_sync_time
+
+    def is_done(self) -> np.ndarray:
+        """Check if the episodes are done, same as PlaytimeEnv.is_done
+
+        Returns
+        -------
+        np.ndarray
+            Is the episode done according to the conditions
+        """
+        return self.done_fuel() | self.done_time()
+
+    def seed(self, seed: int = None) -> list:
+        """Seed the gameplan draws, episode i uses seed + i
+
+        Parameters
+        ----------
+        seed : int, optional
+            Seed, by default None
+
+        Returns
+        -------
+        list
+            Seed of every episode
+        """
+        seeds = [None if seed is None else seed + i
+                 for i in range(self.num_envs)]
+        for rng, s in zip(self.rngs, seeds):
+            rng.seed(s)
+        self.draws_used[:] = DRAW_BLOCK
+        return seeds
+
+    def close(self):
+        pass
+
+    def episodes(self, indices=None) -> list:
+        """Index of the episodes, as given to the methods of VecEnv
+
+        Parameters
+        ----------
+        indices : int or list, optional
+            Index of the episodes, by default None (all the episodes)
+
+        Returns
+        -------
+        list
+            Index of the episodes
+        """
+        if indices is None:
+            return list(range(self.num_envs))
+        if isinstance(indices, int):
+            return [indices]
+        return list(indices)
+
+    def get_attr(self, attr_name: str, indices=None) -> list:
+        """Attribute of the scalar environment, the same for every
+        episode
+
+        Parameters
+        ----------
+        attr_name : str
+            Name of the attribute of PlaytimeEnv
+        indices : int or list, optional
+            Index of the episodes, by default None (all the episodes)
+
+        Returns
+        -------
+        list
+            Value of the attribute for each episode
+        """
+        return [getattr(self.env, attr_name)] * len(self.episodes(indices))
+
+    def set_attr(self, attr_name: str, value, indices=None):
+        """Set an attribute of the scalar environment, shared by every
+        episode
+
+        Parameters
+        ----------
+        attr_name : str
+            Name of the attribute of PlaytimeEnv
+        value : Any
+            New value
+        indices : int or list, optional
+            Not used, the attribute is set for all the episodes
+        """
+        setattr(self.env, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None,
+                   **method_kwargs) -> list:
+        """Call a method of the scalar environment for each episode.
+        action_masks gives the masks of the gameplan of each episode
+        (used by MaskablePPO).
+
+        Parameters
+        ----------
+        method_name : str
+            Name of the method of PlaytimeEnv
+
+        Returns
+        -------
+        list
+            Result of the method for each episode
+        """
+        episodes = self.episodes(indices)
+        if method_name == 'action_masks':
+            return list(self.episode_masks[episodes])
+        method = getattr(self.env, method_name)
+        return [method(*method_args, **method_kwargs) for _ in episodes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list:
+        """The episodes are not gym environments, they are never wrapped
+
+        Returns
+        -------
+        list
+            False for each episode
+        """
+        return [False] * len(self.episodes(indices))
@@ -0,0 +1,507 @@
+import argparse
+import csv
+import multiprocessing
+import time
+import numpy as np
+from gymenv.PlaytimeEnv import PlaytimeEnv
+from objects.Maneuver import Mission_Maneuver
+from objects.Plane import Plane
+from function.tools import get_all_combinations
+
+"""Evaluation of saved policies on PlaytimeEnv, episodes are split in
+    shards run by a pool of processes.
+    Run from src/ with :
+    python -m gymenv.evaluation a2c:a2c_playtime25000 ppo:ppo_playtime25000
+"""
+
+# Reasons for the end of an episode, the index is stored for each episode
+DONE_REASONS = ('fuel', 'time', 'max_steps')
+# Number of episodes in a shard. Shards do not depend on the number of
+# processes, so results are the same whatever the number of processes.
+SHARD_EPISODES = 250
+# Columns recorded for each episode, with their type
+EPISODE_COLUMNS = {
+    'gameplan': np.int64,
+    'reward': np.float64,
+    'return': np.float64,
+    'fuel': np.float64,
+    'time': np.float64,
+    'steps': np.int64,
+    'reason': np.int8,
+}
+
+# Environment and policies of a worker, set by _init_worker
+_worker = dict()
+
+
+def notebook_gameplans() -> list:
+    """Gameplans used in ReinforcementLearning.ipynb
+
+    Returns
+    -------
+    list
+        List of gameplans
+    """
+    param_list = {
+        'Plane': [Plane()],
+        'GoalDistance': [0, 10, 15, 20, 30],
+        'RtBDistance': [0, 10, 15, 20, 30],
+        'FuelAvailable': [15, 20, 30, 35, 40, 60, 80, 100, 120],
+        'Meteo': ["Sunny", "Cloudy", "Misty"],
+        'MissionType': [Mission_Maneuver.SCAR, Mission_Maneuver.CAS],
+        'Strength': ['Weak', 'Equal', 'Strong'],
+        'TimeMin': [0, 1800, 3600],
+        'SynchroTime': [0, 1800, 3600],
+    }
+    combinations = get_all_combinations(param_list)
+    return list(filter(lambda x: x['TimeMin'] < x['SynchroTime']
+                       or x['SynchroTime'] == 0, combinations))
+
+
+def load_policy(checkpoint: tuple):
+    """Load a saved stable-baselines3 model
+
+    Parameters
+    ----------
+    checkpoint : tuple
+        (String, String) Algorithm ('a2c', 'ppo'...) and path of the
+        model. The algorithm 'random' gives uniform random actions.
+
+    Returns
+    -------
+    BaseAlgorithm or None
+        Loaded model, None for random actions
+    """
+    algo, path = checkpoint
+    if algo == 'random':
+        return None
+    # Only imported by the evaluation : torch is slow to import
+    import stable_baselines3
+    if multiprocessing.parent_process() is not None:
+        # The pool already uses every core : one thread for each worker
+        import torch
+        torch.set_num_threads(1)
+    return getattr(stable_baselines3, algo.upper()).load(path)
+
+
+def done_reason(env: PlaytimeEnv) -> int:
+    """Reason for the end of the current episode
+
+    Parameters
+    ----------
+    env : PlaytimeEnv
+        Environment after its last step
+
+    Returns
+    -------
+    int
+        Index in DONE_REASONS
+    """
+    if env.done_fuel():
+        return DONE_REASONS.index('fuel')
+    if env.done_min_time() and env.done_sync_time():
+        return DONE_REASONS.index('time')
+    return DONE_REASONS.index('max_steps')
+
+
+def run_episodes(env: PlaytimeEnv, policy, nb_episodes: int, seed: int,
+                 deterministic: bool = False, max_steps: int = 0) -> dict:
+    """Play episodes with a policy. The gameplans drawn only depend on
+    the seed, so policies evaluated with the same seed play the same
+    gameplans.
+
+    Parameters
+    ----------
+    env : PlaytimeEnv
+        Environment
+    policy : BaseAlgorithm or None
+        Model used to predict the actions, None for random actions
+    nb_episodes : int
+        Number of episodes
+    seed : int
+        Seed of the gameplans (np.random), of the policy and of
+        the random actions
+    deterministic : bool, optional
+        Use deterministic actions of the policy, by default False
+    max_steps : int, optional
+        Stop an episode after this number of steps, 0 for no limit,
+        by default 0
+
+    Returns
+    -------
+    dict
+        (String, np.ndarray) One value per episode for each column of
+        EPISODE_COLUMNS
+    """
+    np.random.seed(seed)
+    env.action_space.seed(seed)
+    if policy is not None:
+        policy.set_random_seed(seed)
+    columns = {name: np.zeros(nb_episodes, dtype=dtype)
+               for name, dtype in EPISODE_COLUMNS.items()}
+    obs = env.reset(verbose=0)
+    for episode in range(nb_episodes):
+        total = 0
+        steps = 0
+        done = False
+        while not done and (max_steps == 0 or steps < max_steps):
+            if policy is None:
+                action = env.action_space.sample()
+            else:
+                action, _ = policy.predict(obs, deterministic=deterministic)
+            obs, reward, done, _ = env.step(action)
+            total += reward
+            steps += 1
+        columns['gameplan'][episode] = env.gameplan_id
+        columns['reward'][episode] = reward
+        columns['return'][episode] = total
+        columns['fuel'][episode] = env.state['fuel']
+        columns['time'][episode] = env.state['time']
+        columns['steps'][episode] = steps
+        columns['reason'][episode] = done_reason(env)
+        obs = env.reset(verbose=0)
+    return columns
+
+
+def run_batched(vec_env, policy, nb_episodes: int, seed: int = None,
+                deterministic: bool = False, max_steps: int = 0) -> dict:
+    """Play episodes with a policy, num_envs episodes are in flight :
+    the policy is called once for all of them at each step and finished
+    episodes are replaced. Episode i of vec_env records its first
+    (nb_episodes + i) // num_envs episodes, so short episodes are not
+    favoured. With num_envs = 1 the episodes are played by run_episodes
+    with the scalar environment : a batch of one is several times slower
+    than the loop of the notebook.
+
+    Parameters
+    ----------
+    vec_env : VecPlaytimeEnv
+        Vectorized environment
+    policy : BaseAlgorithm or None
+        Model used to predict the actions, None for random actions
+    nb_episodes : int
+        Number of episodes
+    seed : int, optional
+        Seed of the gameplans (see VecPlaytimeEnv.seed), of the policy
+        and of the random actions, by default None
+    deterministic : bool, optional
+        Use deterministic actions of the policy, by default False
+    max_steps : int, optional
+        Stop an episode after this number of steps, 0 for no limit,
+        by default 0
+
+    Returns
+    -------
+    dict
+        (String, np.ndarray) One value per episode for each column of
+        EPISODE_COLUMNS, with the number of steps (decisions) in
+        'decisions'
+    """
+    num_envs = vec_env.num_envs
+    if num_envs == 1:
+        columns = run_episodes(vec_env.env, policy, nb_episodes, seed,
+                               deterministic, max_steps)
+        columns['decisions'] = int(columns['steps'].sum())
+        return columns
+    nvec = vec_env.action_space.nvec
+    vec_env.seed(seed)
+    rng = np.random.default_rng(seed)
+    if policy is not None and seed is not None:
+        policy.set_random_seed(seed)
+    targets = (nb_episodes + np.arange(num_envs)) // num_envs
+    recorded = np.zeros(num_envs, dtype=np.int64)
+    total = np.zeros(num_envs)
+    steps = np.zeros(num_envs, dtype=np.int64)
+    columns = {name: np.zeros(nb_episodes, dtype=dtype)
+               for name, dtype in EPISODE_COLUMNS.items()}
+    count = 0
+    decisions = 0
+
+    obs = vec_env.reset()
+    while count < nb_episodes:
+        gameplan = vec_env.gameplan.copy()
+        if policy is None:
+            actions = rng.integers(0, nvec, size=(num_envs, len(nvec)))
+        else:
+            actions, _ = policy.predict(obs, deterministic=deterministic)
+        obs, rewards, dones, infos = vec_env.step(actions)
+        decisions += num_envs
+        total += rewards
+        steps += 1
+
+        # Episodes stopped by max_steps are not reset by vec_env
+        stopped = dones | ((max_steps > 0) & (steps >= max_steps))
+        finished = np.flatnonzero(stopped)
+        kept = finished[recorded[finished] < targets[finished]]
+        if len(kept):
+            out = slice(count, count + len(kept))
+            last = [infos[i]['terminal_observation'] if dones[i] else
+                    {'fuel': vec_env.fuel[i], 'time': vec_env.time[i]}
+                    for i in kept]
+            columns['gameplan'][out] = gameplan[kept]
+            columns['reward'][out] = rewards[kept]
+            columns['return'][out] = total[kept]
+            columns['fuel'][out] = [o['fuel'] for o in last]
+            columns['time'][out] = [o['time'] for o in last]
+            columns['steps'][out] = steps[kept]
+            columns['reason'][out] = [
+                DONE_REASONS.index('max_steps' if not dones[i] else
+                                   'fuel' if infos[i]['done_fuel']
+                                   else 'time') for i in kept]
+            recorded[kept] += 1
+            count += len(kept)
+        truncated = np.flatnonzero(stopped & ~dones)
+        if len(truncated):
+            obs = vec_env.reset_envs(truncated)
+        total[finished] = 0
+        steps[finished] = 0
+    columns['decisions'] = decisions
+    return columns
+
+
+def _init_worker(gameplan_list, deterministic: bool, max_steps: int,
+                 num_envs: int = 0):
+    """Create the environment of a worker, once for all its shards
+    """
+    _worker['env'] = PlaytimeEnv(gameplan_list)
+    _worker['vec_env'] = None
+    if num_envs:
+        # Only imported with num_envs : VecPlaytimeEnv is a VecEnv of
+        # stable-baselines3, slow to import
+        from gymenv.VecPlaytimeEnv import VecPlaytimeEnv
+        _worker['vec_env'] = VecPlaytimeEnv(gameplan_list, num_envs)
+    _worker['policies'] = dict()
+    _worker['deterministic'] = deterministic
+    _worker['max_steps'] = max_steps
+
+
+def _run_shard(task: tuple) -> tuple:
+    """Play the episodes of a shard in a worker. Each checkpoint is
+    loaded once by a worker.
+
+    Parameters
+    ----------
+    task : tuple
+        Index of the checkpoint, checkpoint, index of the shard,
+        number of episodes and seed
+
+    Returns
+    -------
+    tuple
+        Index of the checkpoint, index of the shard and the columns
+        of the episodes (see run_episodes)
+    """
+    index, checkpoint, shard, nb_episodes, seed = task
+    policies = _worker['policies']
+    if checkpoint not in policies:
+        policies[checkpoint] = load_policy(checkpoint)
+    vec_env = _worker['vec_env']
+    if vec_env is None:
+        columns = run_episodes(_worker['env'], policies[checkpoint],
+                               nb_episodes, seed, _worker['deterministic'],
+                               _worker['max_steps'])
+    else:
+        # Below 2 ** 31 : a VecPlaytimeEnv seeds its episodes with
+        # seed + i
+        columns = run_batched(vec_env, policies[checkpoint], nb_episodes,
+                              seed >> 1, _worker['deterministic'],
+                              _worker['max_steps'])
+        del columns['decisions']
+    return index, shard, columns
+
+
+def shard_seeds(seed: int, nb_shards: int) -> list:
+    """Independent seeds for the shards
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the evaluation
+    nb_shards : int
+        Number of shards
+
+    Returns
+    -------
+    list
+        One seed (int) for each shard
+    """
+    return [int(s.generate_state(1)[0]) for s in
+            np.random.SeedSequence(seed).spawn(nb_shards)]
+
+
+def evaluate(checkpoints: list, gameplan_list, nb_episodes: int,
+             processes: int = None, seed: int = 0,
+             deterministic: bool = False, max_steps: int = 0,
+             num_envs: int = 0) -> list:
+    """Evaluate policies, the episodes of every policy are split in
+    shards of SHARD_EPISODES played by a pool of processes. Shard i
+    has the same seed for every policy.
+
+    Parameters
+    ----------
+    checkpoints : list
+        (String, String) Algorithm and path of each model,
+        see load_policy
+    gameplan_list : list or GameplanSpace
+        Gameplans of the environment
+    nb_episodes : int
+        Number of episodes for each policy
+    processes : int, optional
+        Number of processes, by default the number of cores.
+        With 1, episodes are played in this process.
+    seed : int, optional
+        Seed of the evaluation, by default 0
+    deterministic : bool, optional
+        Use deterministic actions of the policies, by default False
+    max_steps : int, optional
+        Max number of steps of an episode, 0 for no limit, by default 0
+    num_envs : int, optional
+        Number of episodes in flight in each worker, the policy predicts
+        their actions at once (see run_batched). By default 0 : one
+        PlaytimeEnv episode at a time (see run_episodes).
+
+    Returns
+    -------
+    list
+        Columns of the episodes (see run_episodes) for each checkpoint,
+        episodes in the order of the shards
+    """
+    sizes = [SHARD_EPISODES] * (nb_episodes // SHARD_EPISODES)
+    if nb_episodes % SHARD_EPISODES:
+        sizes.append(nb_episodes % SHARD_EPISODES)
+    seeds = shard_seeds(seed, len(sizes))
+    tasks = [(index, tuple(checkpoint), shard, size, seeds[shard])
+             for index, checkpoint in enumerate(checkpoints)
+             for shard, size in enumerate(sizes)]
+
+    initargs = (gameplan_list, deterministic, max_steps, num_envs)
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes == 1:
+        _init_worker(*initargs)
+        results = [_run_shard(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes, _init_worker,
+                                  initargs) as pool:
+            results = list(pool.imap_unordered(_run_shard, tasks))
+
+    results.sort(key=lambda r: (r[0], r[1]))
+    return [{name: np.concatenate([r[2][name] for r in results
+                                   if r[0] == index])
+             for name in EPISODE_COLUMNS}
+            for index in range(len(checkpoints))]
+
+
+def summarize(columns: dict) -> dict:
+    """Statistics of the episodes for each gameplan played
+
+    Parameters
+    ----------
+    columns : dict
+        Columns of the episodes, see run_episodes
+
+    Returns
+    -------
+    dict
+        (String, np.ndarray) One value per gameplan played : index of
+        the gameplan, number of episodes, mean and std of the last
+        reward, mean of the return, fuel, time and steps, and the number
+        of episodes ended by each reason of DONE_REASONS
+    """
+    gameplans, inverse, counts = np.unique(
+        columns['gameplan'], return_inverse=True, return_counts=True)
+
+    def mean(values):
+        return np.bincount(inverse, weights=values) / counts
+
+    reward_mean = mean(columns['reward'])
+    stats = {
+        'gameplan': gameplans,
+        'episodes': counts,
+        'reward_mean': reward_mean,
+        'reward_std': np.sqrt(np.maximum(
+            mean(columns['reward'] ** 2) - reward_mean ** 2, 0)),
+        'return_mean': mean(columns['return']),
+        'fuel_mean': mean(columns['fuel']),
+        'time_mean': mean(columns['time']),
+        'steps_mean': mean(columns['steps']),
+    }
+    for code, reason in enumerate(DONE_REASONS):
+        stats['done_' + reason] = np.bincount(
+            inverse, weights=columns['reason'] == code,
+            minlength=len(gameplans)).astype(np.int64)
+    return stats
+
+
+def to_csv(path: str, checkpoints: list, results: list):
+    """Write the statistics of each gameplan for every checkpoint in a
+    CSV file, see summarize
+
+    Parameters
+    ----------
+    path : str
+        Path of the file
+    checkpoints : list
+        Checkpoints evaluated
+    results : list
+        Columns of the episodes for each checkpoint, see evaluate
+    """
+    writer = None
+    with open(path, 'w', newline='') as f:
+        for (algo, model), columns in zip(checkpoints, results):
+            stats = summarize(columns)
+            if writer is None:
+                writer = csv.DictWriter(
+                    f, fieldnames=['algo', 'model'] + list(stats))
+                writer.writeheader()
+            for i in range(len(stats['gameplan'])):
+                row = {name: values[i].item()
+                       for name, values in stats.items()}
+                writer.writerow(dict(algo=algo, model=model, **row))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Evaluate saved policies on PlaytimeEnv")
+    parser.add_argument('checkpoints', nargs='+',
+                        help="algo:path of each model, "
+                             "for example ppo:ppo_playtime25000 or random:")
+    parser.add_argument('--episodes', type=int, default=10000,
+                        help="Number of episodes for each model")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Number of processes, by default the cores")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--deterministic', action='store_true')
+    parser.add_argument('--max-steps', type=int, default=0,
+                        help="Max steps of an episode, 0 for no limit")
+    parser.add_argument('--num-envs', type=int, default=0,
+                        help="Episodes in flight in each process, "
+                             "0 or 1 to play them one by one. Batches "
+                             "are faster from 2 episodes with a policy, "
+                             "from about 16 with random actions")
+    parser.add_argument('--output', help="CSV file for the statistics "
+                                         "of each gameplan")
+    args = parser.parse_args()
+
+    checkpoints = [tuple(c.split(':', 1)) for c in args.checkpoints]
+    start = time.perf_counter()
+    results = evaluate(checkpoints, notebook_gameplans(), args.episodes,
+                       args.processes, args.seed, args.deterministic,
+                       args.max_steps, args.num_envs)
+    print("%d episodes in %.1f s"
+          % (len(checkpoints) * args.episodes, time.perf_counter() - start))
+    for (algo, model), columns in zip(checkpoints, results):
+        reasons = ", ".join(
+            "%s %d" % (reason, np.sum(columns['reason'] == code))
+            for code, reason in enumerate(DONE_REASONS))
+        print("%s %s : reward %.1f, return %.1f, fuel %.1f, time %.0f, "
+              "steps %.2f (%s)"
+              % (algo, model, columns['reward'].mean(),
+                 columns['return'].mean(), columns['fuel'].mean(),
+                 columns['time'].mean(), columns['steps'].mean(), reasons))
+    if args.output:
+        to_csv(args.output, checkpoints, results)
+
+
+if __name__ == '__main__':
+    main()
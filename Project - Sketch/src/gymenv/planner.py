@@ -0,0 +1,604 @@
+import numpy as np
+from gymenv.ActionTable import (MANEUVER_AXES, MANEUVER_MISSION,
+                                real_actions, type_actions)
+from gymenv.PlaytimeEnv import (MAX_REPEATED, PENALTY_MISSION_EXTRA,
+                                PENALTY_MISSION_FEWER,
+                                PENALTY_MISSION_MISSING, PENALTY_REPEATED,
+                                PENALTY_SYNCHRO, REWARD_FUEL, REWARD_MISSION,
+                                REWARD_MISSION_EXACT, REWARD_SYNCHRO,
+                                SYNCHRO_WINDOW, PlaytimeEnv)
+from objects.AllManeuvers import *
+from objects.Maneuver import ALTITUDE_SF
+from objects.ManeuverBatch import ManeuverBatch
+
+"""Exact planner for the gameplans of PlaytimeEnv.
+
+    Fuel and time of the env are sums of values rounded to 0.01, so they
+    are integers in hundredths (cents). A plan is feasible if no maneuver
+    is penalized by PlaytimeEnv.reward (speed, altitude, wheel radius
+    and scan gap), the fuel used stays below the fuel available, and the
+    episode is done (PlaytimeEnv.is_done) at its last maneuver and not
+    before. The planner maximizes the reward of the last step, which is
+    the score of ReinforcementLearning.ipynb, then minimizes the number
+    of maneuvers.
+
+    The last reward only depends on the number of maneuvers of each type
+    and on the final fuel and time. Sums of the other maneuvers do not
+    depend on their order, so the search is over the count vectors, and
+    the existence of a plan for a count vector is answered exactly by
+    min-plus tables : min fuel for each time, and min time for each fuel.
+"""
+
+# Unreachable value in the min-plus tables
+INF = 2 ** 30
+
+# Ways to end an episode : synchro time reached, time done out of the
+# synchro window, fuel done before the time
+END_HIT = 'hit'
+END_MISS = 'miss'
+END_FUEL = 'fuel'
+# Reward of the fuel and the synchro time for each end (see
+# PlaytimeEnv.reward), without synchro time for END_FUEL
+ENDS = [(END_HIT, REWARD_FUEL + REWARD_SYNCHRO),
+        (END_MISS, REWARD_FUEL - PENALTY_SYNCHRO),
+        (END_FUEL, REWARD_FUEL)]
+
+
+def cents(values) -> np.ndarray:
+    """Values rounded to 0.01, as integers in hundredths
+
+    Parameters
+    ----------
+    values : array
+        Fuel (liters) or time (seconds)
+
+    Returns
+    -------
+    np.ndarray
+        Values in hundredths
+    """
+    return np.rint(np.asarray(values) * 100).astype(np.int64)
+
+
+def min_plus(prev: np.ndarray, offsets: np.ndarray,
+             values: np.ndarray) -> np.ndarray:
+    """Min-plus convolution : out[i] = min(prev[i - o] + v) for each
+    (o, v) in zip(offsets, values)
+
+    Parameters
+    ----------
+    prev : np.ndarray
+        Table, INF if not reachable
+    offsets : np.ndarray
+        Sorted offsets (index of the table)
+    values : np.ndarray
+        Values added for each offset
+
+    Returns
+    -------
+    np.ndarray
+        Table of the same length as prev
+    """
+    length = len(prev)
+    out = np.full(length, INF, dtype=np.int64)
+    finite = np.flatnonzero(prev < INF)
+    if len(finite) == 0:
+        return out
+    lo, hi = finite[0], finite[-1] + 1
+    for o, v in zip(offsets.tolist(), values.tolist()):
+        if o + lo >= length:
+            break
+        end = min(hi, length - o)
+        np.minimum(out[o + lo:o + end], prev[lo:end] + v,
+                   out=out[o + lo:o + end])
+    return np.minimum(out, INF)
+
+
+def range_min(table: np.ndarray, lo: np.ndarray, hi: np.ndarray):
+    """Min of table[lo[i]:hi[i] + 1] for each i, with a sparse table
+
+    Parameters
+    ----------
+    table : np.ndarray
+        Values
+    lo : np.ndarray
+        First index of each range
+    hi : np.ndarray
+        Last index of each range, ranges with hi < lo are INF
+
+    Returns
+    -------
+    np.ndarray
+        Min of each range
+    """
+    levels = [table]
+    while 2 ** len(levels) <= len(table):
+        half = 2 ** (len(levels) - 1)
+        last = levels[-1]
+        levels.append(np.minimum(last[:-half], last[half:]))
+    empty = hi < lo
+    size = np.where(empty, 1, hi - lo + 1)
+    k = np.floor(np.log2(size)).astype(np.int64)
+    result = np.full(len(lo), INF, dtype=np.int64)
+    for level in np.unique(k[~empty]).tolist():
+        sel = ~empty & (k == level)
+        result[sel] = np.minimum(
+            levels[level][lo[sel]],
+            levels[level][hi[sel] - 2 ** level + 1])
+    return result
+
+
+class Planner:
+    """Exact planner for the gameplans of a PlaytimeEnv, see the module
+    documentation for the rules."""
+
+    def __init__(self, env: PlaytimeEnv, actions: np.ndarray = None):
+        """Create the planner, actions of each plane are tabulated
+        when they are needed.
+
+        Parameters
+        ----------
+        env : PlaytimeEnv
+            Environment of the gameplans, its action space is searched
+        actions : np.ndarray, optional
+            Actions of the action space to search, by default None
+            (every action)
+        """
+        self.env = env
+        self.types = [env.maneuvers_index[k]
+                      for k in range(len(env.maneuvers_index))]
+        self.missions = [MANEUVER_MISSION[t] for t in self.types]
+        self.searched = None
+        if actions is not None:
+            # Parameters not used by the type of maneuver are ignored
+            actions = np.array(actions)
+            for k, maneuver in enumerate(self.types):
+                unused = [i for i, a in enumerate(env.action_index)
+                          if i > 0 and a not in MANEUVER_AXES[maneuver]]
+                actions[np.ix_(actions[:, 0] == k, unused)] = 0
+            self.searched = np.ravel_multi_index(
+                actions.T, env.action_space.nvec)
+        # Actions of each plane, see action_table
+        self.actions = dict()
+        # Fastest / cheapest actions of each type for each set of
+        # allowed actions, see profiles
+        self.profiles = dict()
+        # Min-plus tables for each set of allowed actions and count
+        # vector, with the type removed to get the previous table
+        self.tables = dict()
+        self.previous = dict()
+        # Sorted candidates for each set of allowed actions, bounds and
+        # maneuvers needed, see candidates
+        self.sorted_candidates = dict()
+        # Length of the tables (hundredths) : fuel before the fuel is
+        # done, time before the synchro time is done, for every gameplan
+        self.fuel_length = round(
+            max(env.gameplan_values('FuelAvailable')) * 100) - 199
+        self.time_length = max(
+            max(env.gameplan_values('SynchroTime')) * 100 -
+            SYNCHRO_WINDOW * 100, 1)
+
+    def action_table(self, plane: Plane) -> dict:
+        """Every action of the action space which builds a maneuver,
+        with only the parameters used by its type (see MANEUVER_AXES).
+
+        Parameters
+        ----------
+        plane : Plane
+            Plane of the gameplan
+
+        Returns
+        -------
+        dict
+            (String, np.ndarray) For each action : type (index in
+            maneuvers_index), action of the action space, speed,
+            altitude, radius, fuel and time (hundredths)
+        """
+        if plane in self.actions:
+            return self.actions[plane]
+        env = self.env
+        nvec = env.action_space.nvec
+        columns = {name: [] for name in
+                   ['type', 'action', 'speed', 'altitude', 'radius',
+                    'fuel', 'time']}
+        for k, maneuver in enumerate(self.types):
+            action = type_actions(env, k)
+            real = real_actions(action, plane)
+            speed, altitude, radius = (real['speed'], real['altitude'],
+                                       real['radius'])
+            batch = ManeuverBatch(self.missions[k].value, speed, altitude,
+                                  real['gap'], real['length'],
+                                  real['width'], radius, plane)
+            valid = batch.valid
+            if self.searched is not None:
+                valid &= np.isin(np.ravel_multi_index(
+                    action.T, nvec), self.searched)
+            if maneuver == ShowOfForce:
+                altitude = np.full(len(action), ALTITUDE_SF)
+            columns['type'].append(np.full(valid.sum(), k))
+            columns['action'].append(action[valid])
+            columns['speed'].append(speed[valid])
+            columns['altitude'].append(altitude[valid])
+            columns['radius'].append(radius[valid])
+            columns['fuel'].append(
+                cents(batch.total_fuel_consumption()[valid]))
+            columns['time'].append(cents(batch.travelled_time()[valid]))
+        table = {name: np.concatenate(values)
+                 for name, values in columns.items()}
+        self.actions[plane] = table
+        return table
+
+    def allowed(self) -> tuple:
+        """Key of the actions allowed by the reward for the gameplan of
+        the env, see PlaytimeEnv.set_reward_limits
+
+        Returns
+        -------
+        tuple
+            Plane, speed limits, altitude limits and sunny meteo
+        """
+        env = self.env
+        return (env.plane, env.speed_limits, env.altitude_limits,
+                env.meteo == "Sunny")
+
+    def profile(self, key: tuple) -> list:
+        """Actions not penalized by the reward, for each type : the
+        cheapest action for each time, and the fastest for each fuel.
+
+        Parameters
+        ----------
+        key : tuple
+            Allowed actions, see allowed
+
+        Returns
+        -------
+        list
+            For each type, dict with 'by_time' and 'by_fuel' : (time,
+            fuel, row of the action table) sorted by time or by fuel
+        """
+        if key in self.profiles:
+            return self.profiles[key]
+        plane, (minspeed, maxspeed), (minaltitude, maxaltitude), sunny = key
+        table = self.action_table(plane)
+        ok = ((table['speed'] >= minspeed) & (table['speed'] <= maxspeed) &
+              (table['altitude'] >= minaltitude) &
+              (table['altitude'] <= maxaltitude))
+        if not sunny:
+            wheel = self.types.index(Wheel) if Wheel in self.types else -1
+            ok &= (table['type'] != wheel) | (table['radius'] == 1)
+        profiles = []
+        for k in range(len(self.types)):
+            rows = np.flatnonzero(ok & (table['type'] == k))
+            time = table['time'][rows]
+            fuel = table['fuel'][rows]
+            profile = dict()
+            for name, first, second in [('by_time', time, fuel),
+                                        ('by_fuel', fuel, time)]:
+                order = np.lexsort((second, first))
+                keep = np.ones(len(order), dtype=bool)
+                keep[1:] = first[order][1:] != first[order][:-1]
+                order = order[keep]
+                profile[name] = (time[order], fuel[order], rows[order])
+            profiles.append(profile)
+        self.profiles[key] = profiles
+        return profiles
+
+    def table(self, key: tuple, kind: str, counts: tuple) -> np.ndarray:
+        """Min-plus table of the sums of maneuvers of a count vector :
+        min fuel for each time ('time') or min time for each fuel
+        ('fuel'), in hundredths.
+
+        Parameters
+        ----------
+        key : tuple
+            Allowed actions, see allowed
+        kind : str
+            'time' or 'fuel', index of the table
+        counts : tuple
+            Number of maneuvers of each type
+
+        Returns
+        -------
+        np.ndarray
+            Table, INF if not reachable
+        """
+        name = (key, kind, counts)
+        if name in self.tables:
+            return self.tables[name]
+        length = self.time_length if kind == 'time' else self.fuel_length
+        if sum(counts) == 0:
+            table = np.full(length, INF, dtype=np.int64)
+            table[0] = 0
+        else:
+            profiles = self.profile(key)
+            axis = 'by_' + kind
+            # Previous table with the type which has the fewest entries
+            k = min((k for k in range(len(counts)) if counts[k]),
+                    key=lambda k: len(profiles[k][axis][0]))
+            previous = list(counts)
+            previous[k] -= 1
+            time, fuel, _ = profiles[k][axis]
+            offsets, values = (time, fuel) if kind == 'time' else (fuel,
+                                                                   time)
+            table = min_plus(self.table(key, kind, tuple(previous)),
+                             offsets, values)
+            self.previous[name] = k
+        self.tables[name] = table
+        return table
+
+    def backtrack(self, key: tuple, kind: str, counts: tuple,
+                  index: int) -> list:
+        """Maneuvers of a count vector reaching an entry of its table
+
+        Parameters
+        ----------
+        key : tuple
+            Allowed actions
+        kind : str
+            'time' or 'fuel'
+        counts : tuple
+            Number of maneuvers of each type
+        index : int
+            Index in the table (time or fuel)
+
+        Returns
+        -------
+        list
+            Rows of the action table
+        """
+        profiles = self.profile(key)
+        rows = []
+        value = self.table(key, kind, counts)[index]
+        while sum(counts):
+            k = self.previous[(key, kind, counts)]
+            previous = list(counts)
+            previous[k] -= 1
+            previous = tuple(previous)
+            table = self.table(key, kind, previous)
+            time, fuel, row = profiles[k]['by_' + kind]
+            offsets, values = (time, fuel) if kind == 'time' else (fuel,
+                                                                   time)
+            before = index - offsets
+            ok = before >= 0
+            match = np.flatnonzero(ok & (table[np.where(ok, before, 0)] +
+                                         values == value))[0]
+            rows.append(row[match])
+            index -= offsets[match]
+            value -= values[match]
+            counts = previous
+        return rows
+
+    def mission_reward(self, counts: np.ndarray) -> np.ndarray:
+        """Part of the reward given by the maneuvers done, same as
+        PlaytimeEnv.reward, for each count vector
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            Number of maneuvers of each type, one row per count vector
+
+        Returns
+        -------
+        np.ndarray
+            Reward of the maneuvers done
+        """
+        reward = np.zeros(len(counts), dtype=np.int64)
+        for mission, needed in self.env.mission_needed.items():
+            if mission not in self.missions:
+                reward -= PENALTY_MISSION_MISSING
+                continue
+            done = counts[:, self.missions.index(mission)]
+            reward += np.where(
+                done == 0, -PENALTY_MISSION_MISSING,
+                REWARD_MISSION + np.where(
+                    done < needed, -PENALTY_MISSION_FEWER,
+                    np.where(done > needed,
+                             -(done - needed) * PENALTY_MISSION_EXTRA,
+                             REWARD_MISSION_EXACT)))
+        repeated = np.zeros(len(counts), dtype=bool)
+        for mission in [Maneuver_Mission.ShowOfForce,
+                        Maneuver_Mission.Zigzag]:
+            if mission in self.missions:
+                repeated |= (counts[:, self.missions.index(mission)] >
+                             MAX_REPEATED)
+        only_one = np.count_nonzero(counts, axis=1) == 1
+        return reward - PENALTY_REPEATED * (only_one & repeated)
+
+    def candidates(self, key: tuple, bounds: tuple) -> tuple:
+        """Count vectors which can end an episode within the fuel and time
+        bounds, with the type of the last maneuver and the way to end,
+        sorted by reward then number of maneuvers.
+
+        Parameters
+        ----------
+        key : tuple
+            Allowed actions, see allowed
+        bounds : tuple
+            Bounds of the gameplan in hundredths, see plan
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+            Count vector of the maneuvers before the last one, type of
+            the last maneuver, index of the end in ENDS and reward of
+            the last step
+        """
+        needed = tuple(self.env.mission_needed.items())
+        name = (key, bounds, needed)
+        if name in self.sorted_candidates:
+            return self.sorted_candidates[name]
+        fuel_open, fuel_max, time_done, time_hit = bounds
+        synchro = time_hit > 0
+        profiles = self.profile(key)
+        nb_types = len(self.types)
+
+        def bound(axis, i, f):
+            return np.array([f(p[axis][i]) if len(p[axis][i]) else INF
+                             for p in profiles])
+        min_fuel = bound('by_fuel', 1, np.min)
+        max_fuel = bound('by_fuel', 1, np.max)
+        min_time = bound('by_time', 0, np.min)
+        max_time = bound('by_time', 0, np.max)
+
+        # Every count vector with a total fuel below the fuel available
+        sizes = [fuel_max // f + 1 if f < INF else 1
+                 for f in min_fuel.tolist()]
+        counts = np.stack(np.meshgrid(*[np.arange(n) for n in sizes],
+                                      indexing='ij'),
+                          axis=-1).reshape(-1, nb_types)
+        counts = counts[(counts.sum(axis=1) > 0) &
+                        (counts @ min_fuel <= fuel_max)]
+        mission = self.mission_reward(counts)
+
+        found = []
+        for last in range(nb_types):
+            before = counts.copy()
+            before[:, last] -= 1
+            ok = (before[:, last] >= 0) & (before @ min_fuel <= fuel_open)
+            if synchro:
+                ok &= before @ min_time < time_done
+            for end, (end_name, reward) in enumerate(ENDS):
+                if end_name == END_HIT:
+                    keep = ok & synchro & (counts @ max_time > time_done) & (
+                        counts @ min_time < time_hit)
+                elif end_name == END_MISS:
+                    keep = ok & synchro & (counts @ max_time >= time_done)
+                else:
+                    keep = ok & (counts @ max_fuel > fuel_open)
+                    if synchro:
+                        keep &= counts @ min_time < time_done
+                        reward -= PENALTY_SYNCHRO
+                rows = np.flatnonzero(keep)
+                found.append((before[rows], np.full(len(rows), last),
+                              np.full(len(rows), end),
+                              mission[rows] + reward))
+        before, last, end, value = [np.concatenate(c) for c in zip(*found)]
+        order = np.lexsort((before.sum(axis=1), -value))
+        result = (before[order], last[order], end[order], value[order])
+        self.sorted_candidates[name] = result
+        return result
+
+    def plan(self, gameplan: int) -> dict:
+        """Best plan for a gameplan
+
+        Parameters
+        ----------
+        gameplan : int
+            Index of the gameplan in the gameplan list of the env
+
+        Returns
+        -------
+        dict or None
+            'actions' (actions of the action space, in order), 'reward'
+            (reward of the last step), 'fuel' and 'time' at the end and
+            'end' (END_HIT, END_MISS or END_FUEL). None if no plan is
+            feasible.
+
+        Raises
+        ------
+        Exception
+            If the minimum time is after the start of the synchro window
+        """
+        env = self.env
+        env.reset(verbose=0, gameplan=gameplan)
+        synchro = env.synchroTime
+        if synchro and env.timeMin > synchro - SYNCHRO_WINDOW:
+            raise Exception("TimeMin must be <= SynchroTime - %d"
+                            % SYNCHRO_WINDOW)
+        key = self.allowed()
+
+        # Last fuel not done (fuel available - fuel >= 2), last fuel
+        # allowed, first time done (synchro time - 30) and end of the
+        # synchro window, in hundredths. Time bounds are 0 without
+        # synchro time : the episode only ends with the fuel.
+        fuel_open = int(np.floor(round((env.fuel - 2) * 100, 6)))
+        fuel_max = int(np.floor(round(env.fuel * 100, 6)))
+        window = SYNCHRO_WINDOW * 100
+        time_done = synchro * 100 - window if synchro else 0
+        time_hit = synchro * 100 + window if synchro else 0
+        if fuel_open < 0:
+            return None
+        bounds = (fuel_open, fuel_max, time_done, time_hit)
+
+        for before, last, end, value in zip(*self.candidates(key, bounds)):
+            before = tuple(before.tolist())
+            found = self.last_maneuver(key, before, int(last),
+                                       ENDS[end][0], bounds)
+            if found is not None:
+                kind, index, row = found
+                steps = self.backtrack(key, kind, before, index) + [row]
+                table = self.action_table(env.plane)
+                return {'actions': table['action'][steps],
+                        'reward': int(value),
+                        'fuel': table['fuel'][steps].sum() / 100,
+                        'time': table['time'][steps].sum() / 100,
+                        'end': ENDS[end][0]}
+        return None
+
+    def last_maneuver(self, key: tuple, before: tuple, last: int,
+                      end: str, bounds: tuple) -> tuple:
+        """Find the last maneuver of a plan and the sums of the other
+        maneuvers, for a way to end the episode
+
+        Parameters
+        ----------
+        key : tuple
+            Allowed actions
+        before : tuple
+            Number of maneuvers of each type before the last one
+        last : int
+            Type of the last maneuver
+        end : str
+            END_HIT, END_MISS or END_FUEL
+        bounds : tuple
+            Bounds of the gameplan in hundredths, see plan
+
+        Returns
+        -------
+        tuple or None
+            Kind of table, index in the table of the maneuvers before,
+            row of the last maneuver in the action table. None if there
+            is no such plan.
+        """
+        fuel_open, fuel_max, time_done, time_hit = bounds
+        profile = self.profile(key)[last]
+        if end == END_FUEL:
+            # Sums in the 'fuel' table : min time for each fuel
+            table = self.table(key, 'fuel', before)
+            fuel, time, row = profile['by_fuel'][1], profile['by_fuel'][0], \
+                profile['by_fuel'][2]
+            lo = np.maximum(fuel_open + 1 - fuel, 0)
+            hi = np.minimum(fuel_open, fuel_max - fuel)
+            best = range_min(table, lo, hi)
+            limit = (time_done - 1 - time) if time_hit > 0 else INF - 1
+            ok = np.flatnonzero(best <= limit)
+            if len(ok) == 0:
+                return None
+            i = ok[0]
+            index = lo[i] + np.argmin(table[lo[i]:hi[i] + 1])
+            return 'fuel', int(index), row[i]
+
+        # Sums in the 'time' table : min fuel for each time
+        table = self.table(key, 'time', before).copy()
+        table[table > fuel_open] = INF
+        time, fuel, row = profile['by_time']
+        if end == END_HIT:
+            ranges = [(np.maximum(time_done + 1 - time, 0),
+                       np.minimum(time_done - 1, time_hit - 1 - time))]
+        else:
+            point = time_done - time
+            ranges = [(np.maximum(time_hit - time, 0),
+                       np.full(len(time), time_done - 1)),
+                      (np.where(point >= 0, point, 1),
+                       np.where(point >= 0, point, 0))]
+        found = None
+        for lo, hi in ranges:
+            total = range_min(table, lo, hi) + fuel
+            i = int(np.argmin(total))
+            if total[i] <= fuel_max and (found is None or
+                                         total[i] < found[0]):
+                index = lo[i] + np.argmin(table[lo[i]:hi[i] + 1])
+                found = (total[i], int(index), row[i])
+        if found is None:
+            return None
+        return 'time', found[1], found[2]
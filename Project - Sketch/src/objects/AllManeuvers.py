@@ -1,6 +1,6 @@
-from math import pi
+from abc import ABC, abstractmethod
+from math import pi, ceil, ldexp
 from objects.Maneuver import *
-import scipy.integrate as integrate
 from inspect import signature
 
 # For all those maneuvers, check the Playtime's Miro to have more details
@@ -39,43 +39,187 @@ class ZigZag(Maneuver):
         self.gap = gap
         self.length = zone_length
         self.width = zone_width
-        if self.length < gap or self.width < gap:
+        if not self.valid_zone(self.length, self.width, gap):
             raise Exception("Length or width is too small")
 
         distance = self.calculate_distance(self.length, self.width, gap)
         super().__init__(Maneuver_Mission.Zigzag, speed,
                          altitude, distance, plane)
 
+    @staticmethod
+    def valid_zone(length, width, gap):
+        """Check if the zone is large enough for the gap.
+        Works with floats or arrays (broadcasted together).
+
+        Parameters
+        ----------
+        length : float or array
+            Length of the zone to scan (km)
+        width : float or array
+            Width of the zone to scan (km)
+        gap : float or array
+            Gap between each pass through (km)
+
+        Returns
+        -------
+        bool or array of bool
+            False if the length or the width is smaller than the gap
+        """
+        return (np.asarray(length) >= gap) & (np.asarray(width) >= gap)
+
+    @staticmethod
+    def nb_pass(width, gap):
+        """Number of pass through needed to scan the width of the zone.
+        Works with floats or arrays (broadcasted together).
+
+        Parameters
+        ----------
+        width : float or array
+            Width of the zone to scan (km)
+        gap : float or array
+            Gap between each pass through (km)
+
+        Returns
+        -------
+        float or array
+            Number of lines in the zigzag
+        """
+        # Start at half gap for the first line, then a line every gap
+        # while width_travelled < width - radius.
+        if np.ndim(width) == 0 and np.ndim(gap) == 0:
+            width, gap = float(width), float(gap)
+            radius = gap / 2
+            end = width - radius
+            ratio = (end - radius) / gap
+            # Off the border, or exact additions (see below)
+            if abs(ratio - round(ratio)) >= 1e-6 or (
+                    ldexp(gap, 20) % 1 == 0 and ldexp(width, 20) % 1 == 0 and
+                    abs(width) < 2 ** 30):
+                return float(max(ceil(ratio), 0))
+            # On the border, replay the additions (see below)
+            count = 0
+            width_travelled = radius
+            while width_travelled < end:
+                count += 1
+                width_travelled += gap
+            return float(count)
+
+        width, gap = np.broadcast_arrays(np.asarray(width, dtype=np.float64),
+                                         np.asarray(gap, dtype=np.float64))
+        radius = gap / 2
+        end = width - radius
+        ratio = (end - radius) / gap
+        count = np.array(np.maximum(np.ceil(ratio), 0))
+
+        # When the last line ends right on the border, the result depends
+        # on the rounding of width_travelled += gap. Additions are exact
+        # for gap and width multiple of 2 ** -20 (1, 0.5, 0.25...), for
+        # the other values we replay the same additions.
+        exact = ((np.ldexp(gap, 20) % 1 == 0) &
+                 (np.ldexp(width, 20) % 1 == 0) &
+                 (np.abs(width) < 2 ** 30))
+        border = (np.abs(ratio - np.round(ratio)) < 1e-6) & ~exact
+        if np.any(border):
+            border_gap = gap[border]
+            border_end = end[border]
+            width_travelled = radius[border]
+            replay = np.zeros(width_travelled.shape)
+            active = width_travelled < border_end
+            while np.any(active):
+                replay += active
+                width_travelled = width_travelled + border_gap
+                active &= width_travelled < border_end
+            count[border] = replay
+
+        if count.ndim == 0:
+            return float(count)
+        return count
+
     # Calculate the total length of zigzag
-    def calculate_distance(self, length: float, width: float,
-                           gap: float) -> float:
-        """Calculate the travelled distance for the zigzag / radiator
+    @staticmethod
+    def calculate_distance(length, width, gap):
+        """Calculate the travelled distance for the zigzag / radiator.
+        Works with floats or arrays (broadcasted together).
 
         Parameters
         ----------
-        length : float
+        length : float or array
             Length of the zone to scan (km)
-        width : float
+        width : float or array
             Width of the zone to scan (km)
-        gap : float
+        gap : float or array
             Gap between each pass through (km)
 
         Returns
         -------
-        float
+        float or array
             Travelled distance
         """
         radius = gap / 2
         line = length - gap
         arc = pi * radius
-        distance = 0
-        width_travelled = radius
-        # Start at half gap for the first line
-        while width_travelled < width - radius:
-            distance += line + arc
-            width_travelled += gap
+        return ZigZag.nb_pass(width, gap) * (line + arc)
 
-        return distance
+    @staticmethod
+    def calculate_distance_gradient(length, width, gap) -> tuple:
+        """Derivatives of calculate_distance, the number of pass through
+        is constant by parts. Works with floats or arrays.
+
+        Parameters
+        ----------
+        length : float or array
+            Length of the zone to scan (km)
+        width : float or array
+            Width of the zone to scan (km)
+        gap : float or array
+            Gap between each pass through (km)
+
+        Returns
+        -------
+        (float or array, float or array)
+            d(distance)/d(gap) and d(distance)/d(length), the width has
+            no derivative
+        """
+        nb_pass = ZigZag.nb_pass(width, gap)
+        return nb_pass * (pi / 2 - 1), nb_pass * np.ones_like(length)
+
+    def parameters_jacobian(self) -> np.ndarray:
+        """See Maneuver.parameters_jacobian, the distance depends on the
+        gap and the length of the zone.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (3, len(GRADIENT_PARAMETERS))
+        """
+        jacobian = super().parameters_jacobian()
+        jacobian[2, 2:4] = self.calculate_distance_gradient(
+            self.length, self.width, self.gap)
+        return jacobian
+
+    @classmethod
+    def batch_distance(cls, length, width, gap) -> tuple:
+        """Calculate the travelled distance for a batch of zigzags,
+        with a mask instead of an exception for the zones too small.
+
+        Parameters
+        ----------
+        length : array
+            Length of the zone to scan (km)
+        width : array
+            Width of the zone to scan (km)
+        gap : array
+            Gap between each pass through (km)
+
+        Returns
+        -------
+        (array, array)
+            Travelled distance (NaN if not valid) and mask of valid zones
+        """
+        valid = cls.valid_zone(length, width, gap)
+        distance = np.where(valid, cls.calculate_distance(length, width, gap),
+                            np.nan)
+        return distance, valid
 
     @classmethod
     def _nb_param_(cls) -> int:
@@ -118,32 +262,99 @@ class Spiral(Maneuver):
         super().__init__(Maneuver_Mission.Spiral, speed,
                          altitude, distance, plane)
 
-    def calculate_distance(self, length: float, gap: float) -> float:
-        """Calculate the total length / travelled distance of the spiral
+    @staticmethod
+    def calculate_distance(length, gap):
+        """Calculate the total length / travelled distance of the spiral.
+        Works with floats or arrays (broadcasted together).
 
         Parameters
         ----------
-        length : float
+        length : float or array
             Length and width of the zone to scan
-        gap : float
+        gap : float or array
             Gap between each pass through (km)
 
         Returns
         -------
-        float
+        float or array
             Total length of the spiral
         """
         # Source : https://planetcalc.com/9063 (https://fr.planetcalc.com/9063)
         # https://www.intmath.com/blog/mathematics/length-of-an-archimedean-spiral-6595
-        r = length - gap
+        r = np.asarray(length, dtype=np.float64) - gap
         nb_rings = (r / (gap * 2))
-        start_theta = 0
         end_theta = nb_rings * 2 * pi
         b = gap / (2 * pi)
-        distance = integrate.quad(lambda theta:
-                                  np.sqrt((b * theta) ** 2 + b ** 2),
-                                  start_theta, end_theta)
-        return distance[0]
+        # Closed form of the integral of sqrt((b * theta) ** 2 + b ** 2)
+        # between 0 and end_theta
+        distance = b / 2 * (end_theta * np.sqrt(1 + end_theta ** 2)
+                            + np.arcsinh(end_theta))
+        if distance.ndim == 0:
+            return float(distance)
+        return distance
+
+    @staticmethod
+    def calculate_distance_gradient(length, gap) -> tuple:
+        """Derivatives of calculate_distance, from the closed form of the
+        spiral length. Works with floats or arrays.
+
+        Parameters
+        ----------
+        length : float or array
+            Length and width of the zone to scan
+        gap : float or array
+            Gap between each pass through (km)
+
+        Returns
+        -------
+        (float or array, float or array)
+            d(distance)/d(gap) and d(distance)/d(length)
+        """
+        length = np.asarray(length, dtype=np.float64)
+        end_theta = (length - gap) / (gap * 2) * 2 * pi
+        b = gap / (2 * pi)
+        distance = Spiral.calculate_distance(length, gap)
+        # d(distance)/d(end_theta) = b * sqrt(1 + end_theta ** 2)
+        theta_slope = b * np.sqrt(1 + end_theta ** 2)
+        d_gap = distance / gap - theta_slope * pi * length / gap ** 2
+        d_length = theta_slope * pi / gap
+        if d_gap.ndim == 0:
+            return float(d_gap), float(d_length)
+        return d_gap, d_length
+
+    def parameters_jacobian(self) -> np.ndarray:
+        """See Maneuver.parameters_jacobian, the distance depends on the
+        gap and the length of the zone.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (3, len(GRADIENT_PARAMETERS))
+        """
+        jacobian = super().parameters_jacobian()
+        jacobian[2, 2:4] = self.calculate_distance_gradient(self.length,
+                                                            self.gap)
+        return jacobian
+
+    @classmethod
+    def distance_grid(cls, lengths, gaps):
+        """Calculate the length of the spiral for every combination
+        of zone length and gap.
+
+        Parameters
+        ----------
+        lengths : array
+            Lengths of the zone to scan (km)
+        gaps : array
+            Gaps between each pass through (km)
+
+        Returns
+        -------
+        array
+            Total length of the spirals, shape (len(lengths), len(gaps))
+        """
+        return cls.calculate_distance(np.asarray(lengths)[:, np.newaxis],
+                                      np.asarray(gaps)[np.newaxis, :])
 
     @classmethod
     def _nb_param_(cls):
@@ -157,25 +368,92 @@ class Spiral(Maneuver):
         return len(signature(cls.__init__).parameters)
 
 
-# Intimidation maneuver.
+# Maneuver with several legs, see travel_plan.
 
-class ShowOfForce(Maneuver):
-    # maxspeed: int, minspeed: int,
-    def __init__(self, meanspeed: int, plane: Plane):
-        """Create show of force maneuver, intimidation
+class MultiLegManeuver(Maneuver, ABC):
+    """Maneuver broken down in several SimpleMove legs. Fuel consumption
+    and time of the legs are computed once and cached, the cache is
+    invalidated if the speed, the altitude or the radius change."""
 
-        Parameters
-        ----------
-        meanspeed : int
-            Mean speed used to make distance (km/h)
-        plane : Plane
-            Type of plane
+    # Attributes used by travel_plan
+    PLAN_PARAMETERS = ('meanspeed', 'altitude', 'radius')
+
+    def __setattr__(self, name, value):
+        if name in self.PLAN_PARAMETERS:
+            self.__dict__['_legs'] = None
+        super().__setattr__(name, value)
+
+    @abstractmethod
+    def travel_plan(self) -> list:
+        """Break down of the steps of this maneuver.
+
+        Returns
+        -------
+        list
+            List of SimpleMove (Maneuver)
         """
-        # Normally, there are constant values for everything in the show of
-        # force. We can leave parameters but throw fixed value in super.
 
-        super().__init__(Maneuver_Mission.ShowOfForce, meanspeed,
-                         2000, 24.7, plane)
+    def legs(self) -> tuple:
+        """Fuel consumption and time of each leg of the travel plan,
+        computed only once.
+
+        Returns
+        -------
+        (list, list)
+            Fuel consumption (liters) and travelled time (seconds)
+            of each leg
+        """
+        if self._legs is None:
+            plan = self.travel_plan()
+            fuel = [p.total_fuel_consumption() for p in plan]
+            time = [p.travelled_time() for p in plan]
+            self._legs = (fuel, time, sum(fuel), sum(time))
+        return self._legs[0], self._legs[1]
+
+    @abstractmethod
+    def travel_plan_jacobian(self) -> list:
+        """Derivatives of the speed, altitude and distance of each leg of
+        the travel plan with respect to GRADIENT_PARAMETERS.
+
+        Returns
+        -------
+        list
+            np.ndarray of shape (3, len(GRADIENT_PARAMETERS)) for each leg
+        """
+
+    def legs_gradient(self) -> tuple:
+        """Derivatives of the time and of the fuel consumption of the
+        whole travel plan, before rounding : derivatives of each leg
+        chained with travel_plan_jacobian.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            d(time)/d(parameter) and d(fuel)/d(parameter) for each of
+            GRADIENT_PARAMETERS
+        """
+        time = np.zeros(len(GRADIENT_PARAMETERS))
+        fuel = np.zeros(len(GRADIENT_PARAMETERS))
+        for leg, jacobian in zip(self.travel_plan(),
+                                 self.travel_plan_jacobian()):
+            time_gradient, fuel_gradient = leg.move_gradient()
+            time += time_gradient @ jacobian
+            fuel += fuel_gradient @ jacobian
+        return time, fuel
+
+    @property
+    def total_fuel(self) -> float:
+        """Total fuel consumption according to the travel plan (liters)"""
+        if self._legs is None:
+            self.legs()
+        return self._legs[2]
+
+    @property
+    def total_time(self) -> float:
+        """Total travelled time according to the travel plan (seconds)"""
+        if self._legs is None:
+            self.legs()
+        return self._legs[3]
 
     def total_fuel_consumption(self) -> float:
         """Calculate the total fuel consumption for this maneuver
@@ -186,7 +464,7 @@ class ShowOfForce(Maneuver):
         float
             Total fuel consumption (liters)
         """
-        return sum(p.total_fuel_consumption() for p in self.travel_plan())
+        return self.total_fuel
 
     def travelled_time(self) -> float:
         """Calculate the total travelled time for this maneuver
@@ -197,7 +475,48 @@ class ShowOfForce(Maneuver):
         float
             Total travelled time (seconds)
         """
-        return sum(p.travelled_time() for p in self.travel_plan())
+        return self.total_time
+
+    def travelled_time_gradient(self) -> np.ndarray:
+        """See Maneuver.travelled_time_gradient and legs_gradient
+
+        Returns
+        -------
+        np.ndarray
+            d(time)/d(parameter) for each of GRADIENT_PARAMETERS
+        """
+        return self.legs_gradient()[0]
+
+    def total_fuel_consumption_gradient(self) -> np.ndarray:
+        """See Maneuver.total_fuel_consumption_gradient and legs_gradient
+
+        Returns
+        -------
+        np.ndarray
+            d(fuel)/d(parameter) for each of GRADIENT_PARAMETERS
+        """
+        return self.legs_gradient()[1]
+
+
+# Intimidation maneuver.
+
+class ShowOfForce(MultiLegManeuver):
+    # maxspeed: int, minspeed: int,
+    def __init__(self, meanspeed: int, plane: Plane):
+        """Create show of force maneuver, intimidation
+
+        Parameters
+        ----------
+        meanspeed : int
+            Mean speed used to make distance (km/h)
+        plane : Plane
+            Type of plane
+        """
+        # Normally, there are constant values for everything in the show of
+        # force. We can leave parameters but throw fixed value in super.
+
+        super().__init__(Maneuver_Mission.ShowOfForce, meanspeed,
+                         ALTITUDE_SF, 24.7, plane)
 
     def travel_plan(self) -> list:
         """Break down of the steps of this maneuver. See Miro for information
@@ -233,6 +552,20 @@ class ShowOfForce(Maneuver):
 
         return t_plan
 
+    def travel_plan_jacobian(self) -> list:
+        """See MultiLegManeuver.travel_plan_jacobian : only the speed of
+        the first leg is a parameter.
+
+        Returns
+        -------
+        list
+            np.ndarray of shape (3, len(GRADIENT_PARAMETERS)) for each leg
+        """
+        jacobian = [np.zeros((3, len(GRADIENT_PARAMETERS))) for _ in
+                    range(3)]
+        jacobian[0][0, 0] = 1
+        return jacobian
+
     @classmethod
     def _nb_param_(cls):
         """Get number of param needed for the init
@@ -247,7 +580,7 @@ class ShowOfForce(Maneuver):
 
 # Circle above the objective : intimidation or attack maneuver
 
-class Wheel(Maneuver):
+class Wheel(MultiLegManeuver):
     # maxspeed: int, minspeed: int,
     def __init__(self, meanspeed: int, altitude: float,
                  radius: float, plane: Plane):
@@ -270,28 +603,6 @@ class Wheel(Maneuver):
         super().__init__(Maneuver_Mission.Wheel, meanspeed,
                          altitude, distance, plane)
 
-    def total_fuel_consumption(self) -> float:
-        """Calculate the total fuel consumption for this maneuver
-        according to the travel plan.
-
-        Returns
-        -------
-        float
-            Total fuel consumption (liters)
-        """
-        return sum(p.total_fuel_consumption for p in self.travel_plan())
-
-    def travelled_time(self) -> float:
-        """Calculate the total travelled time for this maneuver
-        according to the travel plan.
-
-        Returns
-        -------
-        float
-            Total travelled time (seconds)
-        """
-        return sum(p.travelled_time() for p in self.travel_plan())
-
     def travel_plan(self) -> list:
         """Break down of the steps of this maneuver. See Miro for information
 
@@ -328,6 +639,23 @@ class Wheel(Maneuver):
 
         return t_plan
 
+    def travel_plan_jacobian(self) -> list:
+        """See MultiLegManeuver.travel_plan_jacobian : the circle depends
+        on the speed, the altitude and the radius, the altitude of the
+        other legs is half the altitude above the service floor.
+
+        Returns
+        -------
+        list
+            np.ndarray of shape (3, len(GRADIENT_PARAMETERS)) for each leg
+        """
+        circle = Maneuver.parameters_jacobian(self)
+        circle[2, 5] = 2 * pi
+        leg = np.zeros((3, len(GRADIENT_PARAMETERS)))
+        if self.altitude / 2 > self.minaltitude:
+            leg[1, 1] = 1 / 2
+        return [circle, leg, leg]
+
     # Calculate circle length
     def calculate_circle(self, radius: float, ) -> float:
         """Calculate the size of the circle
@@ -0,0 +1,249 @@
+import numpy as np
+from objects.Plane import (Plane, altitude_ratio, altitude_ratio_slope,
+                           formula_consumption_rate,
+                           formula_consumption_slope, grid_consumption_rate,
+                           grid_consumption_slope)
+
+# Parameters of Plane stored as columns
+FLEET_COLUMNS = ['fuel_consumption_rate', 'fuel_max', 'MINSPEED', 'S_OPT',
+                 'MAXSPEED', 'MINALTITUDE', 'MAXALTITUDE']
+
+
+class Fleet:
+    """Planes stored as columns of parameters, one value for each plane.
+    A Fleet is used in place of a Plane by ManeuverBatch : each maneuver
+    is flown by the plane at the same position once the maneuvers and
+    the fleet are broadcasted (see fleet_fuel_time)."""
+    def __init__(self, planes: list):
+        """Create the fleet
+
+        Parameters
+        ----------
+        planes : list
+            Planes of the fleet, Plane objects
+        """
+        self.planes = list(planes)
+        self.compile()
+        self.reshape_columns(np.arange(len(self.planes)))
+
+    @classmethod
+    def from_columns(cls, name: str = 'Variant', **columns):
+        """Fleet of variants of a plane, for example for a sizing study.
+        Columns are broadcasted against each other, missing columns have
+        the default value of Plane.
+
+        Parameters
+        ----------
+        name : str, optional
+            Prefix of the names of the planes, by default 'Variant'
+        **columns : array
+            Values of the arguments of Plane.__init__ (fuel_max, S_min,
+            S_OPT...), consumption_table is the same for every plane
+
+        Returns
+        -------
+        Fleet
+            One plane for each value of the broadcasted columns
+        """
+        table = columns.pop('consumption_table', None)
+        names = list(columns.keys())
+        values = np.broadcast_arrays(*[np.asarray(columns[key])
+                                       for key in names])
+        rows = zip(*[v.ravel().tolist() for v in values]) if names else [()]
+        return cls([Plane('%s%d' % (name, i), consumption_table=table,
+                          **dict(zip(names, row)))
+                    for i, row in enumerate(rows)])
+
+    def compile(self):
+        """Build the columns, one value for each plane : parameters,
+        altitude curves, formula and measured consumption tables. Values
+        are the same as the ones of each Plane.
+        """
+        columns = {name: np.array([getattr(p, name) for p in self.planes])
+                   for name in FLEET_COLUMNS}
+        columns['max_flight_time'] = np.array([p.max_flight_time
+                                               for p in self.planes])
+        # Altitude curves, see Plane.get_altitude_curve
+        columns['altitude_step'] = np.array(
+            [p.get_altitude_curve()[3] for p in self.planes],
+            dtype=np.float64)
+        # Formula of Plane.get_consumption_rate
+        columns['speed_scale'] = np.array(
+            [p.S_OPT ** 0.95 for p in self.planes], dtype=np.float64)
+        # Measured consumption tables, grids of the planes padded to the
+        # same number of steps
+        grids = [p._consumption_grid for p in self.planes]
+        columns['measured'] = np.array([g is not None for g in grids],
+                                       dtype=bool)
+        columns['consumption_start'] = np.zeros(len(self.planes))
+        columns['consumption_end'] = np.zeros(len(self.planes))
+        length = max([len(g[3]) for g in grids if g is not None],
+                     default=1)
+        self.consumption_rates = np.zeros((len(self.planes), length))
+        self.consumption_slopes = np.zeros((len(self.planes), length))
+        for i, grid in enumerate(grids):
+            if grid is not None:
+                start, _, end, rates, slopes = grid[:5]
+                columns['consumption_start'][i] = start
+                columns['consumption_end'][i] = end
+                self.consumption_rates[i, :len(rates)] = rates
+                self.consumption_slopes[i, :len(slopes)] = slopes
+        self.columns = columns
+
+    def reshape_columns(self, row: np.ndarray):
+        """Set the columns as attributes, with the values of the planes
+        at row
+
+        Parameters
+        ----------
+        row : np.ndarray
+            Position of the plane for each value of the columns
+        """
+        self.row = row
+        for name, values in self.columns.items():
+            setattr(self, name, values[row])
+
+    def __len__(self):
+        return len(self.planes)
+
+    def __getitem__(self, i: int) -> Plane:
+        return self.planes[i]
+
+    @property
+    def shape(self) -> tuple:
+        """Shape of the columns"""
+        return self.row.shape
+
+    def reshape(self, row: np.ndarray) -> 'Fleet':
+        """Same planes with columns of any shape
+
+        Parameters
+        ----------
+        row : np.ndarray
+            Position of the plane for each value of the new columns
+
+        Returns
+        -------
+        Fleet
+            Columns of the shape of row
+        """
+        fleet = object.__new__(Fleet)
+        fleet.__dict__.update(self.__dict__)
+        fleet.reshape_columns(np.asarray(row))
+        return fleet
+
+    def take(self, index) -> 'Fleet':
+        """Fleet with the planes at index, a plane can be repeated
+
+        Parameters
+        ----------
+        index : array of int
+            Position of the planes in the fleet
+
+        Returns
+        -------
+        Fleet
+            Columns of the shape of index
+        """
+        return self.reshape(self.row[np.asarray(index)])
+
+    def broadcast_to(self, shape: tuple) -> 'Fleet':
+        """Fleet with columns broadcasted to shape
+
+        Parameters
+        ----------
+        shape : tuple
+            Shape compatible with the shape of the fleet
+
+        Returns
+        -------
+        Fleet
+            Columns of the given shape
+        """
+        return self.reshape(np.broadcast_to(self.row, shape))
+
+    def get_altitude_ratio(self, altitude: np.ndarray) -> np.ndarray:
+        """Plane.get_altitude_ratio for each plane
+
+        Parameters
+        ----------
+        altitude : np.ndarray
+            Altitudes (feet), broadcasted with the columns
+
+        Returns
+        -------
+        np.ndarray
+            Ratio according to the altitude curve of each plane
+        """
+        return altitude_ratio(altitude, self.MINALTITUDE, self.altitude_step)
+
+    def get_altitude_ratio_slope(self, altitude: np.ndarray) -> np.ndarray:
+        """Plane.get_altitude_ratio_slope for each plane
+
+        Parameters
+        ----------
+        altitude : np.ndarray
+            Altitudes (feet), broadcasted with the columns
+
+        Returns
+        -------
+        np.ndarray
+            Ratio per foot
+        """
+        return altitude_ratio_slope(altitude, self.MINALTITUDE,
+                                    self.altitude_step)
+
+    def get_speed_consumption_rate(self, speed: np.ndarray) -> np.ndarray:
+        """Plane.get_speed_consumption_rate for each plane
+
+        Parameters
+        ----------
+        speed : np.ndarray
+            Speeds (km/h), broadcasted with the columns
+
+        Returns
+        -------
+        np.ndarray
+            Consumption rate in liters/s
+        """
+        speed = np.asarray(speed, dtype=np.float64)
+        rate = formula_consumption_rate(speed ** 1.05,
+                                        self.fuel_consumption_rate,
+                                        self.speed_scale)
+        if np.any(self.measured):
+            speed, row, start, end = np.broadcast_arrays(
+                speed, self.row, self.consumption_start,
+                self.consumption_end)
+            # Rows of the planes in the padded grids
+            measured = grid_consumption_rate(
+                speed, start, end, self.consumption_rates,
+                self.consumption_slopes,
+                row * self.consumption_rates.shape[1])
+            rate = np.where(self.measured, measured, rate)
+        return rate
+
+    def get_speed_consumption_slope(self, speed: np.ndarray) -> np.ndarray:
+        """Plane.get_speed_consumption_slope for each plane
+
+        Parameters
+        ----------
+        speed : np.ndarray
+            Speeds (km/h), broadcasted with the columns
+
+        Returns
+        -------
+        np.ndarray
+            Consumption rate per km/h (liters/s)
+        """
+        speed = np.asarray(speed, dtype=np.float64)
+        slope = formula_consumption_slope(speed, self.fuel_consumption_rate,
+                                          self.speed_scale)
+        if np.any(self.measured):
+            speed, row, start, end = np.broadcast_arrays(
+                speed, self.row, self.consumption_start,
+                self.consumption_end)
+            measured = grid_consumption_slope(
+                speed, start, end, self.consumption_slopes,
+                row * self.consumption_slopes.shape[1])
+            slope = np.where(self.measured, measured, slope)
+        return slope
@@ -0,0 +1,136 @@
+import itertools
+import numpy as np
+
+
+class GameplanSpace:
+    """Every combination of gameplan parameters, without creating them.
+    Same order as function.tools.get_all_combinations : a gameplan is
+    addressed by its mixed-radix index (one digit per parameter) and
+    only created when it is accessed."""
+    def __init__(self, d: dict):
+        """Create the gameplan space
+
+        Parameters
+        ----------
+        d : dict
+            (String, list)
+            Dictionnary with all the values for each parameter
+        """
+        self.keys = list(d.keys())
+        self.values = {key: list(values) for key, values in d.items()}
+        self.shape = tuple(len(values) for values in self.values.values())
+        # Valid combinations, None if there is no constraint
+        self.valid = None
+        self.valid_index = None
+
+    def add_constraint(self, predicate, keys: list):
+        """Keep only the gameplans for which the predicate is true.
+        The predicate is only evaluated on the combinations of the
+        parameters in keys, not on every gameplan.
+
+        Parameters
+        ----------
+        predicate : function
+            Get a dictionnary with the parameters in keys, return a bool
+        keys : list
+            Names of the parameters used by the predicate
+        """
+        axes = [self.keys.index(key) for key in keys]
+        ok = np.array([bool(predicate(dict(zip(keys, v))))
+                       for v in itertools.product(*(self.values[key]
+                                                    for key in keys))])
+        ok = ok.reshape([self.shape[a] for a in axes])
+        # Put the axes in order and broadcast over the other parameters
+        order = np.argsort(axes)
+        ok = ok.transpose(order).reshape(
+            [n if a in axes else 1 for a, n in enumerate(self.shape)])
+        if self.valid is None:
+            self.valid = np.ones(self.shape, dtype=bool)
+        self.valid &= ok
+        self.valid_index = None
+
+    def _valid_index(self) -> np.ndarray:
+        """Index of the valid gameplans in the whole product of the
+        parameters, computed once from the valid bitmap.
+
+        Returns
+        -------
+        np.ndarray
+            Sorted index of the valid gameplans
+        """
+        if self.valid_index is None:
+            flat = np.flatnonzero(self.valid)
+            dtype = np.uint32 if self.valid.size < 2 ** 32 else np.int64
+            self.valid_index = flat.astype(dtype)
+        return self.valid_index
+
+    def _flat_index(self, index):
+        """Index in the space without constraint
+
+        Parameters
+        ----------
+        index : int or array
+            Index of the gameplans in the valid ones
+
+        Returns
+        -------
+        int or array
+            Index in the whole product of the parameters
+        """
+        if self.valid is None:
+            return index
+        return self._valid_index()[index]
+
+    def digits(self, index):
+        """Index of the value of each parameter for the gameplans
+
+        Parameters
+        ----------
+        index : int or array
+            Index of the gameplans
+
+        Returns
+        -------
+        tuple
+            One int (or array) for each parameter, in the order of keys
+        """
+        return np.unravel_index(self._flat_index(index), self.shape)
+
+    def __len__(self):
+        if self.valid is None:
+            return int(np.prod(self.shape))
+        return len(self._valid_index())
+
+    def __getitem__(self, index: int) -> dict:
+        """Create the gameplan at this index
+
+        Parameters
+        ----------
+        index : int
+            Index of the gameplan
+
+        Returns
+        -------
+        dict
+            Gameplan
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Gameplan index out of range")
+        return {key: self.values[key][d]
+                for key, d in zip(self.keys, self.digits(index))}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def sample(self) -> dict:
+        """Draw a random gameplan
+
+        Returns
+        -------
+        dict
+            Gameplan
+        """
+        return self[np.random.randint(0, len(self))]
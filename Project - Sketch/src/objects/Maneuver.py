@@ -8,6 +8,7 @@ STRAIGHT_LINE_WHEEL = 2  # KM : used for the straight line above the objective
 RADIUS_MIN_WHEEL = 2  # KM
 RADIUS_MAX_WHEEL = 5  # KM
 
+ALTITUDE_SF = 2000  # Feet : altitude of the show of force
 STRAIGHT_LINE_SF = 10  # KM : used for the straight line to go next to the
 ARC_SF = 4.7  # KM :
 # used for the arc between the two straight lines
@@ -20,6 +21,10 @@ MAXSPEED = 200  # KM/H : used for reference for ULM
 # Deprecated, see C2030 for the consumption function.
 CONSTK1 = 0.0049
 
+# Parameters of the gradients of fuel and time (see ManeuverBatch)
+GRADIENT_PARAMETERS = ('speed', 'altitude', 'gap', 'length', 'width',
+                       'radius')
+
 
 # Every type of maneuver available
 
@@ -168,6 +173,63 @@ class Maneuver:
                  * self.travelled_time())
         return round(total, 2)
 
+    def move_gradient(self) -> tuple:
+        """Derivatives of the time and of the fuel consumption of this
+        move, before rounding, with respect to its speed, altitude and
+        distance.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            d(time)/d(speed, altitude, distance) (seconds) and
+            d(fuel)/d(speed, altitude, distance) (liters)
+        """
+        time = self.distance / (self.meanspeed / 3600)
+        time_gradient = np.array([-time / self.meanspeed, 0,
+                                  3600 / self.meanspeed])
+        rate = fuel_consumption_rate(self.meanspeed, self.altitude,
+                                     self.plane)
+        rate_speed, rate_altitude = fuel_consumption_rate_gradient(
+            self.meanspeed, self.altitude, self.plane)
+        fuel_gradient = rate * time_gradient
+        fuel_gradient[0] += rate_speed * time
+        fuel_gradient[1] += rate_altitude * time
+        return time_gradient, fuel_gradient
+
+    def parameters_jacobian(self) -> np.ndarray:
+        """Derivatives of the speed, altitude and distance of this move
+        with respect to GRADIENT_PARAMETERS. The distance of a simple
+        move does not depend on them.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (3, len(GRADIENT_PARAMETERS))
+        """
+        jacobian = np.zeros((3, len(GRADIENT_PARAMETERS)))
+        jacobian[0, 0] = jacobian[1, 1] = 1
+        return jacobian
+
+    def travelled_time_gradient(self) -> np.ndarray:
+        """Derivatives of the travelled time, before rounding.
+
+        Returns
+        -------
+        np.ndarray
+            d(time)/d(parameter) for each of GRADIENT_PARAMETERS
+        """
+        return self.move_gradient()[0] @ self.parameters_jacobian()
+
+    def total_fuel_consumption_gradient(self) -> np.ndarray:
+        """Derivatives of the total fuel consumption, before rounding.
+
+        Returns
+        -------
+        np.ndarray
+            d(fuel)/d(parameter) for each of GRADIENT_PARAMETERS
+        """
+        return self.move_gradient()[1] @ self.parameters_jacobian()
+
     def __repr__(self):
         return self.name
 
@@ -197,9 +259,32 @@ def fuel_consumption_rate(speed: float, altitude: float,
         Fuel consumption rate (liters/s)
     """
     alt_ratio = get_curve_value_alt(altitude, plane)
-    spd = speed ** 1.05
-    fcr = (plane.get_consumption_rate(spd) / alt_ratio)
-    # print(plane.get_consumption_rate(spd), fcr)
+    fcr = (plane.get_speed_consumption_rate(speed) / alt_ratio)
     return fcr
 
+
+def fuel_consumption_rate_gradient(speed: float, altitude: float,
+                                   plane: Plane) -> tuple:
+    """Derivatives of fuel_consumption_rate with respect to speed and
+    altitude
+
+    Parameters
+    ----------
+    speed : float
+        Speed used for the moment (km/h)
+    altitude : float
+        Altitude used for the moment (feet)
+    plane : Plane
+        Plane used to calculate the fuel consumption rate
+
+    Returns
+    -------
+    (float, float)
+        Rate per km/h and rate per foot (liters/s)
+    """
+    alt_ratio = get_curve_value_alt(altitude, plane)
+    return (plane.get_speed_consumption_slope(speed) / alt_ratio,
+            -plane.get_speed_consumption_rate(speed) *
+            plane.get_altitude_ratio_slope(altitude) / alt_ratio ** 2)
+
 # TODO : Add units tests
@@ -0,0 +1,307 @@
+from objects.AllManeuvers import *
+from objects.Fleet import Fleet
+from objects.Maneuver import ALTITUDE_SF
+
+# Batch evaluation of maneuvers : struct of arrays instead of one object
+# per maneuver. Results are the same as the objects of AllManeuvers.
+
+# Number of legs in a travel plan (Wheel and ShowOfForce have 3 legs,
+# other maneuvers only use the first one)
+NB_LEGS = 3
+
+
+class ManeuverBatch:
+    """Batch of maneuvers stored as arrays, calculate fuel consumption and
+    time for every maneuver in one pass."""
+    def __init__(self, maneuver, speed, altitude, gap, length,
+                 width, radius, plane):
+        """Generate a batch of maneuvers. Every parameter is broadcasted
+        against the others, unused parameters for a type of maneuver are
+        ignored (for example the radius for a Spiral). ZigZags with a zone
+        smaller than the gap are not valid (see valid), their fuel
+        consumption and time are NaN.
+
+        Parameters
+        ----------
+        maneuver : array of int or Maneuver_Mission
+            Type of each maneuver (Maneuver_Mission or its value)
+        speed : array
+            Mean speed for each maneuver (km/h)
+        altitude : array
+            Mean altitude for each maneuver (feet)
+        gap : array
+            Gap between each pass through (km), Spiral and ZigZag
+        length : array
+            Length of the zone to scan (km), Spiral and ZigZag
+        width : array
+            Width of the zone to scan (km), ZigZag
+        radius : array
+            Radius of the circle (km), Wheel
+        plane : Plane or Fleet
+            Type of plane, or plane of each maneuver : the columns of
+            the fleet are broadcasted with the parameters
+
+        Raises
+        ------
+        Exception
+            If the type of maneuver is not supported
+        """
+        maneuver = np.asarray(maneuver)
+        if maneuver.dtype == object:
+            maneuver = np.vectorize(lambda m: getattr(m, 'value', m),
+                                    otypes=[np.int64])(maneuver)
+        # Columns of a fleet are broadcasted with the parameters, but
+        # only take the shape of the batch in the computations
+        row = plane.row if isinstance(plane, Fleet) else 0
+        (self.maneuver, self.meanspeed, self.altitude, self.gap,
+         self.length, self.width, self.radius, _) = np.broadcast_arrays(
+            maneuver, np.asarray(speed, dtype=np.float64),
+            np.asarray(altitude, dtype=np.float64),
+            np.asarray(gap, dtype=np.float64),
+            np.asarray(length, dtype=np.float64),
+            np.asarray(width, dtype=np.float64),
+            np.asarray(radius, dtype=np.float64), row)
+        self.plane = plane
+        # Plane of each leg, see legs_fuel_consumption
+        self.leg_plane = plane
+        if isinstance(plane, Fleet):
+            self.leg_plane = plane.reshape(plane.row[..., None])
+        self.maxspeed = plane.MAXSPEED
+        self.minspeed = plane.MINSPEED
+        self.minaltitude = plane.MINALTITUDE
+        self.maxaltitude = plane.MAXALTITUDE
+
+        self.wheel = self.maneuver == Maneuver_Mission.Wheel.value
+        self.show_of_force = (self.maneuver ==
+                              Maneuver_Mission.ShowOfForce.value)
+        self.spiral = self.maneuver == Maneuver_Mission.Spiral.value
+        self.zigzag = self.maneuver == Maneuver_Mission.Zigzag.value
+        if not np.all(self.wheel | self.show_of_force |
+                      self.spiral | self.zigzag):
+            raise Exception("Type of maneuver not supported")
+        self.valid = ~self.zigzag | ZigZag.valid_zone(self.length,
+                                                      self.width, self.gap)
+
+        self.leg_speed, self.leg_altitude, self.leg_distance = \
+            self.travel_plan()
+
+    def __len__(self):
+        return self.maneuver.size
+
+    def travel_plan(self) -> tuple:
+        """Break down of the steps of every maneuver, see Wheel.travel_plan
+        and ShowOfForce.travel_plan. Spiral and ZigZag are a single leg,
+        the two other legs have a null distance.
+
+        Returns
+        -------
+        (array, array, array)
+            Speed (km/h), altitude (feet) and distance (km) of each leg,
+            with the legs in the last dimension.
+        """
+        shape = self.maneuver.shape + (NB_LEGS,)
+        speed = np.empty(shape)
+        altitude = np.empty(shape)
+        distance = np.zeros(shape)
+
+        # First leg : the maneuver itself, or the circle for a wheel
+        speed[..., 0] = self.meanspeed
+        altitude[..., 0] = np.where(self.show_of_force, ALTITUDE_SF,
+                                    self.altitude)
+        distance[..., 0] = np.select(
+            [self.wheel, self.show_of_force, self.spiral, self.zigzag],
+            [2 * pi * self.radius, STRAIGHT_LINE_SF,
+             self.spiral_distance(), self.zigzag_distance()])
+
+        # Second leg : min speed, to quit the circle or reduce altitude
+        speed[..., 1] = self.minspeed
+        wheel_alt = np.where(self.altitude / 2 > self.minaltitude,
+                             self.altitude / 2, self.minaltitude)
+        sf_alt = np.minimum(ALTITUDE_SF * 3 / 2, self.maxaltitude)
+        altitude[..., 1] = np.where(self.show_of_force, sf_alt, wheel_alt)
+        distance[..., 1] = np.select([self.wheel, self.show_of_force],
+                                     [STRAIGHT_LINE_WHEEL / 4, ARC_SF], 0)
+
+        # Third leg : max speed above the objective
+        speed[..., 2] = self.maxspeed
+        altitude[..., 2] = np.where(self.show_of_force, self.minaltitude,
+                                    wheel_alt)
+        distance[..., 2] = np.select([self.wheel, self.show_of_force],
+                                     [STRAIGHT_LINE_WHEEL * 3 / 4,
+                                      STRAIGHT_LINE_SF], 0)
+
+        return speed, altitude, np.round(distance, 2)
+
+    def spiral_distance(self):
+        """Travelled distance of every spiral (0 for other maneuvers)
+
+        Returns
+        -------
+        array
+            Total length of the spirals (km)
+        """
+        distance = np.zeros(self.maneuver.shape)
+        distance[self.spiral] = Spiral.calculate_distance(
+            self.length[self.spiral], self.gap[self.spiral])
+        return distance
+
+    def zigzag_distance(self):
+        """Travelled distance of every zigzag (0 for other maneuvers)
+
+        Returns
+        -------
+        array
+            Total length of the zigzags (km), NaN if the zone is too small
+        """
+        distance = np.zeros(self.maneuver.shape)
+        distance[self.zigzag], _ = ZigZag.batch_distance(
+            self.length[self.zigzag], self.width[self.zigzag],
+            self.gap[self.zigzag])
+        return distance
+
+    def legs_travelled_time(self):
+        """Travelled time of each leg of every maneuver
+
+        Returns
+        -------
+        array
+            Travelled time (seconds), legs in the last dimension
+        """
+        return np.round(self.leg_distance / (self.leg_speed / 3600), 2)
+
+    def legs_fuel_consumption(self):
+        """Fuel consumption of each leg of every maneuver
+
+        Returns
+        -------
+        array
+            Fuel consumption (liters), legs in the last dimension
+        """
+        rate = fuel_consumption_rate(self.leg_speed, self.leg_altitude,
+                                     self.leg_plane)
+        return np.round(rate * self.legs_travelled_time(), 2)
+
+    def travelled_time(self):
+        """Calculate the total travelled time for every maneuver.
+
+        Returns
+        -------
+        array
+            Total travelled time (seconds)
+        """
+        return self.legs_travelled_time().sum(axis=-1)
+
+    def total_fuel_consumption(self):
+        """Calculate the total fuel consumption for every maneuver.
+
+        Returns
+        -------
+        array
+            Total fuel consumption (liters)
+        """
+        return self.legs_fuel_consumption().sum(axis=-1)
+
+    def travel_plan_jacobian(self) -> np.ndarray:
+        """Derivatives of the speed, altitude and distance of each leg
+        with respect to GRADIENT_PARAMETERS, see
+        Maneuver.parameters_jacobian and
+        MultiLegManeuver.travel_plan_jacobian.
+
+        Returns
+        -------
+        np.ndarray
+            Shape of the batch + (NB_LEGS, 3, len(GRADIENT_PARAMETERS))
+        """
+        jacobian = np.zeros(self.maneuver.shape +
+                            (NB_LEGS, 3, len(GRADIENT_PARAMETERS)))
+        first = jacobian[..., 0, :, :]
+        first[..., 0, 0] = 1
+        first[..., 1, 1] = ~self.show_of_force
+        first[..., 2, 5] = np.where(self.wheel, 2 * pi, 0)
+        first[self.spiral, 2, 2], first[self.spiral, 2, 3] = (
+            Spiral.calculate_distance_gradient(self.length[self.spiral],
+                                               self.gap[self.spiral]))
+        first[self.zigzag, 2, 2], first[self.zigzag, 2, 3] = (
+            ZigZag.calculate_distance_gradient(self.length[self.zigzag],
+                                               self.width[self.zigzag],
+                                               self.gap[self.zigzag]))
+        # Half altitude of the wheels above the service floor
+        half = self.wheel & (self.altitude / 2 > self.minaltitude)
+        jacobian[..., 1, 1, 1] = jacobian[..., 2, 1, 1] = half / 2
+        return jacobian
+
+    def legs_gradient(self) -> tuple:
+        """Derivatives of the time and of the fuel consumption of each
+        leg, before rounding, with respect to its speed, altitude and
+        distance, see Maneuver.move_gradient.
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            Time (seconds) and fuel (liters) derivatives, legs then
+            (speed, altitude, distance) in the last dimensions
+        """
+        time = self.leg_distance / (self.leg_speed / 3600)
+        time_speed = -time / self.leg_speed
+        time_distance = 3600 / self.leg_speed
+        rate = fuel_consumption_rate(self.leg_speed, self.leg_altitude,
+                                     self.leg_plane)
+        rate_speed, rate_altitude = fuel_consumption_rate_gradient(
+            self.leg_speed, self.leg_altitude, self.leg_plane)
+        time_gradient = np.stack([time_speed, np.zeros_like(time),
+                                  time_distance], axis=-1)
+        fuel_gradient = np.stack([rate * time_speed + rate_speed * time,
+                                  rate_altitude * time,
+                                  rate * time_distance], axis=-1)
+        return time_gradient, fuel_gradient
+
+    def travelled_time_gradient(self) -> np.ndarray:
+        """Derivatives of the travelled time of every maneuver, before
+        rounding.
+
+        Returns
+        -------
+        np.ndarray
+            d(time)/d(parameter), GRADIENT_PARAMETERS in the last
+            dimension
+        """
+        return np.einsum('...lk,...lkp->...p', self.legs_gradient()[0],
+                         self.travel_plan_jacobian())
+
+    def total_fuel_consumption_gradient(self) -> np.ndarray:
+        """Derivatives of the total fuel consumption of every maneuver,
+        before rounding.
+
+        Returns
+        -------
+        np.ndarray
+            d(fuel)/d(parameter), GRADIENT_PARAMETERS in the last
+            dimension
+        """
+        return np.einsum('...lk,...lkp->...p', self.legs_gradient()[1],
+                         self.travel_plan_jacobian())
+
+
+def fleet_fuel_time(maneuver, speed, altitude, gap, length, width,
+                    radius, fleet: Fleet) -> tuple:
+    """Fuel consumption and time of maneuvers flown by every plane of a
+    fleet, in one ManeuverBatch
+
+    Parameters
+    ----------
+    maneuver, speed, altitude, gap, length, width, radius : array
+        Maneuvers, see ManeuverBatch
+    fleet : Fleet
+        Planes
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        Fuel consumption (liters) and travelled time (seconds), shape of
+        the maneuvers + shape of the fleet
+    """
+    parameters = [np.asarray(p)[(...,) + (None,) * len(fleet.shape)]
+                  for p in (maneuver, speed, altitude, gap, length, width,
+                            radius)]
+    batch = ManeuverBatch(*parameters, fleet)
+    return batch.total_fuel_consumption(), batch.travelled_time()
@@ -1,4 +1,6 @@
+import hashlib
 import math
+import numpy as np
 
 # Source ULM:
 # https://www.xl8.fr/uploads/files/XL8_plaquette_2014-format_A4_300dpi.pdf
@@ -7,6 +9,228 @@ import math
 FUEL_VOLUMIC_MASS = 0.803  # kg / l
 KNOTS2KMH = 1.852  # knots to km/h
 KMH2KNOTS = 0.539957  # km/h to knots
+# Ratio applied on the consumption at the service floor and ceiling
+ALT_RATIO_MIN = 0.90
+ALT_RATIO_MAX = 1.10
+# Consumption (l/h) measured at some speeds (km/h), from the Vol des
+# Aigles report of july 21 2022, see src/test_conso.ipynb
+VOL_DES_AIGLES_CONSUMPTION = [(140, 12), (150, 15), (180, 17), (220, 20)]
+# Step of the grid of a measured consumption table (km/h)
+CONSUMPTION_GRID_STEP = 0.5
+
+
+def cubic_spline(x: np.ndarray, y: np.ndarray, points: np.ndarray):
+    """Cubic spline through (x, y) with not-a-knot ends, the same curve
+    as scipy.interpolate.interp1d(x, y, kind='cubic'). With 3 points it
+    is the parabola, with 2 points the line.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Increasing abscissas
+    y : np.ndarray
+        Values at x
+    points : np.ndarray
+        Abscissas to evaluate, between x[0] and x[-1]
+
+    Returns
+    -------
+    np.ndarray
+        Values of the spline at points
+    """
+    n = len(x)
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    # Second derivatives at x : continuity of the first derivative at
+    # the interior points, and of the third derivative at x[1] and
+    # x[-2] (not-a-knot)
+    system = np.zeros((n, n))
+    rhs = np.zeros(n)
+    for i in range(1, n - 1):
+        system[i, i - 1:i + 2] = [h[i - 1], 2 * (h[i - 1] + h[i]), h[i]]
+        rhs[i] = 6 * (delta[i] - delta[i - 1])
+    if n == 2:
+        system[0, 0] = system[1, 1] = 1
+    elif n == 3:
+        # Same second derivative : parabola
+        system[0, :2] = [1, -1]
+        system[2, 1:] = [1, -1]
+    else:
+        system[0, :3] = [h[1], -(h[0] + h[1]), h[0]]
+        system[-1, -3:] = [h[-1], -(h[-2] + h[-1]), h[-2]]
+    m = np.linalg.solve(system, rhs)
+
+    i = np.clip(np.searchsorted(x, points, side='right') - 1, 0, n - 2)
+    t = points - x[i]
+    slope = delta[i] - h[i] * (2 * m[i] + m[i + 1]) / 6
+    return (y[i] + slope * t + m[i] / 2 * t ** 2
+            + (m[i + 1] - m[i]) / (6 * h[i]) * t ** 3)
+
+
+def altitude_ratio(altitude, floor, step):
+    """Ratio of the consumption at an altitude, linear from ALT_RATIO_MIN
+    at the service floor and clipped to [ALT_RATIO_MIN, ALT_RATIO_MAX].
+    Used by Plane and Fleet.
+
+    Parameters
+    ----------
+    altitude : float or np.ndarray
+        Altitude (feet)
+    floor : float or np.ndarray
+        Service floor (feet)
+    step : float or np.ndarray
+        Ratio per foot
+
+    Returns
+    -------
+    float or np.ndarray
+        Ratio according to the curve of the altitude
+    """
+    ratio = (altitude - floor) * step + ALT_RATIO_MIN
+    if isinstance(ratio, np.ndarray):
+        return np.minimum(np.maximum(ratio, ALT_RATIO_MIN), ALT_RATIO_MAX)
+    return np.float64(min(max(ratio, ALT_RATIO_MIN), ALT_RATIO_MAX))
+
+
+def altitude_ratio_slope(altitude, floor, step):
+    """Derivative of altitude_ratio, 0 where the ratio is clipped (the
+    ratio at the service floor has the slope of the curve). Used by Plane
+    and Fleet.
+
+    Parameters
+    ----------
+    altitude : float or np.ndarray
+        Altitude (feet)
+    floor : float or np.ndarray
+        Service floor (feet)
+    step : float or np.ndarray
+        Ratio per foot
+
+    Returns
+    -------
+    float or np.ndarray
+        Ratio per foot
+    """
+    ratio = (altitude - floor) * step + ALT_RATIO_MIN
+    if isinstance(ratio, np.ndarray):
+        return np.where((ratio >= ALT_RATIO_MIN) & (ratio < ALT_RATIO_MAX),
+                        step, 0.)
+    return step if ALT_RATIO_MIN <= ratio < ALT_RATIO_MAX else 0.
+
+
+def formula_consumption_rate(speed, fuel_consumption_rate, speed_scale):
+    """Consumption rate of the formula, without measured consumption
+    table. Used by Plane and Fleet.
+
+    Parameters
+    ----------
+    speed : float or np.ndarray
+        Speed used (km/h)
+    fuel_consumption_rate : float or np.ndarray
+        Consumption rate of the plane (liters/s)
+    speed_scale : float or np.ndarray
+        S_OPT ** 0.95 of the plane
+
+    Returns
+    -------
+    float or np.ndarray
+        Consumption rate in liters/s
+    """
+    return fuel_consumption_rate * speed / speed_scale
+
+
+def formula_consumption_slope(speed, fuel_consumption_rate, speed_scale):
+    """Derivative of formula_consumption_rate of speed ** 1.05. Used by
+    Plane and Fleet.
+
+    Parameters
+    ----------
+    speed : float or np.ndarray
+        Speed used (km/h)
+    fuel_consumption_rate : float or np.ndarray
+        Consumption rate of the plane (liters/s)
+    speed_scale : float or np.ndarray
+        S_OPT ** 0.95 of the plane
+
+    Returns
+    -------
+    float or np.ndarray
+        Consumption rate per km/h (liters/s)
+    """
+    return fuel_consumption_rate * 1.05 * speed ** 0.05 / speed_scale
+
+
+def grid_consumption_rate(speed, start, end, rates, slopes, offset=0):
+    """Consumption rate in the grid of a measured consumption table :
+    linear interpolation, clipped to its speeds. Used by Plane and Fleet.
+
+    Parameters
+    ----------
+    speed : float or np.ndarray
+        Speed used (km/h)
+    start : float or np.ndarray
+        First speed of the grid (km/h)
+    end : float or np.ndarray
+        Position of the last speed in the grid
+    rates : np.ndarray or list
+        Rate at the start of each step (liters/s), lists for a float
+        speed
+    slopes : np.ndarray or list
+        Rate increase over each step (liters/s)
+    offset : int or np.ndarray, optional
+        Added to the positions in rates and slopes, by default 0
+
+    Returns
+    -------
+    float or np.ndarray
+        Consumption rate in liters/s
+    """
+    position = (speed - start) * (1 / CONSUMPTION_GRID_STEP)
+    if isinstance(position, np.ndarray):
+        np.clip(position, 0, end, out=position)
+        i = position.astype(np.intp)
+        position -= i
+        i += offset
+        return rates.take(i) + position * slopes.take(i)
+    if position < 0:
+        position = 0
+    elif position > end:
+        position = end
+    i = int(position)
+    return rates[i + offset] + (position - i) * slopes[i + offset]
+
+
+def grid_consumption_slope(speed, start, end, slopes, offset=0):
+    """Derivative of grid_consumption_rate, 0 where the speed is clipped
+    to the measured consumption table. Used by Plane and Fleet.
+
+    Parameters
+    ----------
+    speed : float or np.ndarray
+        Speed used (km/h)
+    start : float or np.ndarray
+        First speed of the grid (km/h)
+    end : float or np.ndarray
+        Position of the last speed in the grid
+    slopes : np.ndarray or list
+        Rate increase over each step (liters/s), a list for a float speed
+    offset : int or np.ndarray, optional
+        Added to the positions in slopes, by default 0
+
+    Returns
+    -------
+    float or np.ndarray
+        Consumption rate per km/h (liters/s)
+    """
+    scale = 1 / CONSUMPTION_GRID_STEP
+    position = (speed - start) * scale
+    if isinstance(position, np.ndarray):
+        i = np.clip(position, 0, end).astype(np.intp) + offset
+        return np.where((position >= 0) & (position < end),
+                        slopes.take(i) * scale, 0.)
+    if 0 <= position < end:
+        return slopes[int(position) + offset] * scale
+    return 0.
 
 
 class Plane:
@@ -17,7 +241,7 @@ class Plane:
                  fuel_max: int = 120,  S_min: float = 140,
                  S_OPT: float = 180, S_max: float = 220,
                  MINALTITUDE: int = 300, MAXALTITUDE: int = 16500,
-                 verbose: int = 0):
+                 consumption_table: list = None, verbose: int = 0):
         """Generate Plane object. Default values are ULM parameters.
 
         Parameters
@@ -39,6 +263,10 @@ class Plane:
             Service floor for the plane, by default 300 (feet)
         MAXALTITUDE : int, optional
             Service ceiling for the plane, by default 16500 (feet)
+        consumption_table : list, optional
+            Measured (speed (km/h), consumption (l/h)) points, for example
+            VOL_DES_AIGLES_CONSUMPTION. By default None : the consumption
+            is given by the formula of get_consumption_rate
         verbose : int, optional
             Verbose mode, display data for the plane, by default 0 (False)
         """
@@ -57,9 +285,13 @@ class Plane:
         # self.V_3Quarter = round(self.V_3Quarter_kmh * KMH2KNOTS)
         # self.S_max = round(self.V_max_kmh * KMH2KNOTS)
 
+        # Altitude curve, computed when needed (see get_altitude_ratio)
+        self._altitude_curve = None
         # TODO will be set with the type of field
         self.MINALTITUDE = MINALTITUDE  # feet
         self.MAXALTITUDE = MAXALTITUDE  # feet
+        # Compiled in a grid, see get_speed_consumption_rate
+        self.consumption_table = consumption_table
 
         self.max_flight_time = round(
             self.fuel_max / self.fuel_consumption_rate)
@@ -79,12 +311,143 @@ class Plane:
     def __repr__(self):
         return self.name
 
+    def signature(self) -> str:
+        """Hash of the parameters used by the consumption and the speed
+        and altitude limits, two planes with the same signature give the
+        same fuel consumption and time for every maneuver.
+
+        Returns
+        -------
+        str
+            Hexadecimal SHA-1 of the parameters
+        """
+        parameters = (self.name, self.fuel_consumption_rate, self.fuel_max,
+                      self.MINSPEED, self.S_OPT, self.MAXSPEED,
+                      self.MINALTITUDE, self.MAXALTITUDE,
+                      ALT_RATIO_MIN, ALT_RATIO_MAX, self.consumption_table,
+                      CONSUMPTION_GRID_STEP)
+        return hashlib.sha1(repr(parameters).encode()).hexdigest()
+
     def __str__(self):
         return self.name
 
+    @property
+    def MINALTITUDE(self) -> int:
+        """Service floor for the plane (feet)"""
+        return self._MINALTITUDE
+
+    @MINALTITUDE.setter
+    def MINALTITUDE(self, value: int):
+        self._MINALTITUDE = value
+        # Limits changed, the altitude curve has to be computed again
+        self._altitude_curve = None
+
+    @property
+    def MAXALTITUDE(self) -> int:
+        """Service ceiling for the plane (feet)"""
+        return self._MAXALTITUDE
+
+    @MAXALTITUDE.setter
+    def MAXALTITUDE(self, value: int):
+        self._MAXALTITUDE = value
+        self._altitude_curve = None
+
+    @property
+    def consumption_table(self) -> list:
+        """Measured (speed, consumption) points, None for the formula"""
+        return self._consumption_table
+
+    @consumption_table.setter
+    def consumption_table(self, value: list):
+        """Compile the points in a uniform grid of CONSUMPTION_GRID_STEP
+        km/h, the cubic spline of the points is computed once here.
+
+        Raises
+        ------
+        Exception
+            If there is less than 2 points or speeds are not increasing
+        """
+        self._consumption_table = value
+        self._consumption_grid = None
+        if value is None:
+            return
+        points = np.array(value, dtype=np.float64).reshape(-1, 2)
+        speeds, consumptions = points[:, 0], points[:, 1] / 3600
+        if len(points) < 2 or np.any(np.diff(speeds) <= 0):
+            raise Exception("Consumption table needs at least 2 points "
+                            "with increasing speeds")
+        # Position of the last speed in the grid, the last step of the
+        # grid can go beyond it
+        end = (speeds[-1] - speeds[0]) / CONSUMPTION_GRID_STEP
+        grid = speeds[0] + np.arange(math.ceil(end) + 1) * (
+            CONSUMPTION_GRID_STEP)
+        rates = cubic_spline(speeds, consumptions, grid)
+        # Rate and slope at the start of each step, the last speed can
+        # be on the last point (slope 0)
+        slopes = np.append(np.diff(rates), 0)
+        # Python floats : numpy scalars are slow for a single speed
+        self._consumption_grid = (float(speeds[0]),
+                                  1 / CONSUMPTION_GRID_STEP, float(end),
+                                  rates, slopes, rates.tolist(),
+                                  slopes.tolist())
+
+    def get_altitude_curve(self) -> tuple:
+        """Get the parameters of the altitude curve, cached on the plane.
+        The curve is linear between ALT_RATIO_MIN at the service floor
+        and ALT_RATIO_MAX one foot below the service ceiling (same values
+        as the former np.linspace table, one point per foot).
+
+        Returns
+        -------
+        tuple
+            (floor altitude, ratio at floor, max ratio, ratio per foot)
+        """
+        if self._altitude_curve is None:
+            nb_points = self.MAXALTITUDE - self.MINALTITUDE
+            step = (ALT_RATIO_MAX - ALT_RATIO_MIN) / max(nb_points - 1, 1)
+            self._altitude_curve = (self.MINALTITUDE, ALT_RATIO_MIN,
+                                    ALT_RATIO_MAX, step)
+        return self._altitude_curve
+
+    def get_altitude_ratio(self, altitude):
+        """Get an augmentation or diminution of consumption depending on
+        the altitude. Float altitudes are interpolated on the curve and
+        altitudes outside of the service envelope are clipped.
+
+        Parameters
+        ----------
+        altitude : float or np.ndarray
+            Altitude (feet)
+
+        Returns
+        -------
+        float or np.ndarray
+            Ratio according to the curve of the altitude
+        """
+        floor, _, _, step = self.get_altitude_curve()
+        return altitude_ratio(altitude, floor, step)
+
+    def get_altitude_ratio_slope(self, altitude):
+        """Derivative of get_altitude_ratio, 0 where the ratio is clipped
+        (the ratio at the service floor has the slope of the curve).
+
+        Parameters
+        ----------
+        altitude : float or np.ndarray
+            Altitude (feet)
+
+        Returns
+        -------
+        float or np.ndarray
+            Ratio per foot
+        """
+        floor, _, _, step = self.get_altitude_curve()
+        return altitude_ratio_slope(altitude, floor, step)
+
     def get_consumption_rate(self, speed: float) -> float:
         """Get consumption rate depending on speed for the current plane.
-        TODO Convert using data from src/test_conso.ipynb
+        Formula used without measured consumption table, see
+        get_speed_consumption_rate
 
         Parameters
         ----------
@@ -96,6 +459,51 @@ class Plane:
         float
             Consumption rate in liters/s
         """
-        return self.fuel_consumption_rate * speed / (
-                self.S_OPT ** 0.95
-                )
+        return formula_consumption_rate(speed, self.fuel_consumption_rate,
+                                        self.S_OPT ** 0.95)
+
+    def get_speed_consumption_rate(self, speed):
+        """Consumption rate at a speed : linear interpolation in the grid
+        of the measured consumption table, clipped to its speeds, or
+        get_consumption_rate of speed ** 1.05 without table.
+
+        Parameters
+        ----------
+        speed : float or np.ndarray
+            Speed used (km/h)
+
+        Returns
+        -------
+        float or np.ndarray
+            Consumption rate in liters/s
+        """
+        if self._consumption_grid is None:
+            return self.get_consumption_rate(speed ** 1.05)
+        (start, _, end, rates, slopes,
+         rate_list, slope_list) = self._consumption_grid
+        if isinstance(speed, np.ndarray):
+            return grid_consumption_rate(speed, start, end, rates, slopes)
+        return grid_consumption_rate(speed, start, end, rate_list,
+                                     slope_list)
+
+    def get_speed_consumption_slope(self, speed):
+        """Derivative of get_speed_consumption_rate, 0 where the speed is
+        clipped to the measured consumption table.
+
+        Parameters
+        ----------
+        speed : float or np.ndarray
+            Speed used (km/h)
+
+        Returns
+        -------
+        float or np.ndarray
+            Consumption rate per km/h (liters/s)
+        """
+        if self._consumption_grid is None:
+            return formula_consumption_slope(
+                speed, self.fuel_consumption_rate, self.S_OPT ** 0.95)
+        start, _, end, _, slopes, _, slope_list = self._consumption_grid
+        return grid_consumption_slope(
+            speed, start, end,
+            slopes if isinstance(speed, np.ndarray) else slope_list)